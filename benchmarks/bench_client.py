@@ -0,0 +1,150 @@
+"""
+Benchmark: "BinanceChainClient" per endpoint, against the local stand-in server ("binance_dex.local_server")
+
+For each endpoint, measures with several threads: requests per second and p50 / p99 latency, then in a single thread:
+peak memory allocated per call (tracemalloc).
+
+Results can be saved and compared to a previous run, the script exits with status 1 if an endpoint got slower (or
+bigger) than the tolerance, so that performance regressions show up before release.
+
+Usage:
+    python benchmarks/bench_client.py [--requests 200] [--threads 4] [--latency 0] [--endpoints depth,klines]
+                                      [--save results.json] [--compare results.json] [--tolerance 0.2]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from binance_dex.api import BinanceChainClient
+from binance_dex.local_server import LocalDexServer
+
+ADDRESS = 'tbnb1r4gc5ftrkr9ez2khph4h5xxd0mf0hd75jf06gw'
+
+# endpoint -> call performed on the client
+CALLS = {
+    'time': lambda client: client.get_block_time(),
+    'node-info': lambda client: client.get_node_info(),
+    'validators': lambda client: client.get_validators(),
+    'peers': lambda client: client.get_peers(),
+    'tokens': lambda client: client.get_tokens(),
+    'account': lambda client: client.get_account_info_by_address(ADDRESS),
+    'account-sequence': lambda client: client.get_account_sequence_by_address(ADDRESS),
+    'tx': lambda client: client.get_transaction('35B8D4070200FFBE045432AC9D87232BEC1FFAD9E6A6C8979CE2FE631B644B9E'),
+    'markets': lambda client: client.get_markets(),
+    'fees': lambda client: client.get_fees(),
+    'depth': lambda client: client.get_depth('NNB-0AD_BNB', 100),
+    'klines': lambda client: client.get_klines('NNB-0AD_BNB', '1h', limit=1000),
+    'orders': lambda client: client.get_order_by_id('1D518A2563B0CB912AD70DEB7A18CD7ED2FBB7D4-11'),
+    'orders-open': lambda client: client.get_order_open(ADDRESS, limit=500),
+    'orders-closed': lambda client: client.get_order_closed(ADDRESS, limit=500),
+    'broadcast': lambda client: client.post_broadcast('0a1b2c3d', sync=True),
+    'transactions': lambda client: client.transactions(ADDRESS, limit=500),
+}
+
+# Metrics compared by "--compare", all "lower is better"
+COMPARED = ('p50_ms', 'p99_ms', 'peak_kb')
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench_endpoint(client, call, requests_per_thread, threads, memory_samples=5):
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def worker():
+        own = []
+        failed = 0
+        for _ in range(requests_per_thread):
+            start = time.perf_counter()
+            ret = call(client)
+            own.append(time.perf_counter() - start)
+            failed += 0 if ret['status'] else 1
+        with lock:
+            latencies.extend(own)
+            failures.append(failed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    # Memory: peak allocated while performing (and holding the result of) one call
+    peaks = []
+    for _ in range(memory_samples):
+        tracemalloc.start()
+        ret = call(client)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        del ret
+
+    latencies.sort()
+    return {'req_s': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'peak_kb': min(peaks) / 1024.0,
+            'failures': sum(failures)}
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for endpoint, result in sorted(results.items()):
+        for metric in COMPARED:
+            before = baseline.get(endpoint, {}).get(metric)
+            if before and result[metric] > before * (1 + tolerance):
+                regressions.append('%s %s: %.3f -> %.3f (+%.0f%%)' % (endpoint, metric, before, result[metric],
+                                                                    (result[metric] / before - 1) * 100))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BinanceChainClient benchmark against the local stand-in server')
+    parser.add_argument('--requests', type=int, default=200, help='requests per thread and endpoint')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.0, help='server latency in seconds')
+    parser.add_argument('--endpoints', default=','.join(sorted(CALLS)), help='comma separated endpoints')
+    parser.add_argument('--save', help='save results to this JSON file')
+    parser.add_argument('--compare', help='compare results to this JSON file (saved by "--save")')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown when comparing, 0.2 = 20%%')
+    args = parser.parse_args()
+
+    server = LocalDexServer(latency=args.latency).start()
+    client = BinanceChainClient(api_base_url_with_port=server.url, pool_size=args.threads, rate_limit=False,
+                                coalesce=False)
+    print('%s requests x %s threads per endpoint against %s' % (args.requests, args.threads, server.url))
+    print('%-18s %10s %10s %10s %10s %8s' % ('endpoint', 'req/s', 'p50 ms', 'p99 ms', 'peak KB', 'failed'))
+
+    results = {}
+    for endpoint in args.endpoints.split(','):
+        result = bench_endpoint(client, CALLS[endpoint], args.requests, args.threads)
+        results[endpoint] = result
+        print('%-18s %10.1f %10.3f %10.3f %10.1f %8d' % (endpoint, result['req_s'], result['p50_ms'],
+                                                         result['p99_ms'], result['peak_kb'], result['failures']))
+    server.stop()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION %s' % regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
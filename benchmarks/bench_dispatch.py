@@ -0,0 +1,75 @@
+"""
+Benchmark: per-call overhead of resolving the endpoint of "BinanceChainNodeRPC" / "BinanceChainSocket" methods
+
+Before: caller name found with "inspect.stack()" and the URL printed (stdout redirected to /dev/null here).
+After: endpoint passed explicitly (dict lookup) and the URL logged at DEBUG level, logging being off by default.
+
+"inspect.stack()" materialises every frame of the stack with source context, so its cost grows with stack depth:
+each case is run at several depths.
+
+Usage:
+    python benchmarks/bench_dispatch.py [calls]
+"""
+import os
+import sys
+import time
+import inspect
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from binance_dex.node_rpc import NODE_RPC_ENTRY_POINT_MAPPING, logger
+
+NODE_URL = 'http://127.0.0.1:27147'
+DEPTHS = (1, 20, 100)
+
+
+def before(para=None):
+    caller_func_name = inspect.stack()[1].function
+    request_url = NODE_URL + NODE_RPC_ENTRY_POINT_MAPPING[caller_func_name]
+    if para:
+        request_url += para
+    print('Request URL: %s ... ...' % request_url)
+    return request_url
+
+
+def after(entry_point, para=None):
+    request_url = NODE_URL + NODE_RPC_ENTRY_POINT_MAPPING[entry_point]
+    if para:
+        request_url += para
+    logger.debug('Request URL: %s', request_url)
+    return request_url
+
+
+# Same name as the public method, so that "before" finds it in the mapping
+def block(dispatch):
+    if dispatch is before:
+        return before(para='?height=10')
+    return after('block', para='?height=10')
+
+
+def _nested(depth, func, *args):
+    # Call "func" with "depth" extra frames on the stack
+    if depth <= 1:
+        return func(*args)
+    return _nested(depth - 1, func, *args)
+
+
+def _bench(dispatch, depth, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        _nested(depth, block, dispatch)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print('%-8s %14s %14s %10s' % ('depth', 'before us/call', 'after us/call', 'speedup'))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results = [(depth, _bench(before, depth, calls), _bench(after, depth, calls * 100)) for depth in DEPTHS]
+    for depth, before_s, after_s in results:
+        print('%-8s %14.1f %14.3f %9.0fx' % (depth, before_s * 1e6, after_s * 1e6, before_s / after_s))
+
+
+if __name__ == '__main__':
+    main()
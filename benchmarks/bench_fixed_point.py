@@ -0,0 +1,108 @@
+"""
+Benchmark: converting amounts of whole responses to integers of 1e-8 units
+
+Compares, on an order book of 1000 levels per side and 1000 klines rows:
+ - per-value "Decimal" (what callers typically do with the decimal strings)
+ - per-value "to_fixed8"
+ - bulk converters of "binance_dex.lib.fixed_point" ("depth_to_fixed8", "klines_to_fixed8")
+then the cost of typical arithmetic on the converted order book (total notional of both sides).
+
+Parsing a string into "int" costs about as much as into C "Decimal", per-value "to_fixed8" is slower (it is not the
+recommended API): the gain is in bulk conversion (one "int" parse per value, no per-value Python work) and in
+arithmetic.
+
+Usage:
+    python benchmarks/bench_fixed_point.py [rounds]
+"""
+import os
+import sys
+import copy
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from binance_dex.lib.fixed_point import to_fixed8, from_fixed8, depth_to_fixed8, klines_to_fixed8
+
+LEVELS = 1000
+
+
+def _depth():
+    return {'height': 7701961,
+            'asks': [[from_fixed8(100000000 + i * 100000), from_fixed8(10000000000 + i * 7)] for i in range(LEVELS)],
+            'bids': [[from_fixed8(99900000 - i * 100000), from_fixed8(20000000000 + i * 3)] for i in range(LEVELS)]}
+
+
+def _klines():
+    return [[1792346400000 + i * 3600000, '1.07000000', '1.08070000', '1.05930000', '1.07535000', '1000.00000000',
+             1792349999999 + i * 3600000, '1075.35000000', 42] for i in range(LEVELS)]
+
+
+def depth_decimal(depth):
+    for side in ('bids', 'asks'):
+        depth[side] = [(Decimal(price), Decimal(amount)) for price, amount in depth[side]]
+    return depth
+
+
+def depth_per_value(depth):
+    for side in ('bids', 'asks'):
+        depth[side] = [(to_fixed8(price), to_fixed8(amount)) for price, amount in depth[side]]
+    return depth
+
+
+def klines_decimal(rows):
+    return [[Decimal(value) if index in (1, 2, 3, 4, 5, 7) else value for index, value in enumerate(row)]
+            for row in rows]
+
+
+def klines_per_value(rows):
+    return [[to_fixed8(value) if index in (1, 2, 3, 4, 5, 7) else value for index, value in enumerate(row)]
+            for row in rows]
+
+
+def notional(depth):
+    return sum(price * amount for side in ('bids', 'asks') for price, amount in depth[side])
+
+
+def _bench(func, make_input, rounds):
+    # Inputs are prepared up front: converters work in place
+    inputs = [make_input() for _ in range(rounds)]
+    start = time.perf_counter()
+    for data in inputs:
+        func(data)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    depth, klines = _depth(), _klines()
+    assert depth_to_fixed8(copy.deepcopy(depth)) == depth_per_value(copy.deepcopy(depth))
+    assert klines_to_fixed8(klines) == klines_per_value(klines)
+
+    cases = (
+        ('depth, %s levels per side' % LEVELS, lambda: copy.deepcopy(depth),
+         (('Decimal per value', depth_decimal), ('to_fixed8 per value', depth_per_value),
+          ('depth_to_fixed8 (bulk)', depth_to_fixed8))),
+        ('klines, %s rows' % LEVELS, lambda: klines,
+         (('Decimal per value', klines_decimal), ('to_fixed8 per value', klines_per_value),
+          ('klines_to_fixed8 (bulk)', klines_to_fixed8))),
+    )
+    for title, make_input, funcs in cases:
+        print('\n%s' % title)
+        baseline = None
+        for name, func in funcs:
+            elapsed = _bench(func, make_input, rounds)
+            baseline = baseline or elapsed
+            print('  %-24s %8.3f ms / response  x%.2f' % (name, elapsed * 1000, baseline / elapsed))
+
+    print('\nnotional of depth, %s levels per side' % LEVELS)
+    baseline = None
+    for name, converted in (('Decimal', depth_decimal(copy.deepcopy(depth))),
+                            ('fixed-point', depth_to_fixed8(copy.deepcopy(depth)))):
+        elapsed = _bench(notional, lambda: converted, rounds)
+        baseline = baseline or elapsed
+        print('  %-24s %8.3f ms / response  x%.2f' % (name, elapsed * 1000, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: JSON decoders on REST response bodies
+
+Response fixtures in "benchmarks/fixtures" (records shaped as "/api/v1/tokens", "/api/v1/transactions" and
+"/api/v1/orders/closed" answers) are repeated to full page size, then decoded through "api_response_ret" with each
+installed decoder of "binance_dex.lib.json_codec".
+
+Usage:
+    python benchmarks/bench_json.py [rounds]
+"""
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from binance_dex.lib import json_codec
+from binance_dex.lib.common import api_response_ret
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# fixture file -> (key of the record list or None if body is the list, records per page)
+PAGES = {
+    'tokens.json': (None, 1000),
+    'transactions.json': ('tx', 1000),
+    'orders_closed.json': ('order', 1000),
+}
+
+
+def _load_page(name, key, size):
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        fixture = json.load(f)
+    records = fixture if key is None else fixture[key]
+    records = (records * (size // len(records) + 1))[:size]
+    if key is not None:
+        fixture[key] = records
+        fixture['total'] = size
+    else:
+        fixture = records
+    return json.dumps(fixture).encode('utf-8')
+
+
+def _bench(func, content, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(content)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print('decoders installed: %s, selected: %s' % (sorted(json_codec.DECODERS), json_codec.decoder_name))
+    for name, (key, size) in sorted(PAGES.items()):
+        content = _load_page(name, key, size)
+        print('\n%s: %s records, %.1f KB' % (name, size, len(content) / 1024.0))
+        baseline = None
+        for decoder in ('json', 'ujson', 'orjson'):
+            if decoder not in json_codec.DECODERS:
+                continue
+            json_codec.set_decoder(decoder)
+            elapsed = _bench(lambda body: api_response_ret(200, body), content, rounds)
+            baseline = baseline or elapsed
+            print('  %-7s %8.3f ms / response  x%.2f' % (decoder, elapsed * 1000, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: pooled keep-alive transport vs. per-call "requests.get"
+
+Starts the local stand-in server ("binance_dex.local_server"), then measures p50 / p99 latency and requests per
+second of "/api/v1/time" with:
+ - per-call: module level "requests.get", a new connection per request (old "binance_api_request" behaviour)
+ - pooled:   "HttpTransport", keep-alive connections reused across requests
+
+Usage:
+    python benchmarks/bench_transport.py [requests_per_thread] [threads]
+"""
+import os
+import sys
+import time
+import threading
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from binance_dex.lib.transport import HttpTransport
+from binance_dex.local_server import LocalDexServer
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(name, get, url, requests_per_thread, threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        own = []
+        for _ in range(requests_per_thread):
+            start = time.time()
+            get(url).json()
+            own.append(time.time() - start)
+        with lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.time() - start
+
+    latencies.sort()
+    print('%-10s p50=%7.3fms  p99=%7.3fms  %9.1f req/s' % (name,
+                                                          percentile(latencies, 50) * 1000,
+                                                          percentile(latencies, 99) * 1000,
+                                                          len(latencies) / elapsed))
+
+
+def main():
+    requests_per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    server = LocalDexServer().start()
+    url = '%sapi/v1/time' % server.url
+    print('%s requests x %s threads against %s' % (requests_per_thread, threads, url))
+
+    transport = HttpTransport(pool_size=threads)
+    run('per-call', requests.get, url, requests_per_thread, threads)
+    run('pooled', transport.get, url, requests_per_thread, threads)
+
+    transport.close()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
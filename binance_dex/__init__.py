@@ -0,0 +1,4 @@
+import logging
+
+# Silent unless the application configures logging, e.g. logging.basicConfig(level=logging.DEBUG)
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -1,13 +1,60 @@
 # Binance DEX API implemented based on: https://testnet-dex.binance.org/doc/api-reference/dex-api/paths.html
-import requests
+import copy
 import datetime
-from binance_dex.lib.common import binance_api_request, std_ret
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from binance_dex.lib.common import binance_api_request, std_ret, RESPONSE_DECODED, RESPONSE_MODES
+from binance_dex.lib.transport import get_transport, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+from binance_dex.lib.rate_limit import get_rate_limiter
+from binance_dex.lib.cache import ResponseCache
+from binance_dex.lib.klines import KlineColumns, MAX_KLINES_LIMIT, format_klines, kline_windows, merge_klines
+from binance_dex.lib.fixed_point import depth_to_fixed8, account_to_fixed8, klines_to_fixed8
+from binance_dex.lib.single_flight import default_single_flight
+from binance_dex.lib.failover import HedgedTransport
+from binance_dex.lib.metrics import default_metrics
+from binance_dex.market_rules import MarketRules, DEFAULT_REFRESH_INTERVAL
 
 IS_TEST_NET = False
 
 API_BASE_URL_TEST_NET = 'https://testnet-dex.binance.org/'
 API_BASE_URL_MAIN_NET = 'https://dex.binance.org/'
 
+# Official rate limits in requests per IP per second, as documented in each API below
+API_RATE_LIMITS = {
+    'time': 1,
+    'node-info': 1,
+    'validators': 10,
+    'peers': 1,
+    'tokens': 1,
+    'account': 5,
+    'account-sequence': 5,
+    'tx': 10,
+    'markets': 1,
+    'depth': 10,
+    'klines': 10,
+    'orders': 5,
+    'orders-open': 5,
+    'orders-closed': 5,
+    'broadcast': 5,
+    'transactions': 60 / 300.0,  # 60 requests per IP per 5 minutes
+    'fees': 1,
+}
+
+# Requests per IP per second of endpoints not listed in "API_RATE_LIMITS"
+DEFAULT_RATE_LIMIT = 1
+
+# Max "limit" (items per page) of orders and transactions endpoints
+MAX_PAGE_LIMIT = 1000
+
+# Time to live in seconds of cached results when cache is enabled, only slow-changing endpoints are cached
+DEFAULT_CACHE_TTLS = {
+    'tokens': 60,
+    'markets': 60,
+    'fees': 300,
+    'validators': 30,
+    'peers': 30,
+}
+
 
 class BinanceChainClient(object):
     """
@@ -15,18 +62,128 @@ class BinanceChainClient(object):
     Official Document: https://binance-chain.github.io/api-reference/dex-api/paths.html
     """
 
-    def __init__(self, is_test_net=IS_TEST_NET, api_base_url_with_port=None):
+    def __init__(self, is_test_net=IS_TEST_NET, api_base_url_with_port=None, transport=None,
+                 pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, rate_limit=True, cache=False,
+                 cache_ttls=None, cache_max_entries=256, coalesce=True, hedge_percentile=95, max_retries=2,
+                 response_mode=RESPONSE_DECODED, metrics=None):
         """
         API Client
-        :param api_base_url_with_port:
-        """
+        :param api_base_url_with_port: base url, or list of equivalent base urls, in which case GET requests are
+                                       hedged / retried across them and POST requests go to the best one
+        :param transport: customized HttpTransport, if not specified, the transport shared by all clients of the
+                          same server will be used
+        :param pool_size: max keep-alive connections of the shared transport
+        :param timeout: (connect timeout, read timeout) in seconds of the shared transport
+        :param rate_limit: if True, requests are delayed to stay within official rate limits ("API_RATE_LIMITS"),
+                           the limiter is shared by all clients (threads and asyncio tasks) of the same server
+        :param cache: if True, results of slow-changing endpoints are cached ("DEFAULT_CACHE_TTLS"), cached results
+                      are shared by all callers and should be treated as read-only
+        :param cache_ttls: {<endpoint>: <seconds>}, override / extend "DEFAULT_CACHE_TTLS"
+        :param cache_max_entries: max number of cached results, least recently used ones are evicted first
+        :param coalesce: if True, identical GET requests in flight at the same time (from any thread / task / client)
+                         are sent only once and the result is shared, shared results should be treated as read-only
+        :param hedge_percentile: with several base urls, a GET request not answered within this percentile of the
+                                 server's recent latencies is also sent to the next best server
+        :param max_retries: with several base urls, max retries of a failed GET request (connection error, 429, 5xx)
+        :param response_mode: format of "result" of successful requests:
+                              'decoded': python data (default)
+                              'raw': undecoded response body (bytes), e.g. to forward it as is
+                              'lazy': "LazyJson", body decoded only when a field is accessed
+                              Errors are always returned as usual, multi-request methods ("get_klines_range",
+                              "iter_*_orders", "iter_transactions") always decode
+        :param metrics: True to record per-endpoint timings, status codes and sizes into the shared "default_metrics",
+                        or a "binance_dex.lib.metrics.Metrics" instance, None to disable
+        """
+        if response_mode not in RESPONSE_MODES:
+            raise ValueError('response_mode should be in: %s' % (RESPONSE_MODES,))
+        self.response_mode = response_mode
 
         # "api_base_url_with_port" parameter has higher priority
         if api_base_url_with_port:
-            self.api_base_url_with_port = api_base_url_with_port \
-                if api_base_url_with_port[-1] == '/' else api_base_url_with_port + '/'
+            if isinstance(api_base_url_with_port, str):
+                api_base_url_with_port = [api_base_url_with_port]
+            self.api_base_urls = [url if url[-1] == '/' else url + '/' for url in api_base_url_with_port]
         else:
-            self.api_base_url_with_port = API_BASE_URL_TEST_NET if is_test_net else API_BASE_URL_MAIN_NET
+            self.api_base_urls = [API_BASE_URL_TEST_NET if is_test_net else API_BASE_URL_MAIN_NET]
+        # Request urls are composed against the first (primary) base url
+        self.api_base_url_with_port = self.api_base_urls[0]
+
+        # All requests go through pooled keep-alive connections
+        if transport is None:
+            transports = [self._shared_transport(url, pool_size, timeout) for url in self.api_base_urls]
+            transport = transports[0] if len(transports) == 1 else \
+                self._hedged_transport(transports, hedge_percentile, max_retries, pool_size)
+        self.transport = transport
+
+        # Official rate limits are per IP, limiter is shared by all clients of the same server
+        self.rate_limiter = get_rate_limiter(self.api_base_url_with_port, API_RATE_LIMITS,
+                                             default_rate=DEFAULT_RATE_LIMIT) if rate_limit else None
+
+        # Opt-in response cache for slow-changing endpoints
+        self.cache = None
+        if cache:
+            ttls = dict(DEFAULT_CACHE_TTLS)
+            ttls.update(cache_ttls or {})
+            self.cache = ResponseCache(ttls, max_entries=cache_max_entries)
+
+        # Coalesce identical in-flight GET requests
+        self.single_flight = default_single_flight if coalesce else None
+
+        # Opt-in request instrumentation
+        self.metrics = default_metrics if metrics is True else metrics or None
+
+        # Local market tick / lot sizes, see "get_market_rules"
+        self._market_rules = None
+
+    def _shared_transport(self, base_url, pool_size, timeout):
+        return get_transport(base_url,
+                             pool_size=pool_size,
+                             timeout=timeout)
+
+    def _hedged_transport(self, transports, hedge_percentile, max_retries, pool_size):
+        return HedgedTransport(self.api_base_urls, transports,
+                               hedge_percentile=hedge_percentile,
+                               max_retries=max_retries,
+                               max_workers=2 * pool_size * len(transports))
+
+    def _request(self, url, endpoint, method, body=None, parser=None, data=None, headers=None):
+        """
+        Single entry point of all REST requests, subclasses (e.g. async client) override this to change how requests
+        are performed
+        :param endpoint: endpoint name used for rate limiting and caching, see "API_RATE_LIMITS"
+        """
+        return binance_api_request(url=url,
+                                   method=method,
+                                   body=body,
+                                   transport=self.transport,
+                                   parser=parser,
+                                   cache=self._cache_for(endpoint),
+                                   rate_limiter=self.rate_limiter,
+                                   single_flight=self.single_flight,
+                                   endpoint=endpoint,
+                                   response_mode=self.response_mode,
+                                   metrics=self.metrics,
+                                   data=data,
+                                   headers=headers)
+
+    def _cache_for(self, endpoint):
+        return self.cache if self.cache and self.cache.cacheable(endpoint) else None
+
+    def with_options(self, response_mode=None):
+        """
+        Copy of this client with some options changed, sharing the same connection pool, rate limiter and cache, e.g.:
+            raw_body = api_client.with_options(response_mode='raw').get_tokens()['result']
+        """
+        client = copy.copy(self)
+        if response_mode is not None:
+            if response_mode not in RESPONSE_MODES:
+                raise ValueError('response_mode should be in: %s' % (RESPONSE_MODES,))
+            client.response_mode = response_mode
+        return client
+
+    def _decoded(self):
+        # Client returning decoded results, for methods working on the content of results
+        return self if self.response_mode == RESPONSE_DECODED else self.with_options(response_mode=RESPONSE_DECODED)
 
     def get_block_time(self):
         """
@@ -39,8 +196,9 @@ class BinanceChainClient(object):
             {'ap_time': '2019-03-06T04:23:45Z', 'block_time': '2019-03-06T04:23:44Z'}
         """
         url = '%sapi/v1/time' % (self.api_base_url_with_port)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='time',
+                            method='GET')
         return ret
 
     def get_node_info(self):
@@ -64,8 +222,9 @@ class BinanceChainClient(object):
             154, 245, 55, 206, 137, 191, 42, 75, 116], 'voting_power': 100000000000}}}
         """
         url = '%sapi/v1/node-info' % (self.api_base_url_with_port)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='node-info',
+                            method='GET')
         return ret
 
     def get_validators(self):
@@ -113,8 +272,9 @@ class BinanceChainClient(object):
             'voting_power': 100000000000}]}}
         """
         url = '%sapi/v1/validators' % (self.api_base_url_with_port)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='validators',
+                            method='GET')
         return ret
 
     def get_peers(self):
@@ -158,8 +318,9 @@ class BinanceChainClient(object):
             'version': '0.30.1'}]}
         """
         url = '%sapi/v1/peers' % (self.api_base_url_with_port)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='peers',
+                            method='GET')
         return ret
 
     def get_tokens(self):
@@ -176,11 +337,12 @@ class BinanceChainClient(object):
         """
 
         url = '%sapi/v1/tokens' % (self.api_base_url_with_port)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='tokens',
+                            method='GET')
         return ret
 
-    def get_account_info_by_address(self, address):
+    def get_account_info_by_address(self, address, fixed_point=False):
         """
          - Summary: Get an account.
          - Description: Gets account metadata for an address.
@@ -188,14 +350,17 @@ class BinanceChainClient(object):
          - Rate Limit: 5 requests per IP per second.
 
         :param address: <Public address>
+        :param fixed_point: if True, balances are integers of 1e-8 units, e.g. 'free': 139999250000
         :return:
         {'status': True, 'result': {'address': 'tbnb1fn9z9vn4f44ekz0a3pf80dcy2wh4d5988phjds', 'public_key': None,
         'account_number': 666547, 'sequence': 0, 'balances': [{'symbol': 'BNB', 'free': '1399.99250000',
         'locked': '0.00000000', 'frozen': '0.00000000'}]}}
         """
         url = '%sapi/v1/account/%s' % (self.api_base_url_with_port, address)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='account',
+                            method='GET',
+                            parser=account_to_fixed8 if fixed_point else None)
         return ret
 
     def get_account_sequence_by_address(self, address):
@@ -210,10 +375,46 @@ class BinanceChainClient(object):
         {'status': True, 'result': {'sequence': 17}}
         """
         url = '%sapi/v1/account/%s/sequence' % (self.api_base_url_with_port, address)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='account-sequence',
+                            method='GET')
         return ret
 
+    def iter_accounts(self, addresses, sequence_only=False, max_workers=10):
+        """
+         - Summary: Bulk account lookup.
+         - Description: Fetches account info (or only sequence) of many addresses concurrently, at most "max_workers"
+           requests in flight, within account rate limit. Results are yielded as soon as they complete, NOT in input
+           order; a failure only affects its own address.
+
+        :param addresses: iterable of addresses, consumed lazily
+        :param sequence_only: if True, use "get_account_sequence_by_address" instead of "get_account_info_by_address"
+        :param max_workers: max number of concurrent requests
+
+        :return: generator of (address, result), result in the same format as "get_account_info_by_address":
+        ('tbnb1fn9z9vn4f44ekz0a3pf80dcy2wh4d5988phjds', {'status': True, 'result': {'sequence': 17}})
+        """
+        lookup = self.get_account_sequence_by_address if sequence_only else self.get_account_info_by_address
+
+        def safe_lookup(address):
+            try:
+                return lookup(address)
+            except Exception as err:
+                return std_ret(False, err)
+
+        addresses = iter(addresses)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
+            while True:
+                # keep at most "max_workers" requests in flight
+                for address in itertools.islice(addresses, max_workers - len(pending)):
+                    pending[executor.submit(safe_lookup, address)] = address
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+
     def get_transaction(self, tx_hash):
         """
          - Summary: Get a transaction.
@@ -233,8 +434,9 @@ class BinanceChainClient(object):
         'source': '1'}}}}
         """
         url = '%sapi/v1/tx/%s?format=json' % (self.api_base_url_with_port, tx_hash)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='tx',
+                            method='GET')
         return ret
 
     def get_markets(self):
@@ -254,17 +456,38 @@ class BinanceChainClient(object):
          ... ...]}
         """
         url = '%sapi/v1/markets' % (self.api_base_url_with_port)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='markets',
+                            method='GET')
         return ret
 
+    def get_market_rules(self, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        """
+         - Summary: Get local table of market tick / lot sizes.
+         - Description: Loaded from "get_markets" on first call, then refreshed in the background every
+           "refresh_interval" seconds, later calls return the same table. Orders can be validated and rounded
+           locally before signing, see "binance_dex.market_rules.MarketRules".
+        :return:
+        {'status': True, 'result': <MarketRules>}
+        """
+        if self._market_rules is None:
+            rules = MarketRules(self, refresh_interval)
+            ret = rules.refresh()
+            if not ret['status']:
+                return ret
+            # another thread may have loaded it meanwhile
+            if self._market_rules is None:
+                self._market_rules = rules.start()
+        return std_ret(True, self._market_rules)
+
     def get_fees(self):
         url = '%sapi/v1/fees' % (self.api_base_url_with_port)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='fees',
+                            method='GET')
         return ret
 
-    def get_depth(self, symbol, limit=None):
+    def get_depth(self, symbol, limit=None, fixed_point=False):
         """
          - Summary: Get the order book.
          - Description: Gets the order book depth data for a given pair symbol.
@@ -275,6 +498,8 @@ class BinanceChainClient(object):
         :param symbol: Market pair symbol, e.g. NNB-0AD_BNB
         :param limit:
         limited to: [5, 10, 20, 50, 100, 500, 1000]
+        :param fixed_point: if True, levels are (price, quantity) integers of 1e-8 units,
+                            e.g. ['3333.00000000', '0.07398900'] -> (333300000000, 7398900)
 
         :return:
         {'status': True, 'result': {'asks': [], 'bids': [], 'height': 8034721}}
@@ -285,11 +510,14 @@ class BinanceChainClient(object):
 
         url = '%sapi/v1/depth?symbol=%s' % (self.api_base_url_with_port, symbol)
         url = url + '&limit=%s' % limit if limit else url
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='depth',
+                            method='GET',
+                            parser=depth_to_fixed8 if fixed_point else None)
         return ret
 
-    def get_klines(self, trading_pair, interval='4h', start_time=None, end_time=None, limit=300):
+    def get_klines(self, trading_pair, interval='4h', start_time=None, end_time=None, limit=300, columnar=False,
+                   fixed_point=False):
         """
          - Summary: Get candlestick bars.
          - Description: Gets candlestick/kline bars for a symbol. Bars are uniquely identified by their open time.
@@ -302,6 +530,9 @@ class BinanceChainClient(object):
         :param start_time: start time in Milliseconds
         :param end_time: end time in Milliseconds
         :param limit: default 300; max 1000.
+        :param columnar: if True, result is a "KlineColumns" (typed arrays per field, fixed-point prices in 1e-8 units,
+                         datetimes computed on demand) instead of a list of dicts, much cheaper for large responses
+        :param fixed_point: if True, prices and volumes of the dicts are integers of 1e-8 units
 
         :return:
         {'status': True, 'result': [
@@ -321,25 +552,41 @@ class BinanceChainClient(object):
                                                                   trading_pair)
         url = url + '&startTime=%s' % start_time if start_time else url
         url = url + '&endTime=%s' % end_time if end_time else url
-        res = requests.get(url)
-        status_code = res.status_code
-        if status_code == 200:
-            ret = res.json()
-            ret = [{'open_time_stamp': elem[0],
-                    'open_time_datetime': datetime.datetime.utcfromtimestamp(int(str(elem[0])[:-3])),
-                    'price_open': elem[1],
-                    'price_high': elem[2],
-                    'price_low': elem[3],
-                    'price_close': elem[4],
-                    'volume': elem[5],
-                    'close_time_stamp': elem[6],
-                    'close_time_datetime': datetime.datetime.utcfromtimestamp(int(str(elem[6])[:-3])),
-                    'quote_asset_volume': elem[7],
-                    'num_trades': elem[8]
-                    } for elem in ret]
-            return std_ret(True, ret)
+        if columnar:
+            parser = KlineColumns
         else:
-            return std_ret(False, 'Server Error, status_code=%s' % status_code)
+            parser = _format_klines_fixed8 if fixed_point else format_klines
+        ret = self._request(url=url,
+                            endpoint='klines',
+                            method='GET',
+                            parser=parser)
+        return ret
+
+    def get_klines_range(self, trading_pair, interval, start_time, end_time, max_workers=10):
+        """
+         - Summary: Get all candlestick bars in a time range.
+         - Description: Splits [start_time, end_time] into windows of at most 1000 bars aligned to the interval, fetches
+           windows concurrently (within klines rate limit), de-duplicates bars by open time and returns them in order.
+
+        :param trading_pair: <Trading Pair> example: 'BEY-8C6_BNB'
+        :param interval: same as "get_klines"
+        :param start_time: start time in Milliseconds
+        :param end_time: end time in Milliseconds
+        :param max_workers: max number of windows fetched at the same time
+
+        :return:
+        Same as "get_klines", bars sorted by "open_time_stamp"
+        """
+        if interval not in api_types_instance.allowed_kline_interval:
+            return std_ret(False, 'Interval but be in: %s' % api_types_instance.allowed_kline_interval)
+        windows = kline_windows(interval, start_time, end_time)
+        client = self._decoded()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            rets = list(executor.map(lambda window: client.get_klines(trading_pair, interval=interval,
+                                                                      start_time=window[0], end_time=window[1],
+                                                                      limit=MAX_KLINES_LIMIT),
+                                     windows))
+        return merge_klines(rets)
 
     def get_order_by_id(self, order_id):
         """
@@ -350,8 +597,9 @@ class BinanceChainClient(object):
         :return:
         """
         url = '%sapi/v1/orders/%s' % (self.api_base_url_with_port, order_id)
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='orders',
+                            method='GET')
         return ret
 
     def get_order_open(self, address, symbol=None, limit=500, offset=0, total=0):
@@ -365,8 +613,9 @@ class BinanceChainClient(object):
         url = '%sapi/v1/orders/open?address=%s&limit=%s&offset=%s&total=%s' % \
               (self.api_base_url_with_port, address, limit, offset, total)
         url = url + '&symbol=%s' % symbol if symbol else url
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='orders-open',
+                            method='GET')
         return ret
 
     def get_order_closed(self, address, end=None, side=None, start=None,
@@ -390,34 +639,42 @@ class BinanceChainClient(object):
         url = url + '&end=%s' % end if end else url
         url = url + '&side=%s' % side if side else url
         url = url + '&status=%s' % status if status else url
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='orders-closed',
+                            method='GET')
         return ret
 
     def post_broadcast(self, transaction, sync=None):
         """
-         - Summary: Get closed orders.
-         - Description: Gets closed (filled and cancelled) orders for a given address.
-         - Query Window: Default query window is latest 7 days; The maximum start - end query window is 3 months.
+         - Summary: Broadcast a transaction.
+         - Description: Broadcasts a signed transaction. A single transaction must be sent hex-encoded.
          - Rate Limit: 5 requests per IP per second.
 
+        :param transaction: signed transaction, hex-encoded (str or bytes)
+        :param sync: if True, wait for the transaction to be checked by the node (CheckTx) before returning
         :return:
+        {'status': True, 'result': [{'code': 0, 'hash': '...', 'log': 'Msg 0: ', 'ok': True}]}
         """
         url = '%sapi/v1/broadcast' % (self.api_base_url_with_port)
-        url = url + '?sync=%s' % sync if sync else url
-        ret = binance_api_request(url=url,
-                                  method='POST', body=transaction)
+        url = url + '?sync=%s' % ('true' if sync is True else sync) if sync else url
+        # the hex-encoded transaction is the raw body, not a JSON string
+        ret = self._request(url=url,
+                            endpoint='broadcast',
+                            method='POST',
+                            data=transaction,
+                            headers={'Content-Type': 'text/plain'})
         return ret
 
     def transactions(self, address, block_height=None, start_time=None, end_time=None, limit=None, offset=None,
                      side=None, tx_asset=None, tx_type=None):
         """
         Gets a list of transactions
+        Rate Limit: 60 requests per IP per 5 minutes.
         :param address: Required parameter, to indicate address
         :param non-mandatory parameters, can pass in:
          - block_height: block height, <long type>
-         - start_time: start time, The maximum query window is 3 months, <date time type>
-         - end_time: end time, The maximum query window is 3 months, <date time type>
+         - start_time: start time, The maximum query window is 3 months, <date time type> or <int> Milliseconds
+         - end_time: end time, The maximum query window is 3 months, <date time type> or <int> Milliseconds
          - limit: limits <int type>
          - offset: offset <int type>
          - side: transaction side. Allowed value: [RECEIVE, SEND], <string type>
@@ -432,9 +689,9 @@ class BinanceChainClient(object):
         if block_height:
             url += '&blockHeight=' + str(block_height)
         if start_time:
-            url += '&startTime=' + str(int(start_time.timestamp())) + '000'
+            url += '&startTime=' + str(to_milliseconds(start_time))
         if end_time:
-            url += '&endTime=' + str(int(end_time.timestamp())) + '000'
+            url += '&endTime=' + str(to_milliseconds(end_time))
         if limit:
             url += '&limit=' + str(limit)
         if offset:
@@ -450,12 +707,100 @@ class BinanceChainClient(object):
             # input data validation
             if tx_type not in Types().allowed_transactions_type:
                 raise Exception('type only allow: %s' % Types().allowed_transactions_type)
-            url += '&txType' + str(tx_type)
+            url += '&txType=' + str(tx_type)
         # perform query
-        ret = binance_api_request(url=url,
-                                  method='GET')
+        ret = self._request(url=url,
+                            endpoint='transactions',
+                            method='GET')
         return ret
 
+    def iter_open_orders(self, address, symbol=None, limit=500, prefetch=True):
+        """
+        Iterate over all open orders of an address, pages are fetched lazily ("limit" orders per page), only the
+        current page (and the prefetched next page) is held in memory
+        :param limit: orders per page, max 1000
+        :param prefetch: if True, next page is fetched in background while current page is consumed
+
+        :return: generator of orders, raise Exception if "limit" is out of range or any page fails
+        """
+        client = self._decoded()
+        return self._iter_pages(lambda offset: client.get_order_open(address, symbol=symbol, limit=limit,
+                                                                     offset=offset),
+                                key='order', limit=limit, prefetch=prefetch)
+
+    def iter_closed_orders(self, address, end=None, side=None, start=None, status=None, symbol=None, limit=500,
+                           prefetch=True):
+        """
+        Iterate over all closed orders of an address, see "iter_open_orders"
+        """
+        client = self._decoded()
+        return self._iter_pages(lambda offset: client.get_order_closed(address, end=end, side=side, start=start,
+                                                                       status=status, symbol=symbol, limit=limit,
+                                                                       offset=offset),
+                                key='order', limit=limit, prefetch=prefetch)
+
+    def iter_transactions(self, address, block_height=None, start_time=None, end_time=None, side=None,
+                          tx_asset=None, tx_type=None, limit=500, prefetch=True):
+        """
+        Iterate over all transactions of an address, see "iter_open_orders"
+        """
+        client = self._decoded()
+        return self._iter_pages(lambda offset: client.transactions(address, block_height=block_height,
+                                                                   start_time=start_time, end_time=end_time,
+                                                                   limit=limit, offset=offset, side=side,
+                                                                   tx_asset=tx_asset, tx_type=tx_type),
+                                key='tx', limit=limit, prefetch=prefetch)
+
+    @staticmethod
+    def _iter_pages(fetch_page, key, limit, prefetch):
+        # Checked before the first request: server caps pages at "MAX_PAGE_LIMIT", a larger limit would take the first
+        # (full) page for the last one
+        check_page_limit(limit)
+        return _pages(fetch_page, key, limit, prefetch)
+
+
+def check_page_limit(limit):
+    """
+    Raise Exception if "limit" (items per page) is not between 1 and "MAX_PAGE_LIMIT"
+    """
+    if not 0 < limit <= MAX_PAGE_LIMIT:
+        raise Exception('limit should be between 1 and %s, got: %s' % (MAX_PAGE_LIMIT, limit))
+
+
+def _pages(fetch_page, key, limit, prefetch):
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        offset = 0
+        pending = None
+        while True:
+            ret = pending.result() if pending else fetch_page(offset)
+            if not ret['status']:
+                raise Exception('Failed to fetch page at offset %s: %s' % (offset, ret['message']))
+            page = ret['result'].get(key) or []
+            offset += len(page)
+            has_more = len(page) >= limit
+            pending = executor.submit(fetch_page, offset) if executor and has_more else None
+            for item in page:
+                yield item
+            if not has_more:
+                return
+    finally:
+        if executor:
+            executor.shutdown(wait=False)
+
+
+def to_milliseconds(value):
+    """
+    Time as integer Milliseconds since epoch: <date time type> (sub-second part kept), or already Milliseconds
+    """
+    if isinstance(value, datetime.datetime):
+        return int(round(value.timestamp() * 1000))
+    return int(value)
+
+
+def _format_klines_fixed8(klines):
+    return format_klines(klines_to_fixed8(klines))
+
 
 class Types(object):
     """
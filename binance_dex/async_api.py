@@ -0,0 +1,258 @@
+# asyncio version of Binance DEX API, same methods and same return format as "binance_dex.api.BinanceChainClient"
+import asyncio
+import inspect
+import itertools
+from binance_dex.api import BinanceChainClient, IS_TEST_NET, api_types_instance, check_page_limit
+from binance_dex.lib.klines import MAX_KLINES_LIMIT, kline_windows, merge_klines
+from binance_dex.lib.common import async_binance_api_request, std_ret, RESPONSE_DECODED
+from binance_dex.lib.transport import get_async_transport, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+from binance_dex.lib.failover import AsyncHedgedTransport
+from binance_dex.market_rules import MarketRules, DEFAULT_REFRESH_INTERVAL
+
+
+async def _resolve(ret):
+    # Input validation errors are returned directly as "std_ret", requests are returned as coroutine
+    if inspect.isawaitable(ret):
+        ret = await ret
+    return ret
+
+
+class AsyncBinanceChainClient(BinanceChainClient):
+    """
+    asyncio API Client for Binance DEX, requires "aiohttp"
+    Every method is a coroutine returning the same result as its "BinanceChainClient" counterpart, e.g.:
+
+        api_client = AsyncBinanceChainClient(is_test_net=True)
+        ret = await api_client.get_depth('NNB-0AD_BNB', 5)
+
+    Requests of all async clients of the same server share one non-blocking connection pool.
+    """
+
+    def __init__(self, is_test_net=IS_TEST_NET, api_base_url_with_port=None, transport=None,
+                 pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, rate_limit=True, cache=False,
+                 cache_ttls=None, cache_max_entries=256, coalesce=True, hedge_percentile=95, max_retries=2,
+                 response_mode=RESPONSE_DECODED, metrics=None):
+        """
+        Async API Client
+        :param transport: customized AsyncHttpTransport, if not specified, the async transport shared by all clients
+                          of the same server will be used
+        Other parameters are the same as "BinanceChainClient"
+        """
+        super(AsyncBinanceChainClient, self).__init__(is_test_net=is_test_net,
+                                                      api_base_url_with_port=api_base_url_with_port,
+                                                      transport=transport,
+                                                      pool_size=pool_size,
+                                                      timeout=timeout,
+                                                      rate_limit=rate_limit,
+                                                      cache=cache,
+                                                      cache_ttls=cache_ttls,
+                                                      cache_max_entries=cache_max_entries,
+                                                      coalesce=coalesce,
+                                                      hedge_percentile=hedge_percentile,
+                                                      max_retries=max_retries,
+                                                      response_mode=response_mode,
+                                                      metrics=metrics)
+
+    def _shared_transport(self, base_url, pool_size, timeout):
+        return get_async_transport(base_url,
+                                   pool_size=pool_size,
+                                   timeout=timeout)
+
+    def _hedged_transport(self, transports, hedge_percentile, max_retries, pool_size):
+        return AsyncHedgedTransport(self.api_base_urls, transports,
+                                    hedge_percentile=hedge_percentile,
+                                    max_retries=max_retries)
+
+    async def _request(self, url, endpoint, method, body=None, parser=None, data=None, headers=None):
+        return await async_binance_api_request(url=url,
+                                               method=method,
+                                               body=body,
+                                               transport=self.transport,
+                                               parser=parser,
+                                               cache=self._cache_for(endpoint),
+                                               rate_limiter=self.rate_limiter,
+                                               single_flight=self.single_flight,
+                                               endpoint=endpoint,
+                                               response_mode=self.response_mode,
+                                               metrics=self.metrics,
+                                               data=data,
+                                               headers=headers)
+
+    async def close(self):
+        """
+        Close the underlying connection pool, notice it is shared by async clients of the same server by default
+        """
+        await self.transport.close()
+
+    async def get_block_time(self):
+        return await _resolve(BinanceChainClient.get_block_time(self))
+
+    async def get_node_info(self):
+        return await _resolve(BinanceChainClient.get_node_info(self))
+
+    async def get_validators(self):
+        return await _resolve(BinanceChainClient.get_validators(self))
+
+    async def get_peers(self):
+        return await _resolve(BinanceChainClient.get_peers(self))
+
+    async def get_tokens(self):
+        return await _resolve(BinanceChainClient.get_tokens(self))
+
+    async def get_account_info_by_address(self, address, fixed_point=False):
+        return await _resolve(BinanceChainClient.get_account_info_by_address(self, address, fixed_point=fixed_point))
+
+    async def get_account_sequence_by_address(self, address):
+        return await _resolve(BinanceChainClient.get_account_sequence_by_address(self, address))
+
+    async def iter_accounts(self, addresses, sequence_only=False, max_workers=10):
+        """
+        Async generator version of "BinanceChainClient.iter_accounts", "max_workers" limits concurrent requests
+        """
+        lookup = self.get_account_sequence_by_address if sequence_only else self.get_account_info_by_address
+
+        async def safe_lookup(address):
+            try:
+                return address, await lookup(address)
+            except Exception as err:
+                return address, std_ret(False, err)
+
+        addresses = iter(addresses)
+        pending = set()
+        while True:
+            for address in itertools.islice(addresses, max_workers - len(pending)):
+                pending.add(asyncio.ensure_future(safe_lookup(address)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    async def get_transaction(self, tx_hash):
+        return await _resolve(BinanceChainClient.get_transaction(self, tx_hash))
+
+    async def get_markets(self):
+        return await _resolve(BinanceChainClient.get_markets(self))
+
+    async def get_market_rules(self, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        if self._market_rules is None:
+            rules = MarketRules(self, refresh_interval)
+            ret = await rules.refresh_async()
+            if not ret['status']:
+                return ret
+            # another task may have loaded it meanwhile
+            if self._market_rules is None:
+                self._market_rules = rules.start()
+        return std_ret(True, self._market_rules)
+
+    async def get_fees(self):
+        return await _resolve(BinanceChainClient.get_fees(self))
+
+    async def get_depth(self, symbol, limit=None, fixed_point=False):
+        return await _resolve(BinanceChainClient.get_depth(self, symbol, limit=limit, fixed_point=fixed_point))
+
+    async def get_klines(self, trading_pair, interval='4h', start_time=None, end_time=None, limit=300,
+                         columnar=False, fixed_point=False):
+        return await _resolve(BinanceChainClient.get_klines(self, trading_pair, interval=interval,
+                                                            start_time=start_time, end_time=end_time, limit=limit,
+                                                            columnar=columnar, fixed_point=fixed_point))
+
+    async def get_klines_range(self, trading_pair, interval, start_time, end_time, max_workers=10):
+        """
+        Async version of "BinanceChainClient.get_klines_range", "max_workers" limits concurrent window requests
+        """
+        if interval not in api_types_instance.allowed_kline_interval:
+            return std_ret(False, 'Interval but be in: %s' % api_types_instance.allowed_kline_interval)
+        semaphore = asyncio.Semaphore(max_workers)
+        client = self._decoded()
+
+        async def fetch(window):
+            async with semaphore:
+                return await client.get_klines(trading_pair, interval=interval, start_time=window[0],
+                                               end_time=window[1], limit=MAX_KLINES_LIMIT)
+
+        rets = await asyncio.gather(*[fetch(window) for window in kline_windows(interval, start_time, end_time)])
+        return merge_klines(rets)
+
+    async def get_order_by_id(self, order_id):
+        return await _resolve(BinanceChainClient.get_order_by_id(self, order_id))
+
+    async def get_order_open(self, address, symbol=None, limit=500, offset=0, total=0):
+        return await _resolve(BinanceChainClient.get_order_open(self, address, symbol=symbol, limit=limit,
+                                                                offset=offset, total=total))
+
+    async def get_order_closed(self, address, end=None, side=None, start=None,
+                               status=None, symbol=None, limit=500, offset=0, total=0):
+        return await _resolve(BinanceChainClient.get_order_closed(self, address, end=end, side=side, start=start,
+                                                                  status=status, symbol=symbol, limit=limit,
+                                                                  offset=offset, total=total))
+
+    async def post_broadcast(self, transaction, sync=None):
+        return await _resolve(BinanceChainClient.post_broadcast(self, transaction, sync=sync))
+
+    async def transactions(self, address, block_height=None, start_time=None, end_time=None, limit=None,
+                           offset=None, side=None, tx_asset=None, tx_type=None):
+        return await _resolve(BinanceChainClient.transactions(self, address, block_height=block_height,
+                                                              start_time=start_time, end_time=end_time,
+                                                              limit=limit, offset=offset, side=side,
+                                                              tx_asset=tx_asset, tx_type=tx_type))
+
+    async def iter_open_orders(self, address, symbol=None, limit=500, prefetch=True):
+        """
+        Async generator version of "BinanceChainClient.iter_open_orders"
+        """
+        client = self._decoded()
+        async for order in self._iter_pages(lambda offset: client.get_order_open(address, symbol=symbol, limit=limit,
+                                                                                 offset=offset),
+                                            key='order', limit=limit, prefetch=prefetch):
+            yield order
+
+    async def iter_closed_orders(self, address, end=None, side=None, start=None, status=None, symbol=None,
+                                 limit=500, prefetch=True):
+        """
+        Async generator version of "BinanceChainClient.iter_closed_orders"
+        """
+        client = self._decoded()
+        async for order in self._iter_pages(lambda offset: client.get_order_closed(address, end=end, side=side,
+                                                                                   start=start, status=status,
+                                                                                   symbol=symbol, limit=limit,
+                                                                                   offset=offset),
+                                            key='order', limit=limit, prefetch=prefetch):
+            yield order
+
+    async def iter_transactions(self, address, block_height=None, start_time=None, end_time=None, side=None,
+                                tx_asset=None, tx_type=None, limit=500, prefetch=True):
+        """
+        Async generator version of "BinanceChainClient.iter_transactions"
+        """
+        client = self._decoded()
+        async for tx in self._iter_pages(lambda offset: client.transactions(address, block_height=block_height,
+                                                                            start_time=start_time, end_time=end_time,
+                                                                            limit=limit, offset=offset, side=side,
+                                                                            tx_asset=tx_asset, tx_type=tx_type),
+                                         key='tx', limit=limit, prefetch=prefetch):
+            yield tx
+
+    @staticmethod
+    async def _iter_pages(fetch_page, key, limit, prefetch):
+        check_page_limit(limit)
+        offset = 0
+        pending = None
+        try:
+            while True:
+                ret = await (pending or fetch_page(offset))
+                pending = None
+                if not ret['status']:
+                    raise Exception('Failed to fetch page at offset %s: %s' % (offset, ret['message']))
+                page = ret['result'].get(key) or []
+                offset += len(page)
+                has_more = len(page) >= limit
+                if prefetch and has_more:
+                    pending = asyncio.ensure_future(fetch_page(offset))
+                for item in page:
+                    yield item
+                if not has_more:
+                    return
+        finally:
+            if pending:
+                pending.cancel()
@@ -0,0 +1,191 @@
+# Concurrent broadcast pipeline on top of "BinanceChainClient.post_broadcast"
+import time
+import logging
+import threading
+import collections
+from concurrent.futures import Future
+from binance_dex.lib.common import std_ret
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class _Submission(object):
+    __slots__ = ('address', 'transaction', 'sync', 'future', 'callback', 'queued_at')
+
+    def __init__(self, address, transaction, sync, callback):
+        self.address = address
+        self.transaction = transaction
+        self.sync = sync
+        self.future = Future()
+        self.callback = callback
+        self.queued_at = time.monotonic()
+
+
+class BroadcastPipeline(object):
+    """
+    Broadcast signed transactions concurrently:
+     - bounded queue: "submit()" blocks (or raises "QueueFull") when "max_queue" transactions are waiting
+     - "concurrency" worker threads, transactions of different accounts are broadcast in parallel
+     - transactions of the same account are broadcast one after another, in submission order, so that sequences
+       reach the chain in order
+     - every submission returns a "concurrent.futures.Future" resolving to the "post_broadcast" result, and an optional
+       callback is called with that result (use "asyncio.wrap_future" to await it from asyncio code)
+
+    With a "SequenceManager", a transaction can be submitted as a function(sequence) returning the signed transaction,
+    sequence is reserved right before broadcasting and mismatches trigger a resync and one retry.
+
+    Sample Usage:
+        pipeline = BroadcastPipeline(api_client, concurrency=4, sequences=SequenceManager(api_client))
+        future = pipeline.submit(address, lambda sequence: sign_order(order, sequence))
+        print(future.result())  # {'status': True, 'result': [{'code': 0, 'hash': '...', 'ok': True, ...}]}
+        pipeline.close()
+    """
+
+    def __init__(self, client, concurrency=4, max_queue=1000, sync=True, sequences=None):
+        """
+        :param client: BinanceChainClient used to broadcast, its rate limiter applies
+        :param concurrency: number of transactions broadcast at the same time (worker threads)
+        :param max_queue: max number of transactions waiting to be broadcast
+        :param sync: default "sync" of "post_broadcast": True to wait for transactions to be checked by the node
+        :param sequences: optional "SequenceManager", required to submit transaction builders
+        """
+        self.client = client._decoded()
+        self.max_queue = max_queue
+        self.sync = sync
+        self.sequences = sequences
+
+        self._cond = threading.Condition()
+        self._lanes = {}                     # address -> deque of waiting submissions
+        self._ready = collections.deque()    # addresses with waiting submissions and nothing in flight
+        self._queued = 0
+        self._closed = False
+
+        # Statistics
+        self._started_at = time.monotonic()
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.total_queue_latency = 0.0
+        self.max_queue_latency = 0.0
+        self.total_broadcast_latency = 0.0
+
+        self._workers = [threading.Thread(target=self._work, name='broadcast-%s' % i) for i in range(concurrency)]
+        for worker in self._workers:
+            worker.daemon = True
+            worker.start()
+
+    def submit(self, address, transaction, sync=None, callback=None, block=True, timeout=None):
+        """
+        Queue a transaction of "address" for broadcasting
+        :param transaction: signed transaction, or function(sequence) returning it if pipeline has a SequenceManager
+        :param sync: override pipeline "sync" for this transaction
+        :param callback: function(result) called once broadcast is done, from a worker thread
+        :param block: if queue is full, wait ("timeout" seconds at most) for room, otherwise raise "QueueFull"
+
+        :return: Future of "post_broadcast" result
+        """
+        if callable(transaction) and self.sequences is None:
+            raise ValueError('A SequenceManager is required to submit transaction builders')
+        submission = _Submission(address, transaction, self.sync if sync is None else sync, callback)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('BroadcastPipeline is closed')
+            if not self._cond.wait_for(lambda: self._queued < self.max_queue or self._closed,
+                                       timeout=timeout if block else 0):
+                raise QueueFull('%s transactions waiting to be broadcast' % self._queued)
+            if self._closed:
+                raise RuntimeError('BroadcastPipeline is closed')
+            lane = self._lanes.get(address)
+            if lane is None:
+                # no lane: nothing waiting nor in flight for this account
+                lane = self._lanes[address] = collections.deque()
+                self._ready.append(address)
+            lane.append(submission)
+            submission.queued_at = time.monotonic()
+            self._queued += 1
+            self.submitted += 1
+            self._cond.notify_all()
+        return submission.future
+
+    def _work(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._ready or self._closed and not self._queued)
+                if not self._ready:
+                    return
+                address = self._ready.popleft()
+                submission = self._lanes[address].popleft()
+                self._queued -= 1
+                self._cond.notify_all()
+
+            started_at = time.monotonic()
+            ret = self._broadcast(submission)
+            done_at = time.monotonic()
+
+            with self._cond:
+                queue_latency = started_at - submission.queued_at
+                self.total_queue_latency += queue_latency
+                self.max_queue_latency = max(self.max_queue_latency, queue_latency)
+                self.total_broadcast_latency += done_at - started_at
+                if ret['status']:
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+                # next transaction of this account can go now
+                if self._lanes[address]:
+                    self._ready.append(address)
+                else:
+                    del self._lanes[address]
+                self._cond.notify_all()
+
+            submission.future.set_result(ret)
+            if submission.callback is not None:
+                try:
+                    submission.callback(ret)
+                except Exception:
+                    logger.exception('Broadcast callback of %s failed', submission.address)
+
+    def _broadcast(self, submission):
+        try:
+            if not callable(submission.transaction):
+                ret = self.client.post_broadcast(submission.transaction, sync=submission.sync)
+                if self.sequences is not None:
+                    self.sequences.report(submission.address, ret)
+                return ret
+            return self.sequences.broadcast(submission.address, submission.transaction, sync=submission.sync)
+        except Exception as err:
+            return std_ret(False, err)
+
+    def close(self, wait=True):
+        """
+        Stop accepting transactions, waiting ones are still broadcast
+        :param wait: if True, return once all transactions are broadcast
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def stats(self):
+        """
+        Sample Return:
+        {'submitted': 1000, 'succeeded': 990, 'failed': 2, 'queued': 8, 'throughput': 4.9,
+         'avg_queue_latency': 1.2, 'max_queue_latency': 3.1, 'avg_broadcast_latency': 0.2}
+        throughput in transactions per second since pipeline creation, latencies in seconds
+        """
+        with self._cond:
+            done = self.succeeded + self.failed
+            return {'submitted': self.submitted,
+                    'succeeded': self.succeeded,
+                    'failed': self.failed,
+                    'queued': self._queued,
+                    'throughput': done / (time.monotonic() - self._started_at),
+                    'avg_queue_latency': self.total_queue_latency / done if done else 0.0,
+                    'max_queue_latency': self.max_queue_latency,
+                    'avg_broadcast_latency': self.total_broadcast_latency / done if done else 0.0}
@@ -0,0 +1,149 @@
+# Local on-disk kline store, backed by SQLite, so that historical klines are only downloaded once
+import time
+import sqlite3
+import itertools
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from binance_dex.api import api_types_instance
+from binance_dex.lib.common import std_ret
+from binance_dex.lib.fixed_point import from_fixed8
+from binance_dex.lib.klines import KlineColumns, COLUMNS, MAX_KLINES_LIMIT, format_klines, kline_windows
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS klines (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    open_time INTEGER NOT NULL,
+    open INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    close INTEGER NOT NULL,
+    volume INTEGER NOT NULL,
+    close_time INTEGER NOT NULL,
+    quote_asset_volume INTEGER NOT NULL,
+    num_trades INTEGER NOT NULL,
+    PRIMARY KEY (symbol, interval, open_time)
+) WITHOUT ROWID
+"""
+
+_COLUMNS = 'open_time, open, high, low, close, volume, close_time, quote_asset_volume, num_trades'
+
+
+class KlineStore(object):
+    """
+    Klines kept in a SQLite file, keyed by (trading pair, interval, open time), amounts stored as integers of 1e-8 units
+     - get_klines(): range query answered locally, no network access
+     - sync(): fetch only bars closed after the last stored one, window by window (same windows as
+       "BinanceChainClient.get_klines_range"), each window stored as soon as it is fetched
+
+    Sample Usage:
+        store = KlineStore('klines.db', api_client)
+        store.sync('NNB-0AD_BNB', '1h', start_time=1552161600000)  # first sync needs a start time
+        klines = store.get_klines('NNB-0AD_BNB', '1h', start_time=1552161600000, columnar=True)
+    """
+
+    def __init__(self, path, client=None):
+        """
+        :param path: SQLite database file path
+        :param client: BinanceChainClient used by "sync()", not needed for local queries
+        """
+        self.client = client
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def last_close_time(self, trading_pair, interval):
+        """
+        Close time in Milliseconds of the last stored bar, None if nothing stored yet
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT MAX(close_time) FROM klines WHERE symbol = ? AND interval = ?',
+                                     (trading_pair, interval)).fetchone()
+        return row[0]
+
+    def sync(self, trading_pair, interval, start_time=None, max_workers=10):
+        """
+        Download bars closed after the last stored one (or from "start_time" if nothing stored yet), bars not closed
+        yet are skipped so that stored bars never change
+
+        Windows of 1000 bars are fetched "max_workers" at a time, parsed straight into integer columns
+        ("get_klines(columnar=True)") and stored in time order as they arrive, so at most "max_workers" windows are
+        held in memory. If a window fails, the windows before it stay stored and the next sync resumes from there.
+
+        :return:
+        {'status': True, 'result': <number of new bars stored>}
+        """
+        if self.client is None:
+            return std_ret(False, 'KlineStore needs a BinanceChainClient to sync')
+        if interval not in api_types_instance.allowed_kline_interval:
+            return std_ret(False, 'Interval but be in: %s' % api_types_instance.allowed_kline_interval)
+
+        last_close_time = self.last_close_time(trading_pair, interval)
+        if last_close_time is not None:
+            start_time = last_close_time + 1
+        elif start_time is None:
+            return std_ret(False, 'Nothing stored for %s %s yet, start_time is required' % (trading_pair, interval))
+
+        now = int(time.time() * 1000)
+        client = self.client._decoded()
+        windows = iter(kline_windows(interval, start_time, now))
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = collections.deque()
+
+        def submit(window):
+            pending.append(executor.submit(client.get_klines, trading_pair, interval=interval, start_time=window[0],
+                                           end_time=window[1], limit=MAX_KLINES_LIMIT, columnar=True))
+
+        stored = 0
+        try:
+            for window in itertools.islice(windows, max_workers):
+                submit(window)
+            while pending:
+                ret = pending.popleft().result()
+                if not ret['status']:
+                    return ret
+                window = next(windows, None)
+                if window is not None:
+                    submit(window)
+                stored += self._store(trading_pair, interval, ret['result'], now)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+        return std_ret(True, stored)
+
+    def _store(self, trading_pair, interval, klines, now):
+        # "KlineColumns" of one window, amounts already integers
+        rows = [(trading_pair, interval) + row for row in zip(*[getattr(klines, column) for column in COLUMNS])
+                if row[6] < now]
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO klines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._conn.commit()
+        return len(rows)
+
+    def get_klines(self, trading_pair, interval, start_time=None, end_time=None, columnar=False):
+        """
+        Stored bars with start_time <= open time <= end_time, sorted by open time
+
+        :param start_time: start time in Milliseconds, None for no lower bound
+        :param end_time: end time in Milliseconds, None for no upper bound
+        :param columnar: if True, return "KlineColumns", otherwise list of dicts same as "BinanceChainClient.get_klines"
+        """
+        sql = 'SELECT %s FROM klines WHERE symbol = ? AND interval = ? AND open_time BETWEEN ? AND ? ' \
+              'ORDER BY open_time' % _COLUMNS
+        with self._lock:
+            rows = self._conn.execute(sql, (trading_pair, interval,
+                                            start_time if start_time is not None else -2 ** 63,
+                                            end_time if end_time is not None else 2 ** 63 - 1)).fetchall()
+        if columnar:
+            return KlineColumns.from_rows(rows)
+        return format_klines([(row[0], from_fixed8(row[1]), from_fixed8(row[2]), from_fixed8(row[3]),
+                               from_fixed8(row[4]), from_fixed8(row[5]), row[6], from_fixed8(row[7]), row[8])
+                              for row in rows])
@@ -0,0 +1,94 @@
+"""
+Response cache for slow-changing Binance DEX REST endpoints (tokens, markets, fees, validators, peers ...).
+
+Successful results are kept for a per-endpoint TTL, memory is bounded by evicting the least recently used entries.
+When an entry expires and server returned "ETag" / "Last-Modified" for it, the next request is sent with
+"If-None-Match" / "If-Modified-Since", a "304 Not Modified" answer renews the cached result without downloading and
+decoding the payload again.
+
+Cached results are shared by all callers, please treat them as read-only.
+"""
+import time
+import threading
+import collections
+
+
+class ResponseCache(object):
+    """
+    TTL + LRU cache of standard results, keyed by request (url, parser)
+
+    :param ttls: {<endpoint>: <seconds to live>}, only endpoints listed are cached
+    :param max_entries: max number of cached results, least recently used ones are evicted first
+    """
+
+    def __init__(self, ttls, max_entries=256):
+        self.ttls = dict(ttls)
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()  # key -> [result, expires_at, etag, last_modified]
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.evictions = 0
+        self.counters = dict((endpoint, {'hits': 0, 'misses': 0, 'revalidated': 0}) for endpoint in self.ttls)
+
+    def cacheable(self, endpoint):
+        return endpoint in self.ttls
+
+    def lookup(self, endpoint, key):
+        """
+        Returns (cached result, None) if cached result is fresh,
+        otherwise (None, <conditional request headers or None>)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters[endpoint]['misses'] += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if entry[1] > time.monotonic():
+                self.counters[endpoint]['hits'] += 1
+                return entry[0], None
+            self.counters[endpoint]['misses'] += 1
+            headers = {}
+            if entry[2]:
+                headers['If-None-Match'] = entry[2]
+            if entry[3]:
+                headers['If-Modified-Since'] = entry[3]
+            return None, headers or None
+
+    def revalidated(self, endpoint, key):
+        """
+        Server answered "304 Not Modified", renew and return cached result (None if it was evicted meanwhile)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry[1] = time.monotonic() + self.ttls[endpoint]
+            self.counters[endpoint]['revalidated'] += 1
+            return entry[0]
+
+    def store(self, endpoint, key, result, headers):
+        with self._lock:
+            self._entries[key] = [result,
+                                  time.monotonic() + self.ttls[endpoint],
+                                  headers.get('ETag'),
+                                  headers.get('Last-Modified')]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Sample Return:
+        {'entries': 3, 'evictions': 0, 'endpoints': {'tokens': {'hits': 12, 'misses': 2, 'revalidated': 1}, ... ...}}
+        """
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'evictions': self.evictions,
+                    'endpoints': dict((endpoint, dict(counter)) for endpoint, counter in self.counters.items())}
@@ -1,39 +1,200 @@
-import requests
 import base58
 import codecs
 import hashlib
 import random
 import struct
 import os
+import time
+import functools
+import contextlib
+from binance_dex.lib import json_codec
+from binance_dex.lib.lazy_json import LazyJson
+from binance_dex.lib.transport import get_transport, get_async_transport
+from binance_dex.lib.failover import HedgedTransport, AsyncHedgedTransport
 
 MAX_TARGET = 0x00000000FFFF0000000000000000000000000000000000000000000000000000
 
 """ Some of the functions were referenced from https://github.com/zhuquanbin/ethereum-bip44 """
 
-def binance_api_request(url, method, body=None):
+# Format of "result" of successful requests
+RESPONSE_DECODED = 'decoded'  # decoded python data
+RESPONSE_RAW = 'raw'          # undecoded response body (bytes), "parser" is not applied
+RESPONSE_LAZY = 'lazy'        # "LazyJson", decoded on first access
+RESPONSE_MODES = (RESPONSE_DECODED, RESPONSE_RAW, RESPONSE_LAZY)
+
+
+def binance_api_request(url, method, body=None, transport=None, parser=None, cache=None, rate_limiter=None,
+                        single_flight=None, endpoint=None, response_mode=RESPONSE_DECODED, metrics=None, data=None,
+                        headers=None):
     """
      - DESCRIPTION:
         Wrapper for Binance Request and official "Error" struct
         https://testnet-dex.binance.org/doc/api-reference/dex-api/paths.html#error
+        Requests go through "transport" (pooled keep-alive connections), if not specified,
+        the shared transport of the server "url" points to will be used
+        "parser" if specified, will be applied to the decoded result of successful requests
+        "cache" if specified (a "ResponseCache"), GET results of "endpoint" are served from / stored into it
+        "rate_limiter" if specified (a "RateLimiter"), waits for a token of "endpoint" before hitting the server, and
+        before each retry / hedge of a "HedgedTransport"
+        "single_flight" if specified (a "SingleFlight"), identical concurrent GET requests are sent only once and the
+        result is shared by all callers
+        "response_mode" format of "result" of successful requests, see "RESPONSE_MODES"
+        "metrics" if specified (a "Metrics"), timings / status / size of requests sent to server are recorded under
+        "endpoint"
+        "data" if specified, POST body sent as is (str / bytes) instead of JSON encoded "body", its content type
+        should be given in "headers"
 
      - RETURN:
      {"status": <bool>,
       "message": <str>,                 # if error occur
       "result": <python data struct>}   # if status_code = 200, no error
     """
+    transport = transport or get_transport(url)
     if method.upper() == 'GET':
-        ret = requests.get(url=url)
-    elif method.upper == 'POST':
-        ret = requests.post(url=url, json=body)
+        key = (url, parser, response_mode)
+        extra_attempts = _extra_attempts(transport, HedgedTransport, rate_limiter and rate_limiter.acquire, endpoint)
+        conditional_headers = None
+        if cache is not None:
+            cached, conditional_headers = cache.lookup(endpoint, key)
+            if cached is not None:
+                return cached
+
+        def fetch():
+            if rate_limiter is not None:
+                rate_limiter.acquire(endpoint)
+            started_at = time.perf_counter()
+            with _count_errors(metrics, endpoint):
+                ret = transport.get(url=url, headers=conditional_headers, **extra_attempts)
+            if ret.status_code == 304 and cache is not None:
+                cached = cache.revalidated(endpoint, key)
+                if cached is not None:
+                    return _observed(metrics, endpoint, ret, started_at, lambda: cached)
+                if rate_limiter is not None:
+                    rate_limiter.acquire(endpoint)
+                with _count_errors(metrics, endpoint):
+                    ret = transport.get(url=url, **extra_attempts)  # evicted meanwhile, fetch again
+            return _observed(metrics, endpoint, ret, started_at,
+                             lambda: _cache_ret(cache, endpoint, key, ret, parser, response_mode))
+
+        return single_flight.do(key, fetch) if single_flight is not None else fetch()
+    elif method.upper() == 'POST':
+        if rate_limiter is not None:
+            rate_limiter.acquire(endpoint)
+        started_at = time.perf_counter()
+        with _count_errors(metrics, endpoint):
+            ret = transport.post(url=url, body=body, headers=headers, data=data)
     else:
         return std_ret(False, 'Only "GET" or "POST" is allowed for Binance Request')
-    if ret.status_code == 200:
-        return std_ret(True, ret.json())
+    return _observed(metrics, endpoint, ret, started_at,
+                     lambda: api_response_ret(ret.status_code, ret.content, parser, response_mode))
+
+
+async def async_binance_api_request(url, method, body=None, transport=None, parser=None, cache=None,
+                                    rate_limiter=None, single_flight=None, endpoint=None,
+                                    response_mode=RESPONSE_DECODED, metrics=None, data=None, headers=None):
+    """
+     - DESCRIPTION:
+        asyncio version of "binance_api_request", "transport" should be an "AsyncHttpTransport",
+        if not specified, the shared async transport of the server "url" points to will be used
+
+     - RETURN:
+        Same as "binance_api_request"
+    """
+    transport = transport or get_async_transport(url)
+    if method.upper() == 'GET':
+        key = (url, parser, response_mode)
+        extra_attempts = _extra_attempts(transport, AsyncHedgedTransport, rate_limiter and rate_limiter.acquire_async,
+                                         endpoint)
+        conditional_headers = None
+        if cache is not None:
+            cached, conditional_headers = cache.lookup(endpoint, key)
+            if cached is not None:
+                return cached
+
+        async def fetch():
+            if rate_limiter is not None:
+                await rate_limiter.acquire_async(endpoint)
+            started_at = time.perf_counter()
+            with _count_errors(metrics, endpoint):
+                ret = await transport.get(url=url, headers=conditional_headers, **extra_attempts)
+            if ret.status_code == 304 and cache is not None:
+                cached = cache.revalidated(endpoint, key)
+                if cached is not None:
+                    return _observed(metrics, endpoint, ret, started_at, lambda: cached)
+                if rate_limiter is not None:
+                    await rate_limiter.acquire_async(endpoint)
+                with _count_errors(metrics, endpoint):
+                    ret = await transport.get(url=url, **extra_attempts)  # evicted meanwhile, fetch again
+            return _observed(metrics, endpoint, ret, started_at,
+                             lambda: _cache_ret(cache, endpoint, key, ret, parser, response_mode))
+
+        return await (single_flight.do_async(key, fetch) if single_flight is not None else fetch())
+    elif method.upper() == 'POST':
+        if rate_limiter is not None:
+            await rate_limiter.acquire_async(endpoint)
+        started_at = time.perf_counter()
+        with _count_errors(metrics, endpoint):
+            ret = await transport.post(url=url, body=body, headers=headers, data=data)
     else:
-        try:
-            return std_ret(False, ret.json()['message'])
-        except Exception as err:
-            return std_ret(False, '%s, exception: %s' % (ret, err))
+        return std_ret(False, 'Only "GET" or "POST" is allowed for Binance Request')
+    return _observed(metrics, endpoint, ret, started_at,
+                     lambda: api_response_ret(ret.status_code, ret.content, parser, response_mode))
+
+
+def _extra_attempts(transport, hedged_cls, acquire, endpoint):
+    # Retries / hedges of failover transports take their own rate limiter token
+    if acquire is None or not isinstance(transport, hedged_cls):
+        return {}
+    return {'acquire': functools.partial(acquire, endpoint)}
+
+
+@contextlib.contextmanager
+def _count_errors(metrics, endpoint):
+    # Record requests which got no response
+    try:
+        yield
+    except Exception:
+        if metrics is not None:
+            metrics.observe_error(endpoint)
+        raise
+
+
+def _observed(metrics, endpoint, response, started_at, compose):
+    # "compose" builds the standard return from response, timed as decoding
+    if metrics is None:
+        return compose()
+    received_at = time.perf_counter()
+    ret = compose()
+    metrics.observe(endpoint, response, received_at - started_at, time.perf_counter() - received_at)
+    return ret
+
+
+def _cache_ret(cache, endpoint, key, response, parser, response_mode):
+    ret = api_response_ret(response.status_code, response.content, parser, response_mode)
+    if cache is not None and ret['status']:
+        cache.store(endpoint, key, ret, response.headers)
+    return ret
+
+
+def api_response_ret(status_code, content, parser=None, response_mode=RESPONSE_DECODED):
+    """
+    Compose standard return from HTTP status code and raw response body, body is decoded only once
+    With "response_mode" raw / lazy, body of successful requests is not decoded here, error bodies always are
+    """
+    if status_code == 200 and response_mode == RESPONSE_RAW:
+        return std_ret(True, content)
+    if status_code == 200 and response_mode == RESPONSE_LAZY:
+        return std_ret(True, LazyJson(content, parser))
+    try:
+        data = json_codec.loads(content)
+    except Exception as err:
+        return std_ret(False, '<Response [%s]>, exception: %s' % (status_code, err))
+    if status_code == 200:
+        return std_ret(True, parser(data) if parser else data)
+    try:
+        return std_ret(False, data['message'])
+    except Exception as err:
+        return std_ret(False, '<Response [%s]>, exception: %s' % (status_code, err))
 
 
 def std_ret(status, data):
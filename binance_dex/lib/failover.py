@@ -0,0 +1,363 @@
+"""
+Hedged requests and failover across several equivalent REST servers.
+
+"HedgedTransport" / "AsyncHedgedTransport" take the same interface as "HttpTransport" / "AsyncHttpTransport", requests
+are composed against the first (primary) base url and sent to whichever server currently looks best:
+ - latency (EWMA + recent samples) and error rate are tracked per server, servers are ranked by both
+ - GET requests (idempotent) that did not answer within a percentile of the server's recent latencies get a hedged
+   duplicate sent to the next best server, the first good answer wins. Hedges are limited to a fraction of requests
+   so that load is not doubled
+ - failed GET requests (connection error, 429 or 5xx) are retried with jittered exponential backoff, a 429 is retried
+   after its "Retry-After" delay, or returned as is if that is longer than "MAX_RETRY_AFTER"
+ - retries and hedges are extra requests: "acquire" (e.g. taking a rate limiter token) is called before each of them
+ - POST requests (e.g. broadcast) are never duplicated nor retried, only routed to the best server
+"""
+import time
+import random
+import asyncio
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+
+# Number of recent latencies kept per server to compute hedge deadline
+LATENCY_SAMPLES = 200
+# Hedge deadline used until a server has enough latency samples
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_LATENCY_SAMPLES = 20
+# Never hedge requests faster than this (seconds)
+MIN_HEDGE_DELAY = 0.05
+# Smoothing factor of latency / error rate EWMA
+EWMA_ALPHA = 0.1
+# Fraction of requests sent to a random server, so that recovered / faster servers are noticed
+EXPLORE_RATIO = 0.02
+# Longest "Retry-After" (seconds) of a 429 waited for before retrying
+MAX_RETRY_AFTER = 10
+
+
+def _is_retryable(status_code):
+    return status_code == 429 or status_code >= 500
+
+
+def _backoff(attempt, base=0.1, cap=2.0):
+    # "Full jitter" exponential backoff
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _retry_delay(response, attempt):
+    # Seconds to wait before retrying, None if the request should not be retried
+    delay = _backoff(attempt)
+    if response is None or response.status_code != 429:
+        return delay
+    try:
+        retry_after = float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return delay  # no delay given (or an HTTP date), back off as usual
+    return max(delay, retry_after) if retry_after <= MAX_RETRY_AFTER else None
+
+
+class ServerStats(object):
+    """
+    Latency and error rate of one server
+    """
+
+    def __init__(self, base_url, transport):
+        self.base_url = base_url
+        self.transport = transport
+        self.requests = 0
+        self.errors = 0
+        self.latency_ewma = 0.0
+        self.error_rate = 0.0
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, latency, error):
+        with self._lock:
+            self.requests += 1
+            self.errors += 1 if error else 0
+            self.error_rate += EWMA_ALPHA * ((1.0 if error else 0.0) - self.error_rate)
+            if not error:
+                self.latencies.append(latency)
+                self.latency_ewma = latency if not self.latency_ewma else \
+                    self.latency_ewma + EWMA_ALPHA * (latency - self.latency_ewma)
+
+    def score(self):
+        # Lower is better, unknown servers (no latency yet) are tried first
+        return self.latency_ewma * (1 + 10 * self.error_rate) + self.error_rate
+
+    def percentile(self, pct):
+        with self._lock:
+            if len(self.latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+    def hedge_delay(self, pct):
+        delay = self.percentile(pct)
+        return DEFAULT_HEDGE_DELAY if delay is None else max(MIN_HEDGE_DELAY, delay)
+
+    def stats(self):
+        return {'requests': self.requests,
+                'errors': self.errors,
+                'error_rate': self.error_rate,
+                'latency_ewma': self.latency_ewma,
+                'p50': self.percentile(50),
+                'p99': self.percentile(99)}
+
+
+class _HedgingPolicy(object):
+
+    def __init__(self, base_urls, transports, hedge_percentile=95, max_hedge_ratio=0.1, max_retries=2):
+        """
+        :param base_urls: equivalent base urls, the first one is used to compose request urls
+        :param transports: transport of each base url, in the same order
+        :param hedge_percentile: a GET not answered within this percentile of the server's latency gets hedged
+        :param max_hedge_ratio: max fraction of GET requests allowed to be hedged
+        :param max_retries: max retries of a failed GET request
+        """
+        self.servers = [ServerStats(base_url, transport) for base_url, transport in zip(base_urls, transports)]
+        self.primary_base_url = base_urls[0]
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.gets = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.retries = 0
+
+    def _path(self, url):
+        return url[len(self.primary_base_url):] if url.startswith(self.primary_base_url) else None
+
+    def _ranked(self):
+        ranked = sorted(self.servers, key=ServerStats.score)
+        if len(ranked) > 1 and random.random() < EXPLORE_RATIO:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def _take_hedge(self):
+        with self._lock:
+            if self.hedged < self.max_hedge_ratio * self.gets:
+                self.hedged += 1
+                return True
+            return False
+
+    def _count_get(self):
+        with self._lock:
+            self.gets += 1
+
+    def _count_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def _count_hedge_win(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self):
+        """
+        Sample Return:
+        {'gets': 1000, 'hedged': 42, 'hedge_wins': 30, 'retries': 3,
+         'servers': {'https://dex.binance.org/': {'requests': 990, 'errors': 2, 'error_rate': 0.01,
+                     'latency_ewma': 0.12, 'p50': 0.11, 'p99': 0.42}, ... ...}}
+        """
+        return {'gets': self.gets,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+                'retries': self.retries,
+                'servers': dict((server.base_url, server.stats()) for server in self.servers)}
+
+
+class HedgedTransport(_HedgingPolicy):
+    """
+    Thread-safe hedging / failover transport over several "HttpTransport", see module doc
+    :param max_workers: max number of requests in flight through this transport
+    """
+
+    def __init__(self, base_urls, transports, hedge_percentile=95, max_hedge_ratio=0.1, max_retries=2,
+                 max_workers=32):
+        super(HedgedTransport, self).__init__(base_urls, transports, hedge_percentile=hedge_percentile,
+                                              max_hedge_ratio=max_hedge_ratio, max_retries=max_retries)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _send(self, server, method, path, body, headers, data=None, acquire=None):
+        if acquire is not None:
+            acquire()
+        start = time.monotonic()
+        try:
+            response = server.transport.request(method, server.base_url + path, body=body, headers=headers,
+                                                data=data)
+        except Exception:
+            server.record(time.monotonic() - start, error=True)
+            raise
+        server.record(time.monotonic() - start, error=_is_retryable(response.status_code))
+        return response
+
+    def request(self, method, url, body=None, headers=None, data=None, acquire=None):
+        """
+        :param acquire: function called before each retry / hedge of a GET, e.g. to take a rate limiter token
+        """
+        path = self._path(url)
+        if path is None:  # not a url of these servers, send as is
+            return self.servers[0].transport.request(method, url, body=body, headers=headers, data=data)
+        if method.upper() != 'GET':
+            return self._send(self._ranked()[0], method, path, body, headers, data)
+
+        self._count_get()
+        response, error = None, None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = _retry_delay(response, attempt)
+                if delay is None:
+                    break
+                self._count_retry()
+                time.sleep(delay)
+                if acquire is not None:
+                    acquire()
+            try:
+                response = self._hedged_get(self._ranked(), path, headers, acquire)
+            except Exception as err:
+                error = err
+                continue
+            if not _is_retryable(response.status_code):
+                return response
+        if response is not None:
+            return response
+        raise error
+
+    def _hedged_get(self, ranked, path, headers, acquire):
+        primary = self._executor.submit(self._send, ranked[0], 'GET', path, None, headers)
+        if len(ranked) < 2:
+            return primary.result()
+        try:
+            return primary.result(timeout=ranked[0].hedge_delay(self.hedge_percentile))
+        except FutureTimeoutError:
+            if not self._take_hedge():
+                return primary.result()
+        hedge = self._executor.submit(self._send, ranked[1], 'GET', path, None, headers, None, acquire)
+
+        # First good answer wins, the other one is left to finish in background
+        pending = {primary, hedge}
+        response, error = None, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as err:
+                    error = err
+                    continue
+                if not _is_retryable(response.status_code):
+                    if future is hedge:
+                        self._count_hedge_win()
+                    return response
+        if response is not None:
+            return response
+        raise error
+
+    def get(self, url, headers=None, acquire=None):
+        return self.request('GET', url, headers=headers, acquire=acquire)
+
+    def post(self, url, body=None, headers=None, data=None):
+        return self.request('POST', url, body=body, headers=headers, data=data)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        for server in self.servers:
+            server.transport.close()
+
+
+class AsyncHedgedTransport(_HedgingPolicy):
+    """
+    asyncio hedging / failover transport over several "AsyncHttpTransport", see module doc
+    """
+
+    async def _send(self, server, method, path, body, headers, data=None, acquire=None):
+        if acquire is not None:
+            await acquire()
+        start = time.monotonic()
+        try:
+            response = await server.transport.request(method, server.base_url + path, body=body, headers=headers,
+                                                      data=data)
+        except asyncio.CancelledError:
+            raise  # lost the race against a hedge, not an error of the server
+        except Exception:
+            server.record(time.monotonic() - start, error=True)
+            raise
+        server.record(time.monotonic() - start, error=_is_retryable(response.status_code))
+        return response
+
+    async def request(self, method, url, body=None, headers=None, data=None, acquire=None):
+        """
+        :param acquire: coroutine function awaited before each retry / hedge of a GET
+        """
+        path = self._path(url)
+        if path is None:
+            return await self.servers[0].transport.request(method, url, body=body, headers=headers, data=data)
+        if method.upper() != 'GET':
+            return await self._send(self._ranked()[0], method, path, body, headers, data)
+
+        self._count_get()
+        response, error = None, None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = _retry_delay(response, attempt)
+                if delay is None:
+                    break
+                self._count_retry()
+                await asyncio.sleep(delay)
+                if acquire is not None:
+                    await acquire()
+            try:
+                response = await self._hedged_get(self._ranked(), path, headers, acquire)
+            except Exception as err:
+                error = err
+                continue
+            if not _is_retryable(response.status_code):
+                return response
+        if response is not None:
+            return response
+        raise error
+
+    async def _hedged_get(self, ranked, path, headers, acquire):
+        primary = asyncio.ensure_future(self._send(ranked[0], 'GET', path, None, headers))
+        if len(ranked) < 2:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=ranked[0].hedge_delay(self.hedge_percentile))
+        if done or not self._take_hedge():
+            return await primary
+        hedge = asyncio.ensure_future(self._send(ranked[1], 'GET', path, None, headers, acquire=acquire))
+
+        # First good answer wins, the other one is cancelled
+        pending = {primary, hedge}
+        response, error = None, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except Exception as err:
+                        error = err
+                        continue
+                    if not _is_retryable(response.status_code):
+                        if task is hedge:
+                            self._count_hedge_win()
+                        return response
+        finally:
+            for task in pending:
+                task.cancel()
+        if response is not None:
+            return response
+        raise error
+
+    async def get(self, url, headers=None, acquire=None):
+        return await self.request('GET', url, headers=headers, acquire=acquire)
+
+    async def post(self, url, body=None, headers=None, data=None):
+        return await self.request('POST', url, body=body, headers=headers, data=data)
+
+    async def close(self):
+        for server in self.servers:
+            await server.transport.close()
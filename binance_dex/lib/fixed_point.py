@@ -0,0 +1,140 @@
+"""
+Fixed-point helpers for Binance Chain amounts.
+
+Binance Chain keeps every amount as an integer of 1e-8 units, the REST API renders them as decimal strings with
+8 fraction digits (e.g. '3333.00000000'). Parsing them back into scaled integers is exact, parsing costs about as much
+as "Decimal" (C implementation), the gain is in later arithmetic which is plain integer arithmetic.
+
+Converters below work on whole decoded responses ("get_depth", "get_klines", "get_account_info_by_address" and websocket
+stream messages), all amounts of a response are parsed in one bulk call. See "benchmarks/bench_fixed_point.py".
+"""
+from operator import itemgetter
+from itertools import chain
+
+# Binance Chain native precision: 1 unit = 1e-8
+PRECISION = 8
+SCALE = 10 ** PRECISION
+
+# Character where the decimal point sits in amounts rendered with 8 fraction digits
+_POINT_POSITION = itemgetter(-PRECISION - 1)
+
+
+def to_fixed8(value):
+    """
+    Parse decimal string into integer of 1e-8 units, e.g. '3333.00000000' -> 333300000000, '0.5' -> 50000000
+    Raise ValueError if the string has more than 8 fraction digits (not representable exactly)
+    Slower than "Decimal(value)" for a single value: to convert many amounts use "to_fixed8_list" or the whole-response
+    converters below
+    """
+    integer, _, fraction = value.partition('.')
+    if len(fraction) != PRECISION:
+        if len(fraction) > PRECISION:
+            raise ValueError('More than %s fraction digits: %s' % (PRECISION, value))
+        fraction = fraction.ljust(PRECISION, '0')
+    return int(integer + fraction)
+
+
+def from_fixed8(value):
+    """
+    Render integer of 1e-8 units as decimal string, e.g. 333300000000 -> '3333.00000000'
+    """
+    sign = '-' if value < 0 else ''
+    integer, fraction = divmod(abs(value), SCALE)
+    return '%s%d.%08d' % (sign, integer, fraction)
+
+
+def to_fixed8_list(values):
+    """
+    Bulk version of "to_fixed8": parse a sequence of decimal strings into a list of integers of 1e-8 units
+    When every value has exactly 8 fraction digits (as returned by server), points are checked and stripped in bulk
+    and values converted without per-value Python work, otherwise falls back to "to_fixed8" one by one
+    """
+    if not values:
+        return []
+    joined = ','.join(values)
+    try:
+        if joined.count('.') == len(values) and set(map(_POINT_POSITION, values)) == {'.'}:
+            return list(map(int, joined.replace('.', '').split(',')))
+    except IndexError:
+        pass  # value shorter than 8 fraction digits
+    return [to_fixed8(value) for value in values]
+
+
+# Whole-response converters: amounts parsed in bulk and replaced in place, the converted response is returned
+
+def levels_to_fixed8(levels):
+    """
+    Order book levels [['3333.00000000', '0.07398900'], ...] -> [(333300000000, 7398900), ...]
+    """
+    values = to_fixed8_list(list(chain.from_iterable(levels)))
+    return list(zip(values[0::2], values[1::2]))
+
+
+def records_to_fixed8(records, fields):
+    """
+    Convert "fields" of every dict in "records", missing fields and empty strings are left as is
+    """
+    slots = [(record, field) for record in records for field in fields if record.get(field)]
+    for (record, field), value in zip(slots, to_fixed8_list([record[field] for record, field in slots])):
+        record[field] = value
+    return records
+
+
+def depth_to_fixed8(depth):
+    """
+    "get_depth" result, "marketDepth" (bids / asks) or "marketDiff" (b / a) stream data
+    """
+    for side in ('bids', 'asks', 'b', 'a'):
+        if side in depth:
+            depth[side] = levels_to_fixed8(depth[side])
+    return depth
+
+
+def account_to_fixed8(account):
+    """
+    "get_account_info_by_address" result: free / locked / frozen of every balance
+    """
+    records_to_fixed8(account.get('balances') or [], ('free', 'locked', 'frozen'))
+    return account
+
+
+def klines_to_fixed8(raw_klines):
+    """
+    Raw klines rows [[open_time, open, high, low, close, volume, close_time, quote_asset_volume, num_trades], ...]
+    """
+    rows = [list(row) for row in raw_klines]
+    for index in (1, 2, 3, 4, 5, 7):
+        for row, value in zip(rows, to_fixed8_list([row[index] for row in rows])):
+            row[index] = value
+    return rows
+
+
+# Amount fields of websocket streams, see "binance_dex.sockets"
+_TICKER_FIELDS = ('p', 'w', 'x', 'c', 'Q', 'b', 'B', 'a', 'A', 'o', 'h', 'l', 'v', 'q')
+_STREAM_FIELDS = {
+    'trades': ('p', 'q'),
+    'orders': ('q', 'p', 'l', 'L', 'z'),
+    'ticker': _TICKER_FIELDS,
+    'allTickers': _TICKER_FIELDS,
+    'miniTicker': ('c', 'o', 'h', 'l', 'v', 'q'),
+    'allMiniTickers': ('c', 'o', 'h', 'l', 'v', 'q'),
+}
+
+
+def stream_to_fixed8(message):
+    """
+    Convert amounts of a decoded websocket message {"stream": ..., "data": ...} (trades, orders, accounts, transfers,
+    marketDepth, marketDiff, kline, tickers), messages of other streams are returned unchanged
+    """
+    stream, data = message.get('stream'), message.get('data')
+    if stream in _STREAM_FIELDS:
+        records_to_fixed8(data if isinstance(data, list) else [data], _STREAM_FIELDS[stream])
+    elif stream in ('marketDepth', 'marketDiff'):
+        depth_to_fixed8(data)
+    elif stream == 'accounts':
+        records_to_fixed8(data.get('B') or [], ('f', 'r', 'l'))
+    elif stream == 'transfers':
+        records_to_fixed8([coin for transfer in data.get('t') or [] for coin in transfer.get('c') or []], ('A',))
+    elif stream and stream.startswith('kline') and 'k' in data:
+        records_to_fixed8([data['k']], ('o', 'c', 'h', 'l', 'v', 'q'))
+    return message
@@ -0,0 +1,52 @@
+"""
+Pluggable JSON decoder for REST responses.
+
+The fastest installed library is picked automatically: "orjson", then "ujson", falling back to the standard "json".
+Decoders take the raw response body (bytes, "str" works too) so that it is not copied into a "str" first.
+
+Notice "orjson" converts integers beyond 64 bits to float, Binance DEX amounts are strings so results are the same,
+call "set_decoder('json')" to be strictly equivalent to the standard library.
+"""
+import json
+
+
+DECODERS = {'json': json.loads}
+
+try:
+    import orjson
+    DECODERS['orjson'] = orjson.loads
+except ImportError:
+    pass
+
+try:
+    import ujson
+    DECODERS['ujson'] = ujson.loads
+except ImportError:
+    pass
+
+# In order of preference
+_PREFERENCE = ('orjson', 'ujson', 'json')
+
+decoder_name = next(name for name in _PREFERENCE if name in DECODERS)
+_loads = DECODERS[decoder_name]
+
+
+def loads(content):
+    """
+    Decode raw response body (bytes) with the selected decoder
+    """
+    return _loads(content)
+
+
+def set_decoder(decoder):
+    """
+    Select the decoder used by all clients
+    :param decoder: name in "DECODERS" ('orjson', 'ujson', 'json'), or a callable taking bytes and returning python data
+    """
+    global _loads, decoder_name
+    if callable(decoder):
+        _loads, decoder_name = decoder, getattr(decoder, '__name__', 'custom')
+    elif decoder in DECODERS:
+        _loads, decoder_name = DECODERS[decoder], decoder
+    else:
+        raise ValueError('decoder should be a callable or one of: %s' % sorted(DECODERS))
@@ -0,0 +1,145 @@
+"""
+Columnar container for kline (candlestick) results.
+
+Instead of one dict per bar, each field is kept in one contiguous typed array:
+ - open_time / close_time: int64 timestamps in Milliseconds
+ - open / high / low / close / volume / quote_asset_volume: int64 fixed-point amounts in 1e-8 units
+ - num_trades: int64
+Datetimes are only computed when asked for, vectorized through numpy when it is installed.
+
+Also helpers shared by klines clients ("BinanceChainClient", "AsyncBinanceChainClient", "KlineStore"): splitting a time
+range into windows of at most 1000 bars, merging results of windows, formatting raw klines as dicts.
+"""
+import datetime
+from array import array
+from binance_dex.lib.common import std_ret
+from binance_dex.lib.fixed_point import to_fixed8_list, SCALE
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# In the same order as raw klines response
+COLUMNS = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume', 'num_trades')
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'quote_asset_volume')
+
+# Max bars returned by one klines request
+MAX_KLINES_LIMIT = 1000
+# Length of kline intervals in Milliseconds, "1M" uses the shortest month so that a window never holds more than
+# "MAX_KLINES_LIMIT" bars
+KLINE_INTERVAL_MS = {
+    '1m': 60 * 1000,
+    '3m': 3 * 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '2h': 2 * 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '6h': 6 * 60 * 60 * 1000,
+    '8h': 8 * 60 * 60 * 1000,
+    '12h': 12 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+    '3d': 3 * 24 * 60 * 60 * 1000,
+    '1w': 7 * 24 * 60 * 60 * 1000,
+    '1M': 28 * 24 * 60 * 60 * 1000,
+}
+
+
+class KlineColumns(object):
+    """
+    Klines as columns, built from raw klines response:
+    [[open_time, open, high, low, close, volume, close_time, quote_asset_volume, num_trades], ... ...]
+    """
+
+    def __init__(self, raw_klines):
+        columns = list(zip(*raw_klines)) if raw_klines else [()] * 9
+        self.open_time = array('q', columns[0])
+        self.open = array('q', to_fixed8_list(columns[1]))
+        self.high = array('q', to_fixed8_list(columns[2]))
+        self.low = array('q', to_fixed8_list(columns[3]))
+        self.close = array('q', to_fixed8_list(columns[4]))
+        self.volume = array('q', to_fixed8_list(columns[5]))
+        self.close_time = array('q', columns[6])
+        self.quote_asset_volume = array('q', to_fixed8_list(columns[7]))
+        self.num_trades = array('q', columns[8])
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build from already parsed rows:
+        [(open_time, open, high, low, close, volume, close_time, quote_asset_volume, num_trades), ... ...]
+        with amounts as integers of 1e-8 units
+        """
+        columns = list(zip(*rows)) if rows else [()] * 9
+        klines = cls.__new__(cls)
+        for name, column in zip(COLUMNS, columns):
+            setattr(klines, name, array('q', column))
+        return klines
+
+    def __len__(self):
+        return len(self.open_time)
+
+    def open_time_datetime(self):
+        return _to_datetimes(self.open_time)
+
+    def close_time_datetime(self):
+        return _to_datetimes(self.close_time)
+
+    def to_float(self, column):
+        """
+        Convert a fixed-point column (e.g. 'close') to floats, numpy array if numpy is installed
+        """
+        if column not in PRICE_COLUMNS:
+            raise ValueError('column should be in: %s' % (PRICE_COLUMNS,))
+        values = getattr(self, column)
+        if numpy is not None:
+            return numpy.frombuffer(values, dtype=numpy.int64) / float(SCALE)
+        return [value / float(SCALE) for value in values]
+
+
+def _to_datetimes(timestamps):
+    # numpy: zero-copy view of the int64 array converted in one vectorized call
+    if numpy is not None:
+        return numpy.frombuffer(timestamps, dtype=numpy.int64).astype('datetime64[ms]')
+    epoch = datetime.datetime(1970, 1, 1)
+    return [epoch + datetime.timedelta(milliseconds=ts) for ts in timestamps]
+
+
+def kline_windows(interval, start_time, end_time):
+    # [(start, end), ...] in Milliseconds, each window holds at most "MAX_KLINES_LIMIT" bars
+    interval_ms = KLINE_INTERVAL_MS[interval]
+    window_ms = interval_ms * MAX_KLINES_LIMIT
+    window_start = start_time - start_time % interval_ms
+    windows = []
+    while window_start <= end_time:
+        windows.append((max(window_start, start_time), min(window_start + window_ms - 1, end_time)))
+        window_start += window_ms
+    return windows
+
+
+def merge_klines(rets):
+    # Merge results of "get_klines" into one series, de-duplicated by open time
+    bars = {}
+    for ret in rets:
+        if not ret['status']:
+            return ret
+        for bar in ret['result']:
+            bars[bar['open_time_stamp']] = bar
+    return std_ret(True, [bars[open_time] for open_time in sorted(bars)])
+
+
+def format_klines(klines):
+    return [{'open_time_stamp': elem[0],
+             'open_time_datetime': datetime.datetime.utcfromtimestamp(elem[0] // 1000),
+             'price_open': elem[1],
+             'price_high': elem[2],
+             'price_low': elem[3],
+             'price_close': elem[4],
+             'volume': elem[5],
+             'close_time_stamp': elem[6],
+             'close_time_datetime': datetime.datetime.utcfromtimestamp(elem[6] // 1000),
+             'quote_asset_volume': elem[7],
+             'num_trades': elem[8]
+             } for elem in klines]
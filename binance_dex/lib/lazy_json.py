@@ -0,0 +1,67 @@
+"""
+Lazily decoded JSON response body.
+
+"LazyJson" keeps the raw response bytes and only decodes them (once) when a field is accessed, so that results which
+are only forwarded elsewhere never pay for decoding: send "lazy.raw" as is.
+"""
+from binance_dex.lib import json_codec
+
+
+class LazyJson(object):
+    """
+    Raw JSON body, decoded on first access:
+     - raw: undecoded bytes, never triggers decoding
+     - data: decoded (and parsed, if a parser was given) python data
+     - lazy['key'], lazy[0], len(lazy), iter(lazy), 'key' in lazy, lazy.get('key'), lazy.items() ...: same as on "data"
+    """
+    __slots__ = ('raw', '_parser', '_data', '_decoded')
+
+    def __init__(self, raw, parser=None):
+        self.raw = raw
+        self._parser = parser
+        self._data = None
+        self._decoded = False
+
+    @property
+    def data(self):
+        # Decoding twice from two threads gives equal results, no lock needed
+        if not self._decoded:
+            data = json_codec.loads(self.raw)
+            self._data = self._parser(data) if self._parser else data
+            self._decoded = True
+        return self._data
+
+    @property
+    def decoded(self):
+        return self._decoded
+
+    def __getitem__(self, item):
+        return self.data[item]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, item):
+        return item in self.data
+
+    def __eq__(self, other):
+        return self.data == (other.data if isinstance(other, LazyJson) else other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __getattr__(self, name):
+        # dict / list methods: get, keys, items, values, index ...
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.data, name)
+
+    def __repr__(self):
+        if self._decoded:
+            return 'LazyJson(%r)' % (self._data,)
+        return 'LazyJson(<%s bytes>)' % len(self.raw)
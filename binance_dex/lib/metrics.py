@@ -0,0 +1,171 @@
+"""
+In-process request metrics of the REST client, per endpoint ('time', 'depth', 'klines', 'account' ...):
+ - responses / errors counters, by HTTP status code
+ - histograms of total time, time to first byte, DNS and connect (TCP + TLS) time, payload size and decode time
+
+Histograms have fixed buckets: recording is a counter increment, cheap enough to stay enabled in production.
+Export with "snapshot()" (dict) or "prometheus()" (Prometheus text exposition format).
+
+Notice "requests" / urllib3 do not expose DNS and connect phases: sync clients record total, first byte (time until
+response headers were parsed), size and decode time; async clients ("aiohttp") record all phases, DNS / connect only
+when a new connection was opened.
+"""
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name -> (buckets, unit, help)
+HISTOGRAMS = {
+    'total': (LATENCY_BUCKETS, 'seconds', 'Time from sending request to response body received'),
+    'first_byte': (LATENCY_BUCKETS, 'seconds', 'Time from sending request to response headers received'),
+    'dns': (LATENCY_BUCKETS, 'seconds', 'DNS resolution time, only when a new connection was opened'),
+    'connect': (LATENCY_BUCKETS, 'seconds', 'TCP + TLS connection time, only when a new connection was opened'),
+    'decode': (LATENCY_BUCKETS, 'seconds', 'Response body decoding time'),
+    'size': (SIZE_BUCKETS, 'bytes', 'Response body size'),
+}
+
+
+class Histogram(object):
+    """
+    Fixed buckets histogram, not thread-safe by itself ("Metrics" holds the lock)
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-quantile, None if empty or beyond last bucket
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if count and cumulative >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        return {'count': self.count,
+                'sum': self.sum,
+                'avg': self.sum / self.count if self.count else 0.0,
+                'p50': self.quantile(0.5),
+                'p99': self.quantile(0.99),
+                'buckets': dict(zip(self.buckets + ('+Inf',), self.counts))}
+
+
+class _EndpointMetrics(object):
+    def __init__(self):
+        self.responses = {}  # status code -> count
+        self.errors = 0      # requests which got no response (connection error, timeout ...)
+        self.histograms = dict((name, Histogram(spec[0])) for name, spec in HISTOGRAMS.items())
+
+
+class Metrics(object):
+    """
+    Thread-safe registry of request metrics, see module doc
+    """
+
+    def __init__(self, prefix='binance_dex'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def _endpoint(self, endpoint):
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self._endpoints[endpoint] = _EndpointMetrics()
+        return metrics
+
+    def observe(self, endpoint, response, total, decode=None):
+        """
+        Record one response
+        :param response: "requests.Response" or "RawResponse"
+        :param total: seconds from sending request to response body received
+        :param decode: seconds spent decoding response body, None if not decoded
+        """
+        timings = getattr(response, 'timings', None)
+        if timings is None:
+            elapsed = getattr(response, 'elapsed', None)
+            timings = {'first_byte': elapsed.total_seconds()} if elapsed is not None else {}
+        with self._lock:
+            metrics = self._endpoint(endpoint)
+            metrics.responses[response.status_code] = metrics.responses.get(response.status_code, 0) + 1
+            histograms = metrics.histograms
+            histograms['total'].observe(total)
+            histograms['size'].observe(len(response.content))
+            if decode is not None:
+                histograms['decode'].observe(decode)
+            for name, value in timings.items():
+                histograms[name].observe(value)
+
+    def observe_error(self, endpoint):
+        """
+        Record a request which got no response
+        """
+        with self._lock:
+            self._endpoint(endpoint).errors += 1
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self):
+        """
+        Sample Return:
+        {'depth': {'responses': {200: 98, 429: 2}, 'errors': 0,
+                   'total': {'count': 100, 'sum': 4.2, 'avg': 0.042, 'p50': 0.05, 'p99': 0.25,
+                             'buckets': {0.001: 0, 0.0025: 0, ... ..., '+Inf': 0}},
+                   'first_byte': {...}, 'dns': {...}, 'connect': {...}, 'decode': {...}, 'size': {...}},
+         ... ...}
+        """
+        with self._lock:
+            ret = {}
+            for endpoint, metrics in self._endpoints.items():
+                ret[endpoint] = dict((name, histogram.snapshot()) for name, histogram in metrics.histograms.items())
+                ret[endpoint]['responses'] = dict(metrics.responses)
+                ret[endpoint]['errors'] = metrics.errors
+            return ret
+
+    def prometheus(self):
+        """
+        Metrics in Prometheus text exposition format
+        """
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = ['# HELP %s_responses_total Responses by endpoint and HTTP status code' % self.prefix,
+                     '# TYPE %s_responses_total counter' % self.prefix]
+            for endpoint, metrics in endpoints:
+                for code, count in sorted(metrics.responses.items()):
+                    lines.append('%s_responses_total{endpoint="%s",code="%s"} %s'
+                                 % (self.prefix, endpoint, code, count))
+            lines += ['# HELP %s_errors_total Requests without response by endpoint' % self.prefix,
+                      '# TYPE %s_errors_total counter' % self.prefix]
+            for endpoint, metrics in endpoints:
+                lines.append('%s_errors_total{endpoint="%s"} %s' % (self.prefix, endpoint, metrics.errors))
+            for name in sorted(HISTOGRAMS):
+                buckets, unit, help_text = HISTOGRAMS[name]
+                metric = '%s_%s_%s' % (self.prefix, name, unit)
+                lines += ['# HELP %s %s' % (metric, help_text),
+                          '# TYPE %s histogram' % metric]
+                for endpoint, metrics in endpoints:
+                    histogram = metrics.histograms[name]
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append('%s_bucket{endpoint="%s",le="%s"} %s' % (metric, endpoint, bound, cumulative))
+                    lines.append('%s_sum{endpoint="%s"} %s' % (metric, endpoint, histogram.sum))
+                    lines.append('%s_count{endpoint="%s"} %s' % (metric, endpoint, histogram.count))
+            return '\n'.join(lines) + '\n'
+
+
+# Shared by clients created with "metrics=True"
+default_metrics = Metrics()
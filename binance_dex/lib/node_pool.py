@@ -0,0 +1,162 @@
+"""
+Pool of equivalent RPC nodes, so that one slow or dead node does not stall every request.
+
+ - routing: each request goes to the available node with the fewest requests in flight ('least_outstanding'), or
+   with the lowest latency EWMA weighted by requests in flight ('ewma')
+ - circuit breaker: a node failing "failure_threshold" times in a row is ejected (circuit open) and not used anymore
+ - ejected nodes are health-checked in the background every "reprobe_interval" seconds, and put back once healthy
+ - if every node is ejected, requests still go to the one ejected first rather than failing without trying
+"""
+import time
+import threading
+from binance_dex.lib.failover import EWMA_ALPHA
+
+ROUTING_POLICIES = ('least_outstanding', 'ewma')
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_REPROBE_INTERVAL = 10  # seconds
+
+CLOSED = 'closed'  # healthy, in use
+OPEN = 'open'      # ejected, waiting for a successful re-probe
+
+
+class PoolNode(object):
+    """
+    One node of the pool, counters are updated by "NodePool" under its lock
+    """
+
+    def __init__(self, url, latency=None):
+        self.url = url
+        self.state = CLOSED
+        self.outstanding = 0
+        self.latency_ewma = latency or 0.0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_at = None
+
+    def load(self, routing):
+        # Lower is better, nodes without latency yet are tried first
+        if routing == 'least_outstanding':
+            return self.outstanding, self.latency_ewma
+        return self.latency_ewma * (self.outstanding + 1), self.outstanding
+
+    def stats(self):
+        return {'state': self.state,
+                'outstanding': self.outstanding,
+                'requests': self.requests,
+                'errors': self.errors,
+                'latency_ewma': self.latency_ewma,
+                'consecutive_failures': self.consecutive_failures,
+                'ejections': self.ejections}
+
+
+class NodePool(object):
+    """
+    Thread-safe node selection, see module doc
+
+    Sample Usage:
+        pool = NodePool([('https://node-1:443', 0.05), ('https://node-2:443', 0.08)], probe=probe_node)
+        node = pool.acquire()
+        started_at = time.monotonic()
+        ok = send_request(node.url)
+        pool.release(node, time.monotonic() - started_at, ok)
+    """
+
+    def __init__(self, nodes, probe=None, routing='least_outstanding', failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reprobe_interval=DEFAULT_REPROBE_INTERVAL):
+        """
+        :param nodes: [<url>, ...] or [(<url>, <initial latency in seconds>), ...]
+        :param probe: function(url) returning RTT in seconds, or None if node is not healthy, used to re-probe ejected
+                      nodes, None to put them back after "reprobe_interval" without checking
+        :param routing: 'least_outstanding' or 'ewma'
+        :param failure_threshold: consecutive failures ejecting a node
+        :param reprobe_interval: seconds between health checks of ejected nodes
+        """
+        if routing not in ROUTING_POLICIES:
+            raise ValueError('routing should be one of: %s' % (ROUTING_POLICIES,))
+        if not nodes:
+            raise ValueError('NodePool needs at least one node')
+        self.nodes = [PoolNode(*node) if isinstance(node, (tuple, list)) else PoolNode(node) for node in nodes]
+        self.probe = probe
+        self.routing = routing
+        self.failure_threshold = failure_threshold
+        self.reprobe_interval = reprobe_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reprober = threading.Thread(target=self._reprobe, name='node-pool-reprobe')
+        self._reprober.daemon = True
+        self._reprober.start()
+
+    def acquire(self, exclude=()):
+        """
+        Pick a node for one request and count it in flight, "release()" must be called once the request is done
+        :param exclude: nodes not to pick if another one is available (e.g. nodes that already failed this request)
+        """
+        with self._lock:
+            candidates = [node for node in self.nodes if node.state == CLOSED and node not in exclude] or \
+                [node for node in self.nodes if node.state == CLOSED] or \
+                [min(self.nodes, key=lambda node: node.ejected_at)]
+            node = min(candidates, key=lambda candidate: candidate.load(self.routing))
+            node.outstanding += 1
+            return node
+
+    def add(self, url, latency=None):
+        """
+        Add a node to the pool, nothing is done if it is already in
+        """
+        with self._lock:
+            if all(node.url != url for node in self.nodes):
+                self.nodes.append(PoolNode(url, latency))
+
+    def release(self, node, latency, ok):
+        """
+        :param latency: seconds taken by the request
+        :param ok: False if the node failed (connection error, timeout, 5xx)
+        """
+        with self._lock:
+            node.outstanding -= 1
+            node.requests += 1
+            if ok:
+                node.consecutive_failures = 0
+                node.latency_ewma = latency if not node.latency_ewma else \
+                    node.latency_ewma + EWMA_ALPHA * (latency - node.latency_ewma)
+                return
+            node.errors += 1
+            node.consecutive_failures += 1
+            if node.state == CLOSED and node.consecutive_failures >= self.failure_threshold:
+                node.state = OPEN
+                node.ejected_at = time.monotonic()
+                node.ejections += 1
+
+    def _reprobe(self):
+        while not self._stop.wait(self.reprobe_interval):
+            with self._lock:
+                ejected = [node for node in self.nodes if node.state == OPEN]
+            for node in ejected:
+                try:
+                    rtt = self.probe(node.url) if self.probe else node.latency_ewma
+                except Exception:
+                    rtt = None
+                if rtt is not None:
+                    with self._lock:
+                        node.state = CLOSED
+                        node.consecutive_failures = 0
+                        node.latency_ewma = rtt
+
+    def close(self):
+        """
+        Stop background re-probing
+        """
+        self._stop.set()
+
+    def stats(self):
+        """
+        Sample Return:
+        {'https://node-1:443': {'state': 'closed', 'outstanding': 2, 'requests': 1200, 'errors': 3,
+                                'latency_ewma': 0.052, 'consecutive_failures': 0, 'ejections': 1},
+         'https://node-2:443': {'state': 'open', ... ...}}
+        """
+        with self._lock:
+            return dict((node.url, node.stats()) for node in self.nodes)
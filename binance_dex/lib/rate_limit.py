@@ -0,0 +1,153 @@
+"""
+Client side rate limiting for Binance DEX REST API.
+
+Binance limits each endpoint per IP (e.g. "1 request per IP per second" for /api/v1/time), bursting over the limit
+gets requests throttled. "RateLimiter" keeps one token bucket per endpoint, callers reserve a token and wait until
+it is due, so requests leave at the allowed maximum rate and never above it.
+
+Buckets are protected by a lock and only hold the reservation state, waiting happens outside the lock, so one limiter
+can be shared by threads ("acquire") and asyncio tasks ("acquire_async") at the same time.
+"""
+import time
+import asyncio
+import threading
+
+
+class TokenBucket(object):
+    """
+    Token bucket refilled at "rate" tokens per second, holding at most "burst" tokens
+
+    Tokens may go negative: each caller reserves a token immediately and gets back how long it has to wait, so
+    waiting callers are served in reservation order.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.requests = 0
+        self.queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def reserve(self):
+        """
+        Take one token, returns seconds to wait before the request is allowed to go
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self.requests += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if wait:
+                self.queue_depth += 1
+        return wait
+
+    def _done_waiting(self):
+        with self._lock:
+            self.queue_depth -= 1
+
+    def acquire(self):
+        """
+        Block current thread until a token is available, returns seconds waited
+        """
+        wait = self.reserve()
+        if wait:
+            try:
+                time.sleep(wait)
+            finally:
+                self._done_waiting()
+        return wait
+
+    async def acquire_async(self):
+        """
+        Suspend current task until a token is available, returns seconds waited
+        """
+        wait = self.reserve()
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._done_waiting()
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {'rate': self.rate,
+                    'burst': self.burst,
+                    'requests': self.requests,
+                    'queue_depth': self.queue_depth,
+                    'total_wait': self.total_wait,
+                    'max_wait': self.max_wait,
+                    'avg_wait': self.total_wait / self.requests if self.requests else 0.0}
+
+
+class RateLimiter(object):
+    """
+    One token bucket per endpoint
+
+    :param limits: {<endpoint>: <requests per second>}
+    :param burst: max number of requests allowed to go at once after idle, default 1 which spaces requests evenly
+    :param default_rate: requests per second of endpoints not listed in "limits", each one gets its own bucket on
+                         first use, None to leave them unlimited
+    """
+
+    def __init__(self, limits, burst=1, default_rate=None):
+        self.burst = burst
+        self.default_rate = default_rate
+        self.buckets = dict((endpoint, TokenBucket(rate, burst=burst)) for endpoint, rate in limits.items())
+        self._lock = threading.Lock()
+
+    def _bucket(self, endpoint):
+        bucket = self.buckets.get(endpoint)
+        if bucket is None and self.default_rate:
+            with self._lock:
+                bucket = self.buckets.get(endpoint)
+                if bucket is None:
+                    bucket = TokenBucket(self.default_rate, burst=self.burst)
+                    self.buckets[endpoint] = bucket
+        return bucket
+
+    def acquire(self, endpoint):
+        bucket = self._bucket(endpoint)
+        return bucket.acquire() if bucket else 0.0
+
+    async def acquire_async(self, endpoint):
+        bucket = self._bucket(endpoint)
+        return await bucket.acquire_async() if bucket else 0.0
+
+    def stats(self):
+        """
+        Sample Return:
+        {'depth': {'rate': 10.0, 'burst': 1, 'requests': 120, 'queue_depth': 3, 'total_wait': 6.3, 'max_wait': 0.3,
+        'avg_wait': 0.0525}, ... ...}
+        """
+        with self._lock:
+            buckets = list(self.buckets.items())
+        return dict((endpoint, bucket.stats()) for endpoint, bucket in buckets)
+
+
+# Shared limiters, the limits are per IP, so all clients of the same server should share one limiter
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(base_url, limits, default_rate=None):
+    """
+    Get the shared rate limiter of "base_url", create one with "limits" and "default_rate" if not exist yet
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(base_url)
+        if limiter is None:
+            limiter = RateLimiter(limits, default_rate=default_rate)
+            _limiters[base_url] = limiter
+    return limiter
@@ -0,0 +1,92 @@
+"""
+Single-flight request coalescing.
+
+When several threads (or asyncio tasks) ask for the same thing at the same time, only the first caller ("leader")
+performs the call, others wait for it and share its result. Once the call finishes, the next caller starts a new one,
+nothing is cached.
+
+Results are shared by all waiters, please treat them as read-only.
+"""
+import asyncio
+import threading
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesce concurrent calls with the same key
+     - do(key, func): for threads, "func" is a normal function
+     - do_async(key, coroutine_func): for asyncio tasks, "coroutine_func" returns a coroutine
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+
+        # Statistics
+        self.calls = 0
+        self.deduplicated = 0
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+            else:
+                self.deduplicated += 1
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key, coroutine_func):
+        # Tasks can only be awaited from their own event loop
+        task_key = (id(asyncio.get_event_loop()), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = asyncio.ensure_future(coroutine_func())
+                task.add_done_callback(lambda _: self._forget_task(task_key))
+                self._tasks[task_key] = task
+                self.calls += 1
+            else:
+                self.deduplicated += 1
+        # shield: one waiter being cancelled should not cancel the call shared with others
+        return await asyncio.shield(task)
+
+    def _forget_task(self, task_key):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls,
+                    'deduplicated': self.deduplicated,
+                    'in_flight': len(self._calls) + len(self._tasks)}
+
+
+# Shared by all clients, so that identical requests from different clients are coalesced as well
+default_single_flight = SingleFlight()
@@ -9,6 +9,7 @@ decided to adopt "websocket" because its simple as per zen of python: "Simple is
 
 import ssl
 import asyncio
+import logging
 import websocket
 try:
     import thread
@@ -17,6 +18,8 @@ except ImportError:
 
 from websocket import create_connection
 
+logger = logging.getLogger(__name__)
+
 
 class BinanceChainSocketConn(object):
     """
@@ -25,8 +28,12 @@ class BinanceChainSocketConn(object):
      - Long-lived connection
      - Short-lived one-off send-receive
     """
-    def __init__(self, ws_url):
-        websocket.enableTrace(True)
+    def __init__(self, ws_url, trace=False):
+        """
+        :param trace: if True, turn on the frame trace of "websocket-client" (written to stderr), off by default
+        """
+        if trace:
+            websocket.enableTrace(True)
         self.ws = None
         self.ws_url = ws_url
         self.on_error_func = _on_error
@@ -57,17 +64,17 @@ class BinanceChainSocketConn(object):
 # --------------------------------------------
 # Below are default behavior to be used for websocket, feel free to override by yourself
 def _on_message(*args):
-    print('!!! Here is default callback function, '
-          'please pass in your own customized callback function to handle received data !!!')
-    print(args[1])
+    logger.info('!!! Here is default callback function, '
+                'please pass in your own customized callback function to handle received data !!!')
+    logger.info('Received: %s', args[1])
 
 
 def _on_error(ws, error):
-    print(error)
+    logger.error('WebSocket error: %s', error)
 
 
-def _on_close(ws):
-    print("### closed ###")
+def _on_close(ws, *args):
+    logger.info('### closed ###')
 
 
 def _on_open(ws):
@@ -0,0 +1,193 @@
+"""
+Keep-alive HTTP transport for Binance DEX REST API.
+
+Calling the module level "requests.get" / "requests.post" creates a brand-new Session per call, so every request pays
+for a fresh TCP + TLS handshake. "HttpTransport" keeps one "requests.Session" mounted with a sized urllib3 connection
+pool, so connections are kept alive and reused across calls and threads.
+
+Transports are shared per base URL (scheme + host + port) through "get_transport()", so all "BinanceChainClient"
+instances talking to the same server reuse the same pool.
+
+"AsyncHttpTransport" is the asyncio counterpart, based on "aiohttp" (optional dependency), shared through
+"get_async_transport()".
+"""
+import time
+import asyncio
+import threading
+import collections
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+# Number of keep-alive connections kept per host
+DEFAULT_POOL_SIZE = 10
+
+# (connect timeout, read timeout) in seconds, see:
+# http://docs.python-requests.org/en/master/user/advanced/#timeouts
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+class HttpTransport(object):
+    """
+    Thread-safe pooled HTTP transport
+
+     - pool_size: max number of keep-alive connections per host, also the max number of concurrent requests per host
+     - pool_block: if True, requests beyond "pool_size" wait for a free connection instead of opening throw-away ones
+     - timeout: (connect timeout, read timeout) in seconds, or a single number used for both
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, pool_block=False):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size,
+                              pool_block=pool_block)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, body=None, headers=None, data=None):
+        """
+        Perform request through pooled connections, returns "requests.Response"
+        "body" is sent JSON encoded, "data" (str / bytes) is sent as is, with the content type given in "headers"
+        """
+        return self.session.request(method=method,
+                                    url=url,
+                                    json=body,
+                                    data=data,
+                                    headers=headers,
+                                    timeout=self.timeout)
+
+    def get(self, url, headers=None):
+        return self.request('GET', url, headers=headers)
+
+    def post(self, url, body=None, headers=None, data=None):
+        return self.request('POST', url, body=body, headers=headers, data=data)
+
+    def close(self):
+        self.session.close()
+
+
+# Response of "AsyncHttpTransport", body already read as bytes
+# "timings": {'dns': <s>, 'connect': <s, TCP + TLS>, 'first_byte': <s>}, dns / connect only if a connection was opened
+RawResponse = collections.namedtuple('RawResponse', ['status_code', 'headers', 'content', 'timings'])
+
+
+def _timing_trace_config():
+    # Fill the "trace_request_ctx" dict of each request with phase durations
+    def on_start(name):
+        async def handler(session, context, params):
+            context.trace_request_ctx['_' + name] = time.perf_counter()
+        return handler
+
+    def on_end(name, start_name=None):
+        async def handler(session, context, params):
+            timings = context.trace_request_ctx
+            started_at = timings.pop('_' + (start_name or name), None)
+            if started_at is not None:
+                timings[name] = time.perf_counter() - started_at
+        return handler
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(on_start('dns'))
+    trace_config.on_dns_resolvehost_end.append(on_end('dns'))
+    trace_config.on_connection_create_start.append(on_start('connect'))
+    trace_config.on_connection_create_end.append(on_end('connect'))
+    trace_config.on_request_start.append(on_start('request'))
+    trace_config.on_request_end.append(on_end('first_byte', 'request'))
+    return trace_config
+
+
+class AsyncHttpTransport(object):
+    """
+    Non-blocking pooled HTTP transport for asyncio, requires "aiohttp"
+
+    The underlying "aiohttp.ClientSession" is created lazily inside the running event loop, and re-created if the
+    transport is later used from another event loop.
+    Parameters are the same as "HttpTransport".
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        if aiohttp is None:
+            raise ImportError('"aiohttp" is required by async transport, please install it: '
+                              'pip install binance-dex[async]')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._session_loop = None
+
+    def _get_session(self):
+        loop = asyncio.get_event_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            if isinstance(self.timeout, tuple):
+                timeout = aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+            else:
+                timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size),
+                                                  timeout=timeout,
+                                                  trace_configs=[_timing_trace_config()])
+            self._session_loop = loop
+        return self._session
+
+    async def request(self, method, url, body=None, headers=None, data=None):
+        """
+        Perform request through pooled connections, returns "RawResponse", "body" / "data" same as "HttpTransport"
+        """
+        timings = {}
+        async with self._get_session().request(method, url, json=body, data=data, headers=headers,
+                                               trace_request_ctx=timings) as response:
+            content = await response.read()
+            return RawResponse(response.status, response.headers, content, timings)
+
+    async def get(self, url, headers=None):
+        return await self.request('GET', url, headers=headers)
+
+    async def post(self, url, body=None, headers=None, data=None):
+        return await self.request('POST', url, body=body, headers=headers, data=data)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+# Shared transports, keyed by (transport class, base url, pool size, timeout)
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def _base_url(url):
+    parsed = urlparse(url)
+    return '%s://%s' % (parsed.scheme, parsed.netloc)
+
+
+def _shared_transport(transport_cls, url, pool_size, timeout):
+    key = (transport_cls, _base_url(url), pool_size, timeout)
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = transport_cls(pool_size=pool_size, timeout=timeout)
+            _transports[key] = transport
+    return transport
+
+
+def get_transport(url, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+    """
+    Get the shared transport for the server "url" points to, create one if not exist yet
+    """
+    return _shared_transport(HttpTransport, url, pool_size, timeout)
+
+
+def get_async_transport(url, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+    """
+    Get the shared async transport for the server "url" points to, create one if not exist yet
+    """
+    return _shared_transport(AsyncHttpTransport, url, pool_size, timeout)
@@ -0,0 +1,462 @@
+"""
+Local stand-in for the Binance DEX REST API, for load tests and benchmarks without touching testnet / mainnet.
+
+Every "/api/v1/*" path used by "BinanceChainClient" is served with synthetic responses (same format as the real API,
+deterministic content) or with recorded ones ("fixtures"). Latency, 500 errors and 429 throttling are configurable,
+globally or per endpoint. Conditional GET requests ("If-None-Match") are answered "304 Not Modified" when unchanged.
+
+Sample Usage:
+    with LocalDexServer(latency=(0.01, 0.05), throttle_rate=0.01) as server:
+        api_client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        print(api_client.get_depth('NNB-0AD_BNB', 5))
+        print(server.hits)  # {'depth': 1}
+
+From command line:
+    python -m binance_dex.local_server --port 8080 --latency 0.02 --error-rate 0.01
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from binance_dex.lib.klines import KLINE_INTERVAL_MS
+
+try:
+    from urllib.parse import urlparse, parse_qs
+except ImportError:
+    from urlparse import urlparse, parse_qs
+
+# (path regex, endpoint name as in "API_RATE_LIMITS", HTTP method)
+_ROUTES = [
+    (re.compile(r'^/api/v1/time$'), 'time', 'GET'),
+    (re.compile(r'^/api/v1/node-info$'), 'node-info', 'GET'),
+    (re.compile(r'^/api/v1/validators$'), 'validators', 'GET'),
+    (re.compile(r'^/api/v1/peers$'), 'peers', 'GET'),
+    (re.compile(r'^/api/v1/tokens$'), 'tokens', 'GET'),
+    (re.compile(r'^/api/v1/account/(?P<address>[^/]+)/sequence$'), 'account-sequence', 'GET'),
+    (re.compile(r'^/api/v1/account/(?P<address>[^/]+)$'), 'account', 'GET'),
+    (re.compile(r'^/api/v1/tx/(?P<hash>[^/]+)$'), 'tx', 'GET'),
+    (re.compile(r'^/api/v1/markets$'), 'markets', 'GET'),
+    (re.compile(r'^/api/v1/fees$'), 'fees', 'GET'),
+    (re.compile(r'^/api/v1/depth$'), 'depth', 'GET'),
+    (re.compile(r'^/api/v1/klines$'), 'klines', 'GET'),
+    (re.compile(r'^/api/v1/orders/open$'), 'orders-open', 'GET'),
+    (re.compile(r'^/api/v1/orders/closed$'), 'orders-closed', 'GET'),
+    (re.compile(r'^/api/v1/orders/(?P<order_id>[^/]+)$'), 'orders', 'GET'),
+    (re.compile(r'^/api/v1/broadcast$'), 'broadcast', 'POST'),
+    (re.compile(r'^/api/v1/transactions/?$'), 'transactions', 'GET'),
+]
+
+ENDPOINTS = tuple(route[1] for route in _ROUTES)
+
+_BASE_TIME_MS = 1554940800000  # 2019-04-11T00:00:00Z
+_PUB_KEY = 'AkrIfMumvYIRaNizdcDjnohIwkNyHjl8K7WNbXXL3W16'
+
+
+def _iso(ms):
+    return datetime.datetime.utcfromtimestamp(ms / 1000.0).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _hex(*parts):
+    return hashlib.sha256(':'.join(str(part) for part in parts).encode()).hexdigest().upper()
+
+
+def _amount(value):
+    return '%.8f' % value
+
+
+def _for_endpoint(setting, endpoint):
+    # setting: value, or {endpoint: value} (missing endpoints get None)
+    return setting.get(endpoint) if isinstance(setting, dict) else setting
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so that clients can keep connections alive
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, data, headers = self.server.dex.dispatch(self.command, self.path, body, self.headers)
+        content = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # default backlog (5) drops connections opened at once by concurrent clients, they are retried a second later
+    request_queue_size = 128
+
+
+class LocalDexServer(object):
+    """
+    Stand-in Binance DEX REST server, see module doc
+
+    :param latency: seconds added to each response: a number, a (min, max) tuple for uniform random latency,
+                    or {<endpoint>: <number or tuple>}
+    :param error_rate: fraction of requests answered with "500", a number or {<endpoint>: <number>}
+    :param throttle_rate: fraction of requests answered with "429 Too Many Requests", a number or {<endpoint>: <number>}
+    :param fixtures: recorded responses replacing synthetic ones, {<endpoint>: <python data or raw bytes>} or path of a
+                     directory holding "<endpoint>.json" files
+    :param num_orders: number of open / closed orders of every address, served by pages
+    :param num_transactions: number of transactions of every address, served by pages
+    :param seed: random seed of latency / error / throttle draws
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, throttle_rate=0.0, fixtures=None,
+                 num_orders=1200, num_transactions=1200, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.fixtures = self._load_fixtures(fixtures)
+        self.num_orders = num_orders
+        self.num_transactions = num_transactions
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = {}
+        self.errors = 0
+        self.throttled = 0
+
+        self._server = _ThreadingServer((host, port), _Handler)
+        self._server.dex = self
+        self._thread = None
+
+    @staticmethod
+    def _load_fixtures(fixtures):
+        if fixtures is None or isinstance(fixtures, dict):
+            return dict(fixtures or {})
+        loaded = {}
+        for name in os.listdir(fixtures):
+            endpoint, ext = os.path.splitext(name)
+            if ext == '.json' and endpoint in ENDPOINTS:
+                with open(os.path.join(fixtures, name), 'rb') as f:
+                    loaded[endpoint] = f.read()
+        return loaded
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%s/' % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='local-dex-server')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def dispatch(self, method, path, body, headers=None):
+        """
+        Answer one request, return (status code, python data or bytes, headers)
+        Successful GET responses carry an "ETag", a request whose "If-None-Match" matches it gets "304 Not Modified"
+        """
+        status, data, response_headers = self._dispatch(method, path, body)
+        if method != 'GET' or status != 200:
+            return status, data, response_headers
+        content = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(content).hexdigest()
+        if headers is not None and headers.get('If-None-Match') == etag:
+            return 304, b'', dict(response_headers, ETag=etag)
+        return status, content, dict(response_headers, ETag=etag)
+
+    def _dispatch(self, method, path, body):
+        parsed = urlparse(path)
+        params = dict((key, values[0]) for key, values in parse_qs(parsed.query).items())
+        for pattern, endpoint, route_method in _ROUTES:
+            matched = pattern.match(parsed.path)
+            if matched and route_method == method:
+                break
+        else:
+            return 404, {'code': 404, 'message': 'Not Found'}, {}
+
+        with self._lock:
+            self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+            latency = _for_endpoint(self.latency, endpoint) or 0
+            if isinstance(latency, tuple):
+                latency = self._random.uniform(*latency)
+            draw = self._random.random()
+        if latency:
+            time.sleep(latency)
+
+        throttle_rate = _for_endpoint(self.throttle_rate, endpoint) or 0
+        error_rate = _for_endpoint(self.error_rate, endpoint) or 0
+        if draw < throttle_rate:
+            with self._lock:
+                self.throttled += 1
+            return 429, {'code': 429, 'message': 'Too many requests'}, {'Retry-After': '1'}
+        if draw < throttle_rate + error_rate:
+            with self._lock:
+                self.errors += 1
+            return 500, {'code': 500, 'message': 'internal server error'}, {}
+
+        if endpoint in self.fixtures:
+            return 200, self.fixtures[endpoint], {}
+        try:
+            return getattr(self, '_' + endpoint.replace('-', '_'))(params, body, **matched.groupdict())
+        except (KeyError, ValueError) as err:
+            return 400, {'code': 400, 'message': 'bad request: %s' % err}, {}
+
+    # Synthetic responses, same format as the real API
+
+    def _time(self, params, body):
+        now = int(time.time() * 1000)
+        return 200, {'ap_time': _iso(now)[:19] + 'Z', 'block_time': _iso(now - 1000)[:19] + 'Z'}, {}
+
+    def _node_info(self, params, body):
+        return 200, {'node_info': {'id': _hex('node')[:40].lower(),
+                                   'listen_addr': '127.0.0.1:27146',
+                                   'network': 'Binance-Chain-Local',
+                                   'version': '0.30.1',
+                                   'channels': '3540202122233038',
+                                   'moniker': 'local',
+                                   'other': {'tx_index': 'on', 'rpc_address': 'tcp://0.0.0.0:27147'}},
+                     'sync_info': {'latest_block_hash': _hex('block'),
+                                   'latest_app_hash': _hex('app'),
+                                   'latest_block_height': self._height(),
+                                   'latest_block_time': _iso(int(time.time() * 1000)),
+                                   'catching_up': False},
+                     'validator_info': {'address': _hex('validator', 0)[:40],
+                                        'pub_key': list(range(32)),
+                                        'voting_power': 100000000000}}, {}
+
+    def _validators(self, params, body):
+        return 200, {'block_height': self._height(),
+                     'validators': [{'address': _hex('validator', i)[:40],
+                                     'pub_key': list(range(i, i + 37)),
+                                     'voting_power': 100000000000} for i in range(11)]}, {}
+
+    def _peers(self, params, body):
+        return 200, [{'id': _hex('peer', i)[:40].lower(),
+                      'access_addr': 'http://seed-%s.local:80' % i,
+                      'listen_addr': 'http://seed-%s.local:80' % i,
+                      'capabilities': ['node'],
+                      'moniker': 'seed-%s' % i,
+                      'network': 'Binance-Chain-Local',
+                      'version': '0.30.1'} for i in range(10)], {}
+
+    def _tokens(self, params, body):
+        offset = int(params.get('offset', 0))
+        limit = int(params.get('limit', 500))
+        return 200, [{'name': 'Token %s' % i,
+                      'symbol': 'TK%s-%s' % (i, _hex('token', i)[:3]),
+                      'original_symbol': 'TK%s' % i,
+                      'total_supply': _amount(1000000 * (i + 1)),
+                      'owner': self._address(i),
+                      'mintable': i % 2 == 0} for i in range(offset, offset + limit)], {}
+
+    def _account(self, params, body, address):
+        return 200, {'address': address,
+                     'public_key': None,
+                     'account_number': int(_hex(address)[:6], 16),
+                     'sequence': self._sequence(address),
+                     'balances': [{'symbol': 'BNB', 'free': '1399.99250000', 'locked': '0.00000000',
+                                   'frozen': '0.00000000'}]}, {}
+
+    def _account_sequence(self, params, body, address):
+        return 200, {'sequence': self._sequence(address)}, {}
+
+    def _tx(self, params, body, hash):
+        return 200, {'hash': hash,
+                     'height': str(self._height()),
+                     'tx': {'type': 'auth/StdTx',
+                            'value': {'data': None, 'memo': '', 'source': '1',
+                                      'msg': [{'type': 'cosmos-sdk/Send',
+                                               'value': {'inputs': [{'address': self._address(0),
+                                                                     'coins': [{'amount': '100000000',
+                                                                                'denom': 'BNB'}]}],
+                                                         'outputs': [{'address': self._address(1),
+                                                                      'coins': [{'amount': '100000000',
+                                                                                 'denom': 'BNB'}]}]}}],
+                                      'signatures': [{'account_number': '666557', 'sequence': '0',
+                                                      'pub_key': {'type': 'tendermint/PubKeySecp256k1',
+                                                                  'value': _PUB_KEY},
+                                                      'signature': 'c2lnbmF0dXJl'}]}}}, {}
+
+    def _markets(self, params, body):
+        return 200, [{'base_asset_symbol': 'TK%s-%s' % (i, _hex('token', i)[:3]),
+                      'quote_asset_symbol': 'BNB',
+                      'price': _amount(1 + i / 100.0),
+                      'tick_size': _amount(10 ** -(i % 6 + 2)),
+                      'lot_size': _amount(10 ** -(i % 4))} for i in range(200)], {}
+
+    def _fees(self, params, body):
+        return 200, [{'fee': 1000000000, 'msg_type': 'submit_proposal', 'fee_for': 1},
+                     {'fee': 125000, 'msg_type': 'deposit', 'fee_for': 1},
+                     {'fee': 0, 'msg_type': 'vote', 'fee_for': 3},
+                     {'fee': 0, 'msg_type': 'orderNew', 'fee_for': 3},
+                     {'fee': 0, 'msg_type': 'orderCancel', 'fee_for': 3},
+                     {'multi_transfer_fee': 100000, 'lower_limit_as_multi': 2,
+                      'fixed_fee_params': {'fee': 125000, 'msg_type': 'send', 'fee_for': 1}},
+                     {'dex_fee_fields': [{'fee_name': 'FeeRate', 'fee_value': 1000},
+                                         {'fee_name': 'FeeRateNative', 'fee_value': 400}]}], {}
+
+    def _depth(self, params, body):
+        symbol = params['symbol']
+        limit = int(params.get('limit', 100))
+        return 200, {'height': self._height(),
+                     'asks': [[_amount(1.001 + i * 0.001), _amount(100 + i)] for i in range(limit)],
+                     'bids': [[_amount(0.999 - i * 0.001), _amount(100 + i)] for i in range(limit)],
+                     'symbol': symbol}, {}
+
+    def _klines(self, params, body):
+        interval_ms = KLINE_INTERVAL_MS[params['interval']]
+        limit = min(int(params.get('limit', 300)), 1000)
+        end_time = int(params.get('endTime', int(time.time() * 1000)))
+        start_time = int(params.get('startTime', end_time - limit * interval_ms))
+        open_time = start_time - start_time % interval_ms
+        if open_time < start_time:
+            open_time += interval_ms
+        bars = []
+        while open_time <= end_time and len(bars) < limit:
+            price = 1 + (open_time // interval_ms % 97) / 1000.0
+            bars.append([open_time, _amount(price), _amount(price * 1.01), _amount(price * 0.99),
+                         _amount(price * 1.005), _amount(1000), open_time + interval_ms - 1,
+                         _amount(price * 1000), open_time // interval_ms % 50])
+            open_time += interval_ms
+        return 200, bars, {}
+
+    def _order(self, address, i, closed):
+        return {'orderId': '%s-%s' % (_hex(address)[:40], i),
+                'owner': address,
+                'symbol': 'NNB-0AD_BNB',
+                'price': _amount(0.002 + i % 10 / 1000.0),
+                'quantity': '100.00000000',
+                'cumulateQuantity': '100.00000000' if closed else '0.00000000',
+                'fee': 'BNB:0.00010000' if closed else '',
+                'orderCreateTime': _iso(_BASE_TIME_MS + i * 1000),
+                'transactionTime': _iso(_BASE_TIME_MS + i * 1000 + 500),
+                'status': 'FullyFill' if closed else 'Ack',
+                'timeInForce': 1,
+                'side': i % 2 + 1,
+                'type': 2,
+                'tradeId': '%s-0' % i if closed else '',
+                'lastExecutedPrice': _amount(0.002) if closed else '0.00000000',
+                'lastExecutedQuantity': '100.00000000' if closed else '0.00000000',
+                'transactionHash': _hex('order', address, i)}
+
+    def _orders_page(self, params, closed):
+        address = params['address']
+        offset = int(params.get('offset', 0))
+        limit = min(int(params.get('limit', 500)), 1000)
+        orders = [self._order(address, i, closed) for i in range(offset, min(offset + limit, self.num_orders))]
+        return 200, {'order': orders, 'total': self.num_orders if params.get('total') == '1' else -1}, {}
+
+    def _orders_open(self, params, body):
+        return self._orders_page(params, closed=False)
+
+    def _orders_closed(self, params, body):
+        return self._orders_page(params, closed=True)
+
+    def _orders(self, params, body, order_id):
+        i = order_id.rpartition('-')[2]
+        return 200, dict(self._order(self._address(0), int(i) if i.isdigit() else 0, True), orderId=order_id), {}
+
+    def _broadcast(self, params, body):
+        # The real API takes the hex-encoded transaction as the raw body, a JSON string is rejected
+        try:
+            transaction = bytes.fromhex(body.decode('ascii'))
+        except ValueError:
+            transaction = None
+        if not transaction:
+            raise ValueError('transaction should be sent hex-encoded, as text/plain')
+        return 200, [{'code': 0,
+                      'hash': _hex('broadcast', body),
+                      'log': 'Msg 0: ',
+                      'ok': True}], {}
+
+    def _transaction(self, address, i):
+        return {'txHash': _hex('tx', address, i),
+                'blockHeight': 7107385 - i,
+                'txType': 'TRANSFER',
+                'timeStamp': _iso(_BASE_TIME_MS - i * 1000),
+                'fromAddr': address,
+                'toAddr': self._address(i),
+                'value': _amount(i % 100 + 0.5),
+                'txAsset': 'BNB',
+                'txFee': '0.00037500',
+                'txAge': i,
+                'orderId': None,
+                'code': 0,
+                'data': None,
+                'confirmBlocks': 0,
+                'memo': '',
+                'source': 0,
+                'sequence': self.num_transactions - i}
+
+    def _transactions(self, params, body):
+        address = params['address']
+        offset = int(params.get('offset', 0))
+        limit = min(int(params.get('limit', 500)), 1000)
+        # transaction i happened at _BASE_TIME_MS - i seconds
+        first = max(0, -((int(params['endTime']) - _BASE_TIME_MS) // 1000)) if 'endTime' in params else 0
+        last = min(self.num_transactions, (_BASE_TIME_MS - int(params['startTime'])) // 1000 + 1) \
+            if 'startTime' in params else self.num_transactions
+        txs = [self._transaction(address, i) for i in range(first + offset, min(first + offset + limit, last))]
+        return 200, {'tx': txs, 'total': max(0, last - first)}, {}
+
+    # Helpers
+
+    @staticmethod
+    def _height():
+        return 7000000 + int(time.time() * 2) % 1000000
+
+    @staticmethod
+    def _address(i):
+        return 'tbnb1' + _hex('address', i)[:38].lower()
+
+    @staticmethod
+    def _sequence(address):
+        return int(_hex(address)[:4], 16) % 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in Binance DEX REST server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to each response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--fixtures', default=None, help='directory of recorded "<endpoint>.json" responses')
+    args = parser.parse_args()
+    server = LocalDexServer(host=args.host, port=args.port, latency=args.latency, error_rate=args.error_rate,
+                            throttle_rate=args.throttle_rate, fixtures=args.fixtures).start()
+    print('Serving Binance DEX REST API stand-in on %s' % server.url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+# Local table of market tick / lot sizes, so that orders are validated and rounded before signing
+import time
+import asyncio
+import threading
+from binance_dex.lib.common import std_ret
+from binance_dex.lib.fixed_point import PRECISION, to_fixed8, from_fixed8
+
+DEFAULT_REFRESH_INTERVAL = 300  # seconds
+
+
+class MarketRules(object):
+    """
+    In-memory table of "get_markets" data indexed by symbol ('<base asset>_<quote asset>'), amounts as integers of 1e-8
+    units, refreshed in the background (thread for "BinanceChainClient", task for "AsyncBinanceChainClient"). Lookups,
+    validation and rounding are dict lookups and integer arithmetic, no network access.
+
+    Prices and quantities can be passed as decimal strings ('0.00120000') or integers of 1e-8 units, results are
+    returned in the same form.
+
+    Sample Usage:
+        rules = api_client.get_market_rules()['result']
+        rules.validate('NNB-0AD_BNB', '0.00120000', '100.00000000')
+        # {'status': False, 'message': 'Price 0.00120000 of NNB-0AD_BNB is not a multiple of tick size 0.00100000'}
+        rules.round_order('NNB-0AD_BNB', '0.00120000', '100.00000000')
+        # {'status': True, 'result': ('0.00100000', '100.00000000')}
+    """
+
+    def __init__(self, client, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        """
+        :param client: BinanceChainClient or AsyncBinanceChainClient used to fetch markets
+        :param refresh_interval: seconds between background refreshes
+        """
+        self.client = client._decoded()
+        self.refresh_interval = refresh_interval
+        self._markets = {}  # symbol -> (tick size, lot size, market dict from "get_markets")
+        self.last_refresh = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._refresher = None
+
+    def load(self, markets):
+        """
+        Replace table with "get_markets" result
+        """
+        table = {}
+        for market in markets:
+            symbol = '%s_%s' % (market['base_asset_symbol'], market['quote_asset_symbol'])
+            table[symbol] = (to_fixed8(market['tick_size']), to_fixed8(market['lot_size']), market)
+        # swapped in one assignment, readers never see a half-built table
+        self._markets = table
+        self.last_refresh = time.time()
+
+    def _loaded(self, ret):
+        if ret['status']:
+            self.load(ret['result'])
+            self.last_error = None
+        else:
+            self.last_error = ret['message']
+        return ret
+
+    def refresh(self):
+        """
+        Fetch markets now (BinanceChainClient), the table is kept as is if the request fails
+        :return: "get_markets" result
+        """
+        return self._loaded(self.client.get_markets())
+
+    async def refresh_async(self):
+        """
+        Same as "refresh", for AsyncBinanceChainClient
+        """
+        return self._loaded(await self.client.get_markets())
+
+    def start(self):
+        """
+        Start refreshing in the background, every "refresh_interval" seconds
+        """
+        self._stop.clear()
+        if asyncio.iscoroutinefunction(self.client.get_markets):
+            self._refresher = asyncio.ensure_future(self._refresh_task())
+        else:
+            self._refresher = threading.Thread(target=self._refresh_thread, name='market-rules')
+            self._refresher.daemon = True
+            self._refresher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if isinstance(self._refresher, asyncio.Future):
+            self._refresher.cancel()
+        self._refresher = None
+
+    def _refresh_thread(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as err:
+                self.last_error = err
+
+    async def _refresh_task(self):
+        while not self._stop.is_set():
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh_async()
+            except Exception as err:
+                self.last_error = err
+
+    def __contains__(self, symbol):
+        return symbol in self._markets
+
+    def __len__(self):
+        return len(self._markets)
+
+    def get(self, symbol):
+        """
+        Market dict of "get_markets", None if unknown
+        """
+        entry = self._markets.get(symbol)
+        return entry[2] if entry else None
+
+    def tick_lot(self, symbol):
+        """
+        (tick size, lot size) in 1e-8 units, None if unknown
+        """
+        entry = self._markets.get(symbol)
+        return entry[:2] if entry else None
+
+    def validate(self, symbol, price, quantity):
+        """
+        Check price is a positive multiple of tick size and quantity a positive multiple of lot size
+
+        :return:
+        {'status': True, 'result': None} or {'status': False, 'message': <reason>}
+        """
+        entry = self._markets.get(symbol)
+        if entry is None:
+            return std_ret(False, 'Unknown market: %s' % symbol)
+        tick_size, lot_size = entry[0], entry[1]
+        try:
+            price_units, quantity_units = _units(price), _units(quantity)
+        except ValueError as err:
+            return std_ret(False, 'Invalid price/quantity %s / %s of %s: %s' % (price, quantity, symbol, err))
+        if price_units <= 0 or price_units % tick_size:
+            return std_ret(False, 'Price %s of %s is not a multiple of tick size %s'
+                           % (from_fixed8(price_units), symbol, from_fixed8(tick_size)))
+        if quantity_units <= 0 or quantity_units % lot_size:
+            return std_ret(False, 'Quantity %s of %s is not a multiple of lot size %s'
+                           % (from_fixed8(quantity_units), symbol, from_fixed8(lot_size)))
+        return std_ret(True, None)
+
+    def round_order(self, symbol, price, quantity):
+        """
+        Round price to the nearest tick (at least one tick) and quantity down to lot size, decimal strings may have
+        more than 8 fraction digits
+
+        :return:
+        {'status': True, 'result': (<price>, <quantity>)}, or 'status' False if market is unknown, price / quantity
+        is not a number or quantity is below lot size
+        """
+        entry = self._markets.get(symbol)
+        if entry is None:
+            return std_ret(False, 'Unknown market: %s' % symbol)
+        tick_size, lot_size = entry[0], entry[1]
+        try:
+            (price_units, price_scale), (quantity_units, quantity_scale) = _exact(price), _exact(quantity)
+        except ValueError as err:
+            return std_ret(False, 'Invalid price/quantity %s / %s of %s: %s' % (price, quantity, symbol, err))
+        tick_size_scaled = tick_size * price_scale
+        rounded_price = max(tick_size, (price_units + tick_size_scaled // 2) // tick_size_scaled * tick_size)
+        rounded_quantity = quantity_units // (lot_size * quantity_scale) * lot_size
+        if rounded_quantity <= 0:
+            return std_ret(False, 'Quantity %s of %s is below lot size %s'
+                           % (from_fixed8(quantity_units // quantity_scale), symbol, from_fixed8(lot_size)))
+        return std_ret(True, (_same_form(rounded_price, price), _same_form(rounded_quantity, quantity)))
+
+
+def _units(value):
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, str):
+        raise ValueError('Expected decimal string or integer of 1e-8 units, got %r' % (value,))
+    return to_fixed8(value)
+
+
+def _exact(value):
+    # (units, scale): value is "units / scale" 1e-8 units, scale is 1 unless there are more than 8 fraction digits
+    if isinstance(value, str):
+        integer, _, fraction = value.partition('.')
+        if len(fraction) > PRECISION:
+            return int(integer + fraction), 10 ** (len(fraction) - PRECISION)
+    return _units(value), 1
+
+
+def _same_form(units, value):
+    return units if isinstance(value, int) else from_fixed8(units)
@@ -1,14 +1,38 @@
+import time
+import base64
+import logging
+import threading
+import functools
+import itertools
+import collections
 import requests
-import inspect
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from binance_dex.lib.common import std_ret
+from binance_dex.lib.node_pool import NodePool
 
 IS_TEST_NET = False
 PEER_LIST_TEST_NET = 'https://testnet-dex.binance.org/api/v1/peers'
 PEER_LIST_MAIN_NET = 'https://dex.binance.org/api/v1/peers'
 
+# Seconds to wait for a node health check
+DEFAULT_PROBE_TIMEOUT = 2
+MAX_PROBE_WORKERS = 64
+# Seconds to wait for a node to answer a request
+DEFAULT_REQUEST_TIMEOUT = 10
+# Max calls per JSON-RPC batch request
+DEFAULT_BATCH_SIZE = 100
+# "iter_blocks" defaults: batches in flight, blocks per batch
+DEFAULT_BLOCKS_WINDOW = 8
+DEFAULT_BLOCKS_BATCH_SIZE = 20
+# Keep-alive connections kept per node, one per batch in flight of "iter_blocks"
+SESSION_POOL_SIZE = DEFAULT_BLOCKS_WINDOW
+
+logger = logging.getLogger(__name__)
+
 NODE_RPC_ENTRY_POINT_MAPPING = {
     '_helth_check': '/health',
     'get_list': '',
+    'batch': '',
     'abci_info': '/abci_info',
     'block': '/block',
     'blockchain': '/blockchain',
@@ -29,6 +53,35 @@ NODE_RPC_ENTRY_POINT_MAPPING = {
 }
 
 
+def _no_params():
+    return {}
+
+
+def _height_params(height=None):
+    return {'height': str(height)} if height else {}
+
+
+# Methods allowed in "BinanceChainNodeRPC.batch": SDK method -> (JSON-RPC method, function(*args) returning params)
+# Broadcasts are left out, batches are retried on another node when a node pool is used
+JSONRPC_BATCH_METHODS = {
+    'abci_info': ('abci_info', _no_params),
+    'block': ('block', _height_params),
+    'blockchain': ('blockchain', lambda min_height, max_height: {'minHeight': str(min_height),
+                                                                 'maxHeight': str(max_height)}),
+    'block_results': ('block_results', _height_params),
+    'get_commit': ('commit', _height_params),
+    'consensus_params': ('consensus_params', _height_params),
+    'genesis': ('genesis', _no_params),
+    'net_info': ('net_info', _no_params),
+    'num_unconfirmed_txs': ('num_unconfirmed_txs', _no_params),
+    'status': ('status', _no_params),
+    # byte slices are base64 encoded in JSON-RPC
+    'transaction': ('tx', lambda hash: {'hash': base64.b64encode(bytes.fromhex(hash)).decode('ascii')}),
+    'unconfirmed_txs': ('unconfirmed_txs', _no_params),
+    'validators': ('validators', _height_params),
+}
+
+
 class BinanceChainNodeRPC(object):
     """
     Node RPC Service
@@ -41,55 +94,88 @@ class BinanceChainNodeRPC(object):
     This SDK using "JSONRPC over HTTP" methodology
     """
 
-    def __init__(self, node_rpc_url=None, is_test_net=False):
+    def __init__(self, node_rpc_url=None, is_test_net=False, node_count=1, probe_timeout=DEFAULT_PROBE_TIMEOUT,
+                 pool=False, routing='least_outstanding', max_retries=1, timeout=DEFAULT_REQUEST_TIMEOUT):
+        """
+        :param node_rpc_url: customized RPC node, or list of equivalent nodes, if not specified, peers of Binance are
+                             probed and the fastest healthy one is used
+        :param node_count: number of fastest healthy nodes waited for, other healthy nodes are added to "nodes" (and
+                           to the pool) in the background as their probes answer
+        :param probe_timeout: seconds to wait for a health check
+        :param pool: if True, requests are spread across all "nodes" (see "binance_dex.lib.node_pool.NodePool"),
+                     failing nodes are ejected and re-probed in the background, otherwise the fastest node is used
+        :param routing: node selection of the pool, 'least_outstanding' or 'ewma'
+        :param max_retries: with a pool, max retries of a request on another node after a connection error or 5xx
+        :param timeout: seconds to wait for a node to answer a request
+        """
+        self.nodes = []  # late nodes may be added while discovery returns
+        self.pool = None
+        self._nodes_lock = threading.Lock()
+
         # Customized RPC node
         if node_rpc_url:
-            self.node_url = node_rpc_url
+            node_rpc_urls = [node_rpc_url] if isinstance(node_rpc_url, str) else list(node_rpc_url)
 
             # Check node server health
-            print('Using customized RPC server: %s\nChecking Health...' % node_rpc_url)
-            if self._helth_check(node_rpc_url):
+            logger.info('Using customized RPC server: %s, checking health...', node_rpc_urls)
+            nodes = rank_nodes(node_rpc_urls, count=node_count, timeout=probe_timeout, on_late_node=self._add_node)
+            if nodes:
                 # healthy, init done
-                print('Customized RPC server is healthy\n')
+                logger.info('Customized RPC server is healthy')
             else:
                 # not healthy
-                raise Exception('Node %s is not healthy')
+                raise Exception('Node %s is not healthy' % node_rpc_url)
         else:
             # Binance RPC node
-            print('Using Binance RPC server, trying to find a healthy node server...')
+            logger.info('Using Binance RPC server, trying to find a healthy node server...')
             peer_list_url = PEER_LIST_TEST_NET if is_test_net else PEER_LIST_MAIN_NET
-            # Find one healthy node
-            self.node_url = self._find_healthy_node(peer_list_url)
-            print('Successfully found healthy node RPC server: %s\n' % self.node_url)
-
-    def _find_healthy_node(self, peer_list_url):
-        req = requests.get(peer_list_url)
-        req.raise_for_status()  # raise exception if calling peer list wrong
-        ret = req.json()
-        for node in ret:
-            # Check capabilities
-            capabilities = node['capabilities']
-            if 'node' in capabilities:
-                # Check Health
-                listen_addr = node['listen_addr']
-                self.node_url = listen_addr
-                if self._helth_check(listen_addr):
-                    # Found the healthy one, return its listen address
-                    return listen_addr
-                else:
-                    # not healthy, find next node
-                    continue
-            else:
-                continue
-        # didn't find any, return None
-        return None
-
-    def _helth_check(self, node_url):
-        req = self._wrapped_request()
-        if req.status_code == 200:
-            return True
-        else:
-            return False
+            # Fastest healthy nodes, the best one is used
+            nodes = find_healthy_nodes(peer_list_url, count=node_count, timeout=probe_timeout,
+                                       on_late_node=self._add_node)
+            if not nodes:
+                raise Exception('No healthy node found in %s' % peer_list_url)
+            logger.info('Successfully found healthy node RPC server: %s', nodes[0][0])
+        with self._nodes_lock:
+            self.nodes = nodes + self.nodes
+        self.node_url = self.nodes[0][0]
+
+        # Keep-alive connections, shared by threads of "iter_blocks"
+        self._session = requests.Session()
+        self._session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=SESSION_POOL_SIZE))
+        self._session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=SESSION_POOL_SIZE))
+        self.timeout = timeout
+
+        # Optional pool of nodes
+        if pool:
+            self.max_retries = max_retries
+            with self._nodes_lock:
+                self.pool = NodePool(self.nodes, probe=functools.partial(probe_node, timeout=probe_timeout),
+                                     routing=routing)
+
+    def _add_node(self, node_url, rtt):
+        # Healthy node whose probe answered after discovery returned
+        with self._nodes_lock:
+            self.nodes.append((node_url, rtt))
+            if self.pool is not None:
+                self.pool.add(node_url, rtt)
+        logger.debug('Node %s added, RTT: %.3fs', node_url, rtt)
+
+    def close(self):
+        """
+        Stop background re-probing of the pool
+        """
+        if self.pool is not None:
+            self.pool.close()
+
+    def pool_stats(self):
+        """
+        Per-node statistics of the pool, None without pool
+        Sample Return:
+        {'https://node-1:443': {'state': 'closed', 'outstanding': 2, 'requests': 1200, 'errors': 3,
+                                'latency_ewma': 0.052, 'consecutive_failures': 0, 'ejections': 1},
+         'https://node-2:443': {'state': 'open', ... ...}}
+        """
+        return self.pool.stats() if self.pool is not None else None
 
     def get_list(self):
         """
@@ -112,7 +198,7 @@ class BinanceChainNodeRPC(object):
 
         """
         return std_ret(status=True,
-                       data=self._wrapped_request().text)
+                       data=self._wrapped_request('get_list').text)
 
     def abci_info(self):
         """
@@ -123,7 +209,7 @@ class BinanceChainNodeRPC(object):
         'last_block_height': '7958684', 'last_block_app_hash': 'KI9O19xiqBUitt93GThsvYMs8UJ5fO6OcmKw+q5HQM8='}}}}
         """
         return std_ret(status=True,
-                       data=self._wrapped_request().json())
+                       data=self._wrapped_request('abci_info').json())
 
     def block(self, height=None):
         """
@@ -155,7 +241,7 @@ class BinanceChainNodeRPC(object):
 
         para = '?height=%s' % height if height else ''
         return std_ret(status=True,
-                       data=self._wrapped_request(para=para).json())
+                       data=self._wrapped_request('block', para=para).json())
 
     def blockchain(self, min_height, max_height):
         """
@@ -182,7 +268,7 @@ class BinanceChainNodeRPC(object):
         """
         para = '?minHeight=%s&maxHeight=%s' % (min_height, max_height)
         return std_ret(status=True,
-                       data=self._wrapped_request(para=para).json())
+                       data=self._wrapped_request('blockchain', para=para).json())
 
     def block_results(self, height=None):
         """
@@ -197,7 +283,7 @@ class BinanceChainNodeRPC(object):
         """
         para = '?height=%s' % height if height else ''
         return std_ret(status=True,
-                       data=self._wrapped_request(para=para).json())
+                       data=self._wrapped_request('block_results', para=para).json())
 
     def broadcast_tx_async(self, tx_id):
         """
@@ -210,7 +296,7 @@ class BinanceChainNodeRPC(object):
         """
         para = '?tx="%s"' % tx_id
         return std_ret(status=True,
-                       data=self._wrapped_request(para=para).json())
+                       data=self._wrapped_request('broadcast_tx_async', para=para).json())
 
     def broadcast_tx_sync(self, tx_id):
         """
@@ -224,7 +310,7 @@ class BinanceChainNodeRPC(object):
         """
         para = '?tx="%s"' % tx_id
         return std_ret(status=True,
-                       data=self._wrapped_request(para=para).json())
+                       data=self._wrapped_request('broadcast_tx_sync', para=para).json())
 
     def broadcast_tx_commit(self, tx_id):
         """
@@ -239,7 +325,7 @@ class BinanceChainNodeRPC(object):
         """
         para = '?tx="%s"' % tx_id
         return std_ret(status=True,
-                       data=self._wrapped_request(para=para).json())
+                       data=self._wrapped_request('broadcast_tx_commit', para=para).json())
 
     def get_commit(self, height=None):
         """
@@ -274,7 +360,7 @@ class BinanceChainNodeRPC(object):
         """
         para = '?height=%s' % height if height else ''
         return std_ret(status=True,
-                       data=self._wrapped_request(para=para).json())
+                       data=self._wrapped_request('get_commit', para=para).json())
 
     def consensus_params(self, height=None):
         """
@@ -289,7 +375,7 @@ class BinanceChainNodeRPC(object):
 
         para = '?height=%s' % height if height else ''
         return std_ret(status=True,
-                       data=self._wrapped_request(para=para).json())
+                       data=self._wrapped_request('consensus_params', para=para).json())
 
     def consensus_state(self):
         """
@@ -317,7 +403,7 @@ class BinanceChainNodeRPC(object):
         'nil-Vote', 'nil-Vote', 'nil-Vote'], 'precommits_bit_array': 'BA{11:___________} 0/1100000000000 = 0.00'}]}}}}
         """
         return std_ret(status=True,
-                       data=self._wrapped_request().json())
+                       data=self._wrapped_request('consensus_state').json())
 
     def genesis(self):
         """
@@ -353,7 +439,7 @@ class BinanceChainNodeRPC(object):
           'source': '0', 'data': None}}]}}}}}
         """
         return std_ret(status=True,
-                       data=self._wrapped_request().json())
+                       data=self._wrapped_request('genesis').json())
 
     def net_info(self):
         """
@@ -377,7 +463,7 @@ class BinanceChainNodeRPC(object):
         'remote_ip': '52.200.132.60'}]}}}
         """
         return std_ret(status=True,
-                       data=self._wrapped_request().json())
+                       data=self._wrapped_request('net_info').json())
 
     def num_unconfirmed_txs(self):
         """
@@ -405,7 +491,7 @@ class BinanceChainNodeRPC(object):
         'remote_ip': '52.200.132.60'}]}}}
         """
         return std_ret(status=True,
-                       data=self._wrapped_request().json())
+                       data=self._wrapped_request('num_unconfirmed_txs').json())
 
     def status(self):
         """
@@ -425,7 +511,7 @@ class BinanceChainNodeRPC(object):
         'voting_power': '0'}}}}
         """
         return std_ret(status=True,
-                       data=self._wrapped_request().json())
+                       data=self._wrapped_request('status').json())
 
     def transaction(self, hash):
         """
@@ -445,7 +531,7 @@ class BinanceChainNodeRPC(object):
         """
         para = '?hash=0x%s' % hash
         return std_ret(status=True,
-                       data=self._wrapped_request(para=para).json())
+                       data=self._wrapped_request('transaction', para=para).json())
 
     def unconfirmed_txs(self):
         """
@@ -455,7 +541,7 @@ class BinanceChainNodeRPC(object):
         {'status': True, 'result': {'jsonrpc': '2.0', 'id': '', 'result': {'n_txs': '0', 'txs': []}}}
         """
         return std_ret(status=True,
-                       data=self._wrapped_request().json())
+                       data=self._wrapped_request('unconfirmed_txs').json())
 
     def validators(self, height=None):
         """
@@ -494,28 +580,223 @@ class BinanceChainNodeRPC(object):
         """
         para = '?height=%s' % height if height else ''
         return std_ret(status=True,
-                       data=self._wrapped_request(para).json())
+                       data=self._wrapped_request('validators', para).json())
+
+    def batch(self, calls, max_batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Perform many calls as JSON-RPC 2.0 batches: one HTTP POST per "max_batch_size" calls instead of one GET per
+        call, responses are matched to calls by id
+
+        :param calls: [(<method name>, <arguments>...), ...] of methods in "JSONRPC_BATCH_METHODS", e.g.
+                      [('block', 10), ('block', 11), ('validators', 10), ('transaction', '<hash>')]
+        :param max_batch_size: max calls per HTTP request
+
+        Sample Return:
+        [{'status': True, 'result': {'jsonrpc': '2.0', 'id': 0, 'result': {'block_meta': ... ...}}},
+         {'status': False, 'message': "{'code': -32603, 'message': 'Internal error', 'data': 'Height must be ...'}"},
+         ... ...]
+        in the same order as "calls", successful results are the same as the corresponding method
+        """
+        batch_requests = []
+        for index, call in enumerate(calls):
+            if call[0] not in JSONRPC_BATCH_METHODS:
+                raise ValueError('%s can not be batched, allowed: %s' % (call[0], sorted(JSONRPC_BATCH_METHODS)))
+            method, params = JSONRPC_BATCH_METHODS[call[0]]
+            batch_requests.append({'jsonrpc': '2.0', 'id': index, 'method': method, 'params': params(*call[1:])})
+
+        results = []
+        for offset in range(0, len(batch_requests), max_batch_size):
+            chunk = batch_requests[offset:offset + max_batch_size]
+            req_ret = self._wrapped_request('batch', body=chunk)
+            if isinstance(req_ret, dict):
+                # request failed, std_ret
+                results += [req_ret] * len(chunk)
+                continue
+            try:
+                responses = req_ret.json()
+            except ValueError:
+                responses = None
+            if not isinstance(responses, list):
+                message = responses.get('error', responses) if isinstance(responses, dict) else req_ret.text
+                results += [std_ret(status=False, data=message)] * len(chunk)
+                continue
+            by_id = dict((response.get('id'), response) for response in responses)
+            for request in chunk:
+                response = by_id.get(request['id'])
+                if response is None:
+                    results.append(std_ret(status=False, data='No response to %s' % request['method']))
+                elif response.get('error'):
+                    results.append(std_ret(status=False, data=response['error']))
+                else:
+                    results.append(std_ret(status=True, data=response))
+        return results
+
+    def iter_blocks(self, start, end=None, window=DEFAULT_BLOCKS_WINDOW, batch_size=DEFAULT_BLOCKS_BATCH_SIZE,
+                    include_results=False):
+        """
+        Iterate over blocks start..end (both included) strictly in height order, fetched as JSON-RPC batches of
+        "batch_size" blocks, "window" batches at the same time. A new batch is only requested once the consumer took
+        the oldest one, so at most "window" * "batch_size" blocks are held in memory when the consumer is slow
 
-    def _wrapped_request(self, para=None):
+        :param start: first height
+        :param end: last height, default to latest height of the node
+        :param window: max batches in flight or waiting to be consumed
+        :param batch_size: blocks per HTTP request
+        :param include_results: if True, yield (block, block_results) tuples
 
-        # Get caller function name
-        caller_func_name = inspect.stack()[1].function
-        # todo:
-        # refer to: https://stackoverflow.com/questions/900392/getting-the-caller-function-name-inside-another-function-in-python/900413
-        # seems caller_func_name is different from python 3 and python 2, need to test on python 2
+        :return: generator of "result" of "block" (or tuples, see "include_results"), raise Exception if any block
+                 fails
+        """
+        if end is None:
+            ret = self.status()
+            end = int(ret['result']['result']['sync_info']['latest_block_height'])
+        batch_starts = iter(range(start, end + 1, batch_size))
+        executor = ThreadPoolExecutor(max_workers=window)
+        pending = collections.deque()
+
+        def submit(first):
+            pending.append(executor.submit(self._fetch_blocks, first, min(first + batch_size - 1, end),
+                                           include_results))
 
-        # Get ws name from Mapper
-        node_rpc_entry_point = NODE_RPC_ENTRY_POINT_MAPPING[caller_func_name]
+        try:
+            for first in itertools.islice(batch_starts, window):
+                submit(first)
+            while pending:
+                blocks = pending.popleft().result()
+                first = next(batch_starts, None)
+                if first is not None:
+                    submit(first)
+                for block in blocks:
+                    yield block
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _fetch_blocks(self, first, last, include_results):
+        heights = range(first, last + 1)
+        calls = [('block', height) for height in heights]
+        if include_results:
+            calls += [('block_results', height) for height in heights]
+        results = self.batch(calls, max_batch_size=len(calls))
+        for height, ret in zip(itertools.chain(heights, heights), results):
+            if not ret['status']:
+                raise Exception('Failed to fetch block %s: %s' % (height, ret['message']))
+        blocks = [ret['result']['result'] for ret in results]
+        if include_results:
+            return list(zip(blocks[:len(heights)], blocks[len(heights):]))
+        return blocks
+
+    def _wrapped_request(self, entry_point, para=None, body=None):
+        """
+        :param entry_point: name of the public method, key of "NODE_RPC_ENTRY_POINT_MAPPING"
+        :param body: JSON-RPC request(s), POSTed if specified
+        """
+        # Get path from Mapper
+        node_rpc_entry_point = NODE_RPC_ENTRY_POINT_MAPPING[entry_point]
+
+        if para:
+            node_rpc_entry_point += para
+        if self.pool is not None:
+            return self._pooled_request(node_rpc_entry_point, body)
 
         # Perform Request
         request_url = self.node_url + node_rpc_entry_point
-        if para:
-            request_url += para
-        print('Request URL: %s ... ...' % request_url)
+        logger.debug('Request URL: %s', request_url)
 
         try:
-            req_ret = requests.get(request_url)
+            req_ret = self._session.get(request_url, timeout=self.timeout) if body is None else \
+                self._session.post(request_url, json=body, timeout=self.timeout)
             return req_ret
         except Exception as err:
             return std_ret(status=False,
                            data='%s' % err)
+
+    def _pooled_request(self, path, body=None):
+        # Node picked by the pool, retried on another node if it fails
+        failed = []
+        for _ in range(self.max_retries + 1):
+            node = self.pool.acquire(exclude=failed)
+            request_url = node.url + path
+            logger.debug('Request URL: %s', request_url)
+            started_at = time.monotonic()
+            try:
+                ret = self._session.get(request_url, timeout=self.timeout) if body is None else \
+                    self._session.post(request_url, json=body, timeout=self.timeout)
+                ok = ret.status_code < 500
+            except Exception as err:
+                ret = std_ret(status=False,
+                              data='%s' % err)
+                ok = False
+            self.pool.release(node, time.monotonic() - started_at, ok)
+            if ok:
+                return ret
+            failed.append(node)
+        return ret
+
+
+def probe_node(node_url, timeout=DEFAULT_PROBE_TIMEOUT):
+    """
+    Health check of a node
+    :return: round-trip time in seconds, None if node is not healthy or did not answer within "timeout"
+    """
+    started_at = time.monotonic()
+    try:
+        healthy = requests.get(node_url + NODE_RPC_ENTRY_POINT_MAPPING['_helth_check'], timeout=timeout).ok
+    except Exception as err:
+        logger.debug('Node %s is not reachable: %s', node_url, err)
+        return None
+    rtt = time.monotonic() - started_at
+    logger.debug('Node %s healthy: %s, RTT: %.3fs', node_url, healthy, rtt)
+    return rtt if healthy else None
+
+
+def find_healthy_nodes(peer_list_url, count=1, timeout=DEFAULT_PROBE_TIMEOUT, on_late_node=None):
+    """
+    Probe all peers with "node" capability concurrently, return as soon as the "count" fastest healthy ones answered
+    (or all probes are done / timed out), so that it takes about as long as the "count"-th fastest probe
+
+    :param on_late_node: function(<node url>, <RTT in seconds>) called in the background for each other healthy node,
+                         as its probe answers after return
+    :return: [(<listen address>, <RTT in seconds>), ...] sorted by RTT, at most "count" nodes
+    """
+    req = requests.get(peer_list_url, timeout=timeout)
+    req.raise_for_status()  # raise exception if calling peer list wrong
+    candidates = [node['listen_addr'] for node in req.json() if 'node' in node.get('capabilities', [])]
+    return rank_nodes(candidates, count=count, timeout=timeout, on_late_node=on_late_node)
+
+
+def rank_nodes(candidates, count=1, timeout=DEFAULT_PROBE_TIMEOUT, on_late_node=None):
+    """
+    Probe nodes concurrently, see "find_healthy_nodes"
+    :return: [(<node url>, <RTT in seconds>), ...] sorted by RTT, at most "count" nodes
+    """
+    if not candidates:
+        return []
+
+    nodes = []
+    executor = ThreadPoolExecutor(max_workers=min(len(candidates), MAX_PROBE_WORKERS))
+    try:
+        futures = dict((executor.submit(probe_node, node_url, timeout), node_url) for node_url in candidates)
+        # Probes complete in RTT order: the first "count" healthy ones are the fastest
+        done = set()
+        for future in as_completed(futures):
+            done.add(future)
+            rtt = future.result()
+            if rtt is not None:
+                nodes.append((futures[future], rtt))
+                if len(nodes) >= count:
+                    break
+        if on_late_node is not None:
+            for future in set(futures) - done:
+                future.add_done_callback(functools.partial(_late_node, on_late_node, futures[future]))
+    finally:
+        # Slower probes are not waited for, they end within "timeout"
+        executor.shutdown(wait=False)
+    return sorted(nodes, key=lambda node: node[1])
+
+
+def _late_node(on_late_node, node_url, future):
+    rtt = future.result()
+    if rtt is not None:
+        on_late_node(node_url, rtt)
@@ -0,0 +1,164 @@
+# Local account sequence manager, so that transactions can be signed back-to-back without querying the chain each time
+import re
+import threading
+from binance_dex.lib.common import std_ret
+
+# Error of the node, possibly wrapped in JSON by the API, e.g. "Invalid sequence. Got 17, expected 18"
+_SEQUENCE_MISMATCH = re.compile(r'Invalid sequence\. Got (\d+), expected (\d+)')
+
+
+def parse_sequence_mismatch(message):
+    """
+    If a broadcast error message is a sequence mismatch, return (True, <expected sequence>), otherwise (False, None)
+    """
+    matched = _SEQUENCE_MISMATCH.search(str(message))
+    if matched:
+        return True, int(matched.group(2))
+    return False, None
+
+
+class _Account(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sequence = None  # next sequence to use, None if unknown (to be read from chain)
+        self.generation = 0   # incremented at each resync, failures of sequences issued before are ignored
+        self.resyncs = 0
+        self.issued = 0
+
+
+class SequenceManager(object):
+    """
+    Thread-safe sequence numbers of many accounts:
+     - next_sequence(): sequence read from chain once, then incremented locally for every transaction
+     - reserve() / report(): same, plus feed broadcast results back, a sequence mismatch triggers a resync
+     - broadcast(): build a transaction with the next sequence, broadcast it, resync and retry on sequence mismatch
+
+    Each account has its own lock, accounts never wait for each other.
+
+    Sample Usage:
+        sequences = SequenceManager(api_client)
+        sequences.warm_up(addresses)  # optional, read all sequences concurrently
+        ret = sequences.broadcast(address, lambda sequence: sign_order(order, sequence))
+    """
+
+    def __init__(self, client, max_resyncs=1):
+        """
+        :param client: BinanceChainClient used to read sequences and broadcast
+        :param max_resyncs: max retries of "broadcast()" after a sequence mismatch
+        """
+        self.client = client._decoded()
+        self.max_resyncs = max_resyncs
+        self._lock = threading.Lock()
+        self._accounts = {}
+
+    def _account(self, address):
+        with self._lock:
+            account = self._accounts.get(address)
+            if account is None:
+                account = self._accounts[address] = _Account()
+            return account
+
+    def _fetch(self, address, account):
+        # called with account lock held
+        ret = self.client.get_account_sequence_by_address(address)
+        if not ret['status']:
+            raise Exception('Failed to read sequence of %s: %s' % (address, ret['message']))
+        account.sequence = ret['result']['sequence']
+
+    def warm_up(self, addresses, max_workers=10):
+        """
+        Read sequences of many accounts concurrently, through "BinanceChainClient.iter_accounts"
+        :return: {<address>: <error message>} of accounts that failed
+        """
+        failures = {}
+        for address, ret in self.client.iter_accounts(addresses, sequence_only=True, max_workers=max_workers):
+            if not ret['status']:
+                failures[address] = ret['message']
+                continue
+            account = self._account(address)
+            with account.lock:
+                account.sequence = ret['result']['sequence']
+        return failures
+
+    def next_sequence(self, address):
+        """
+        Reserve and return the next sequence of an account, read from chain only the first time (or after resync)
+        Raise Exception if sequence can not be read
+        """
+        return self.reserve(address)[0]
+
+    def reserve(self, address):
+        """
+        Same as "next_sequence", return (sequence, generation), "generation" is to be passed to "report"
+        """
+        account = self._account(address)
+        with account.lock:
+            if account.sequence is None:
+                self._fetch(address, account)
+            sequence = account.sequence
+            account.sequence += 1
+            account.issued += 1
+            return sequence, account.generation
+
+    def peek(self, address):
+        """
+        Next sequence of an account without reserving it, None if unknown
+        """
+        account = self._account(address)
+        with account.lock:
+            return account.sequence
+
+    def resync(self, address, expected=None, generation=None):
+        """
+        Forget local sequence of an account, next one is "expected" if known, otherwise read from chain when needed
+        :param generation: if specified, only resync if no resync happened since this generation
+        """
+        account = self._account(address)
+        with account.lock:
+            if generation is not None and generation != account.generation:
+                return  # already resynced after this sequence was issued
+            account.sequence = expected
+            account.generation += 1
+            account.resyncs += 1
+
+    def report(self, address, ret, generation=None):
+        """
+        Feed back result of broadcasting a transaction of "address", resync on sequence mismatch
+        :param generation: generation the sequence was issued in (see "reserve"), so that a burst of failures of
+                           transactions signed before the same resync only triggers one resync
+        :return: True if the failure was a sequence mismatch
+        """
+        if ret['status']:
+            return False
+        is_mismatch, expected = parse_sequence_mismatch(ret['message'])
+        if is_mismatch:
+            self.resync(address, expected, generation)
+        return is_mismatch
+
+    def broadcast(self, address, build_transaction, sync=True):
+        """
+        Broadcast a transaction signed with the next sequence of "address"
+        :param build_transaction: function(sequence) returning the signed transaction to broadcast
+        :param sync: same as "BinanceChainClient.post_broadcast"
+
+        :return: same as "BinanceChainClient.post_broadcast"
+        """
+        for _ in range(self.max_resyncs + 1):
+            try:
+                sequence, generation = self.reserve(address)
+            except Exception as err:
+                return std_ret(False, err)
+            ret = self.client.post_broadcast(build_transaction(sequence), sync=sync)
+            if not self.report(address, ret, generation):
+                return ret
+        return ret
+
+    def stats(self):
+        """
+        Sample Return:
+        {'tbnb1fn9z9vn4f44ekz0a3pf80dcy2wh4d5988phjds': {'sequence': 18, 'issued': 120, 'resyncs': 1}, ... ...}
+        """
+        with self._lock:
+            accounts = list(self._accounts.items())
+        return dict((address, {'sequence': account.sequence, 'issued': account.issued, 'resyncs': account.resyncs})
+                    for address, account in accounts)
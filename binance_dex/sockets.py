@@ -2,7 +2,9 @@
 Wrapper for Binance Sockets, details can be found from:
 https://binance-chain.github.io/api-reference/dex-api/ws-streams.html
 """
-import inspect
+import logging
+from binance_dex.lib import json_codec
+from binance_dex.lib.fixed_point import stream_to_fixed8
 from binance_dex.lib.sockets import BinanceChainSocketConn
 
 
@@ -10,12 +12,25 @@ IS_TEST_NET = False  # A varialbe to switch test net / main net, default would b
 SOCKET_BASE_ADDR_TEST_NET = 'wss://testnet-dex.binance.org/api/ws/'
 SOCKET_BASE_ADDR_MAIN_NET = 'wss://dex.binance.org/api/ws/'
 
+logger = logging.getLogger(__name__)
+
 
 # Default Call back sample function to alert user to create own customized function
 def _default_call_back(*args):
-    print('Here is default callback function, '
-          'please pass in your own customized callback function to handle received data')
-    print(args[1])
+    logger.info('Here is default callback function, '
+                'please pass in your own customized callback function to handle received data')
+    logger.info('Received: %s', args[1])
+
+
+def fixed_point_callback(callback_function):
+    """
+    Wrap a callback so that it receives decoded messages with amounts as integers of 1e-8 units instead of raw text,
+    e.g. socket.fetch_trades_updates('100K-9BC_BNB', one_off=False,
+                                     callback_function=fixed_point_callback(on_trade))
+    """
+    def wrapped(ws, message):
+        return callback_function(ws, stream_to_fixed8(json_codec.loads(message)))
+    return wrapped
 
 
 WS_ENTRY_POINTS = {
@@ -34,8 +49,12 @@ class BinanceChainSocket(object):
     Web Socket Implementation
     Official Document: https://binance-chain.github.io/api-reference/dex-api/ws-connection.html
     """
-    def __init__(self, is_test_net=IS_TEST_NET):
+    def __init__(self, is_test_net=IS_TEST_NET, trace=False):
+        """
+        :param trace: if True, raw WebSocket frames are dumped to stderr by "websocket-client", for debugging
+        """
         self.base_ws_url = SOCKET_BASE_ADDR_TEST_NET if is_test_net else SOCKET_BASE_ADDR_MAIN_NET
+        self.trace = trace
 
     def fetch_account_updates(self, user_address, one_off=True, callback_function=None):
         """
@@ -65,12 +84,15 @@ class BinanceChainSocket(object):
          "n":"BNB:0.00039999","T":1554890366040313451,"t":"7366949-0","O":1554890366040313451}]}
 
         """
-        return self._standard_binance_change_socket_handler(one_off=one_off,
+        return self._standard_binance_change_socket_handler('fetch_account_updates',
+                                                            one_off=one_off,
                                                             callback_function=callback_function,
                                                             parameter=user_address)
 
     def fetch_block_height_updates(self, one_off=True, callback_function=None):
-        return self._standard_binance_change_socket_handler(one_off=one_off, callback_function=callback_function)
+        return self._standard_binance_change_socket_handler('fetch_block_height_updates',
+                                                            one_off=one_off,
+                                                            callback_function=callback_function)
 
     def fetch_trades_updates(self, trading_pairs, one_off=True, callback_function=None):
         """
@@ -85,7 +107,8 @@ class BinanceChainSocket(object):
         "sa":"tbnb1agdww9jsr5wmpw0jjk3s3yweu43g9pnc4p5kg7","ba":"tbnb1r4gc5ftrkr9ez2khph4h5xxd0mf0hd75jf06gw"}]}
         """
         postfix_url = trading_pairs + '@trades'
-        return self._standard_binance_change_socket_handler(one_off=one_off,
+        return self._standard_binance_change_socket_handler('fetch_trades_updates',
+                                                            one_off=one_off,
                                                             callback_function=callback_function,
                                                             parameter=postfix_url)
 
@@ -100,7 +123,8 @@ class BinanceChainSocket(object):
         "b":[["3333.00000000","0.07398900"]],"a":[]}}
         """
         postfix_url = trading_pairs + '@marketDiff'
-        return self._standard_binance_change_socket_handler(one_off=one_off,
+        return self._standard_binance_change_socket_handler('fetch_market_diff_stream',
+                                                            one_off=one_off,
                                                             callback_function=callback_function,
                                                             parameter=postfix_url)
 
@@ -116,13 +140,15 @@ class BinanceChainSocket(object):
         ["90000000000.00000000","40.05079290"]]}}
         """
         postfix_url = trading_pairs + '@marketDepth'
-        return self._standard_binance_change_socket_handler(one_off=one_off,
+        return self._standard_binance_change_socket_handler('fetch_market_depth_stream',
+                                                            one_off=one_off,
                                                             callback_function=callback_function,
                                                             parameter=postfix_url)
 
     def fetch_kline_updates(self, trading_pair, interval, one_off=True, callback_function=None):
         postfix_url = '%s@kline_%s' % (trading_pair, interval)
-        return self._standard_binance_change_socket_handler(one_off=one_off,
+        return self._standard_binance_change_socket_handler('fetch_kline_updates',
+                                                            one_off=one_off,
                                                             callback_function=callback_function,
                                                             parameter=postfix_url)
 
@@ -151,28 +177,26 @@ class BinanceChainSocket(object):
             else:
                 postfix_url = '$all@allMiniTickers'
 
-        return self._standard_binance_change_socket_handler(one_off=one_off,
+        return self._standard_binance_change_socket_handler('fetch_ticker_streams',
+                                                            one_off=one_off,
                                                             callback_function=callback_function,
                                                             parameter=postfix_url)
 
-    def _standard_binance_change_socket_handler(self, one_off, callback_function, parameter=None):
-        # Get caller function name
-        caller_func_name = inspect.stack()[1].function
-        # todo:
-        # refer to: https://stackoverflow.com/questions/900392/getting-the-caller-function-name-inside-another-function-in-python/900413
-        # seems caller_func_name is different from python 3 and python 2, need to test on python 2
-
+    def _standard_binance_change_socket_handler(self, entry_point, one_off, callback_function, parameter=None):
+        """
+        :param entry_point: name of the public method, key of "WS_ENTRY_POINTS"
+        """
         # Get ws name from Mapper
-        ws_api_name = WS_ENTRY_POINTS[caller_func_name]
+        ws_api_name = WS_ENTRY_POINTS[entry_point]
 
         # Compose whole ws url
         ws_url = self.base_ws_url + ws_api_name
         if parameter:
             ws_url += parameter
-        print('WebSocket URL:' + ws_url)
+        logger.debug('WebSocket URL: %s', ws_url)
 
         # Create Socket instance
-        socket_obj = BinanceChainSocketConn(ws_url=ws_url)
+        socket_obj = BinanceChainSocketConn(ws_url=ws_url, trace=self.trace)
 
         # Stream data
         if one_off:  # short-live-call, just return
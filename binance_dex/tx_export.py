@@ -0,0 +1,189 @@
+# Resumable export of the full transaction history of an address to a JSONL or CSV file
+import io
+import os
+import csv
+import json
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from binance_dex.lib.common import std_ret
+from binance_dex.api import to_milliseconds
+
+# Max query window of "/api/v1/transactions"
+MAX_WINDOW = datetime.timedelta(days=90)
+MAX_PAGE_SIZE = 1000
+
+FORMATS = ('jsonl', 'csv')
+
+# Columns of CSV exports, other fields of transactions are not exported
+CSV_FIELDS = ('txHash', 'blockHeight', 'txType', 'timeStamp', 'fromAddr', 'toAddr', 'value', 'txAsset', 'txFee',
+              'orderId', 'code', 'data', 'memo', 'source', 'sequence')
+
+
+class TransactionExporter(object):
+    """
+    Stream all transactions of an address in a time range to a file:
+     - the range is split into windows accepted by "/api/v1/transactions" (3 months at most), windows are fetched
+       concurrently, each one page after page into its own part file, only one page per window is held in memory
+     - progress is saved to a checkpoint file after every page: if the export fails or the process dies, calling
+       "export()" again with the same parameters resumes where it stopped
+     - once all windows are fetched, part files are concatenated (oldest window first) into the output file and the
+       checkpoint is removed
+
+    Within a window, transactions are in server order (newest first). Windows still receiving transactions (ending
+    after now) are exported as seen at fetch time.
+
+    Sample Usage:
+        exporter = TransactionExporter(api_client, max_workers=4)
+        ret = exporter.export('tbnb1r4gc5ftrkr9ez2khph4h5xxd0mf0hd75jf06gw', 'txs.csv',
+                              start_time=datetime.datetime(2019, 4, 1), fmt='csv')
+        print(ret)  # {'status': True, 'result': {'path': 'txs.csv', 'rows': 12000, 'windows': 5}}
+    """
+
+    def __init__(self, client, max_workers=4, page_size=MAX_PAGE_SIZE, window=MAX_WINDOW):
+        """
+        :param client: BinanceChainClient, its rate limiter applies
+        :param max_workers: max number of windows fetched at the same time
+        :param page_size: transactions per request
+        :param window: max time range of one query, datetime.timedelta
+        """
+        self.client = client._decoded()
+        self.max_workers = max_workers
+        self.page_size = page_size
+        self.window = window
+        self._lock = threading.Lock()
+
+    def export(self, address, path, start_time, end_time=None, fmt='jsonl', checkpoint_path=None, side=None,
+               tx_asset=None, tx_type=None):
+        """
+        :param address: address to export transactions of
+        :param path: output file path, written once export is complete
+        :param start_time: start time, <date time type> or <int> Milliseconds
+        :param end_time: end time, <date time type> or <int> Milliseconds, default to now (or to end time of the
+                         checkpoint when resuming)
+        :param fmt: 'jsonl' (one JSON transaction per line) or 'csv' (columns "CSV_FIELDS", with header)
+        :param checkpoint_path: default to "<path>.checkpoint", part files are "<path>.part-<window index>"
+        :param side, tx_asset, tx_type: filters, same as "BinanceChainClient.transactions"
+
+        :return:
+        {'status': True, 'result': {'path': 'txs.csv', 'rows': 12000, 'windows': 5}}
+        on failure, 'status' is False and calling again with the same parameters resumes the export
+        """
+        if fmt not in FORMATS:
+            return std_ret(False, 'fmt should be one of: %s' % (FORMATS,))
+        checkpoint_path = checkpoint_path or path + '.checkpoint'
+
+        # Times in Milliseconds, as stamped on transactions
+        start_ms = to_milliseconds(start_time)
+        end_ms = to_milliseconds(end_time) if end_time is not None else None
+        params = {'address': address, 'start': start_ms, 'format': fmt,
+                  'window': int(self.window.total_seconds() * 1000),
+                  'filters': {'side': side, 'tx_asset': tx_asset, 'tx_type': tx_type}}
+        checkpoint = _load_checkpoint(checkpoint_path)
+        if checkpoint is not None:
+            saved = dict((key, checkpoint.get(key)) for key in params)
+            if end_ms is None:
+                end_ms = checkpoint['end']
+            if saved != params or checkpoint['end'] != end_ms:
+                return std_ret(False, 'Checkpoint %s belongs to another export, remove it to start over'
+                               % checkpoint_path)
+        else:
+            end_ms = end_ms if end_ms is not None else to_milliseconds(datetime.datetime.now())
+            checkpoint = dict(params, end=end_ms, windows={})
+
+        windows = self._windows(start_ms, end_ms)
+        for index in range(len(windows)):
+            checkpoint['windows'].setdefault(str(index), {'rows': 0, 'size': 0, 'done': False})
+        _save_checkpoint(checkpoint_path, checkpoint)
+
+        pending = [index for index in range(len(windows)) if not checkpoint['windows'][str(index)]['done']]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._export_window, address, path, index, windows[index], fmt,
+                                       checkpoint, checkpoint_path, side, tx_asset, tx_type)
+                       for index in pending]
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            return std_ret(False, 'Export of %s windows failed, call again to resume: %s' % (len(errors), errors[0]))
+
+        _concatenate(path, [_part_path(path, index) for index in range(len(windows))], fmt)
+        os.remove(checkpoint_path)
+        return std_ret(True, {'path': path,
+                              'rows': sum(state['rows'] for state in checkpoint['windows'].values()),
+                              'windows': len(windows)})
+
+    def _windows(self, start_ms, end_ms):
+        # [(start, end), ...] in Milliseconds, both included, each window ends 1 ms before the next one starts
+        window_ms = int(self.window.total_seconds() * 1000)
+        return [(window_start, min(window_start + window_ms - 1, end_ms))
+                for window_start in range(start_ms, end_ms + 1, window_ms)]
+
+    def _export_window(self, address, path, index, window, fmt, checkpoint, checkpoint_path, side, tx_asset,
+                       tx_type):
+        state = checkpoint['windows'][str(index)]
+        part_path = _part_path(path, index)
+        with open(part_path, 'r+b' if os.path.exists(part_path) else 'wb') as f:
+            # drop rows written after the last checkpoint
+            f.truncate(state['size'])
+            f.seek(state['size'])
+            offset = state['rows']
+            while True:
+                ret = self.client.transactions(address, start_time=window[0], end_time=window[1],
+                                               limit=self.page_size, offset=offset, side=side, tx_asset=tx_asset,
+                                               tx_type=tx_type)
+                if not ret['status']:
+                    raise Exception('Failed to fetch window %s at offset %s: %s' % (index, offset, ret['message']))
+                page = ret['result'].get('tx') or []
+                f.write(_encode_rows(page, fmt))
+                f.flush()
+                offset += len(page)
+                done = len(page) < self.page_size
+                with self._lock:
+                    state.update(rows=offset, size=f.tell(), done=done)
+                    _save_checkpoint(checkpoint_path, checkpoint)
+                if done:
+                    return
+
+
+def _part_path(path, index):
+    return '%s.part-%s' % (path, index)
+
+
+def _encode_rows(transactions, fmt):
+    if fmt == 'jsonl':
+        return ''.join(json.dumps(tx, separators=(',', ':')) + '\n' for tx in transactions).encode('utf-8')
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, CSV_FIELDS, extrasaction='ignore').writerows(transactions)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _concatenate(path, part_paths, fmt):
+    # Written to a temporary file first, so that "path" only ever holds a complete export
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as out:
+        if fmt == 'csv':
+            out.write((','.join(CSV_FIELDS) + '\r\n').encode('utf-8'))
+        for part_path in part_paths:
+            with open(part_path, 'rb') as part:
+                while True:
+                    chunk = part.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+    os.replace(tmp_path, path)
+    for part_path in part_paths:
+        os.remove(part_path)
+
+
+def _load_checkpoint(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path) as f:
+        return json.load(f)
+
+
+def _save_checkpoint(checkpoint_path, checkpoint):
+    # Atomic replace, a crash never leaves a truncated checkpoint
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
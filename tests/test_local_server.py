@@ -0,0 +1,682 @@
+"""
+End-to-end checks of client features against "LocalDexServer", no network access needed
+
+Run with: python -m pytest tests
+"""
+import os
+import json
+import asyncio
+import socket
+import time
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+from binance_dex.api import BinanceChainClient
+from binance_dex.async_api import AsyncBinanceChainClient
+from binance_dex.kline_store import KlineStore
+from binance_dex.lib import failover, json_codec
+from binance_dex.lib.fixed_point import to_fixed8, to_fixed8_list, from_fixed8, stream_to_fixed8
+from binance_dex.lib.klines import KlineColumns, KLINE_INTERVAL_MS, COLUMNS
+from binance_dex.lib.metrics import Metrics
+from binance_dex.lib.single_flight import SingleFlight
+from binance_dex.local_server import LocalDexServer, _BASE_TIME_MS, _iso
+from binance_dex.sequence import SequenceManager
+from binance_dex.broadcast import BroadcastPipeline
+from binance_dex.tx_export import TransactionExporter
+
+ADDRESS = 'tbnb1r4gc5ftrkr9ez2khph4h5xxd0mf0hd75jf06gw'
+
+
+def test_single_flight_deduplicates_concurrent_gets():
+    callers = 8
+    with LocalDexServer(latency=0.3) as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        client.single_flight = SingleFlight()
+        barrier = threading.Barrier(callers)
+
+        def get_depth(_):
+            barrier.wait()
+            return client.get_depth('NNB-0AD_BNB', 5)
+
+        with ThreadPoolExecutor(max_workers=callers) as executor:
+            rets = list(executor.map(get_depth, range(callers)))
+
+    assert all(ret['status'] for ret in rets)
+    assert all(ret['result'] == rets[0]['result'] for ret in rets)
+    assert server.hits == {'depth': 1}
+    assert client.single_flight.stats() == {'calls': 1, 'deduplicated': callers - 1, 'in_flight': 0}
+
+
+def test_failover_to_healthy_server_on_5xx(monkeypatch):
+    monkeypatch.setattr(failover, 'EXPLORE_RATIO', 0)  # deterministic ranking
+    with LocalDexServer(error_rate=1.0) as broken, LocalDexServer() as healthy:
+        client = BinanceChainClient(api_base_url_with_port=[broken.url, healthy.url], rate_limit=False,
+                                    coalesce=False, max_retries=2)
+        rets = [client.get_block_time() for _ in range(5)]
+        stats = client.transport.stats()
+
+    assert all(ret['status'] for ret in rets)
+    # first request hits the broken (primary) server, is retried on the healthy one, which gets all later requests
+    assert broken.errors == 1
+    assert healthy.hits == {'time': 5}
+    assert stats['retries'] == 1
+    assert stats['servers'][broken.url]['errors'] == 1
+
+
+class _SequenceServer(LocalDexServer):
+    """
+    Chain sequence of every account starts at 10, the first sequence read is stale (7), broadcast transactions are
+    the hex-encoded sequence they are signed with
+    """
+
+    def __init__(self, **kwargs):
+        super(_SequenceServer, self).__init__(**kwargs)
+        self.sequence = 10
+        self.reads = 0
+        self.broadcast_sequences = []
+
+    def _account_sequence(self, params, body, address):
+        with self._lock:
+            self.reads += 1
+            return 200, {'sequence': 7 if self.reads == 1 else self.sequence}, {}
+
+    def _broadcast(self, params, body):
+        got = int(body, 16)
+        with self._lock:
+            self.broadcast_sequences.append(got)
+            if got != self.sequence:
+                return 400, {'code': 400,
+                             'message': 'Invalid sequence. Got %s, expected %s' % (got, self.sequence)}, {}
+            self.sequence += 1
+        return super(_SequenceServer, self)._broadcast(params, body)
+
+
+def test_broadcast_pipeline_resyncs_on_sequence_gap():
+    with _SequenceServer() as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        sequences = SequenceManager(client, max_resyncs=1)
+        pipeline = BroadcastPipeline(client, concurrency=4, sequences=sequences)
+        futures = [pipeline.submit(ADDRESS, lambda sequence: '%08x' % sequence) for _ in range(3)]
+        rets = [future.result(timeout=10) for future in futures]
+        pipeline.close()
+
+    assert all(ret['status'] for ret in rets)
+    # stale sequence 7 rejected once, then 10, 11, 12 in submission order
+    assert server.broadcast_sequences == [7, 10, 11, 12]
+    assert server.sequence == 13
+    assert server.reads == 1
+    assert sequences.stats()[ADDRESS] == {'sequence': 13, 'issued': 4, 'resyncs': 1}
+    assert pipeline.stats()['succeeded'] == 3
+
+
+
+class _RejectingBroadcastServer(LocalDexServer):
+    """
+    Reject every broadcast with "message"
+    """
+
+    def __init__(self, message, **kwargs):
+        super(_RejectingBroadcastServer, self).__init__(**kwargs)
+        self.message = message
+
+    def _broadcast(self, params, body):
+        return 400, {'code': 400, 'message': self.message}, {}
+
+
+def test_sequence_manager_only_resyncs_on_sequence_mismatch():
+    # node error wrapped by the API
+    mismatch = '{"codespace":1,"code":4,"abci_code":65540,"message":"Invalid sequence. Got 7, expected 10"}'
+    with _RejectingBroadcastServer(mismatch) as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        sequences = SequenceManager(client, max_resyncs=1)
+        ret = sequences.broadcast(ADDRESS, lambda sequence: '%08x' % sequence)
+    assert not ret['status']
+    assert server.hits == {'account-sequence': 1, 'broadcast': 2}
+    # resynced to the sequence expected by the node after each rejection, never read again from chain
+    assert sequences.stats()[ADDRESS] == {'sequence': 10, 'issued': 2, 'resyncs': 2}
+
+    with _RejectingBroadcastServer('Failed to decode sequence of messages') as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        sequences = SequenceManager(client, max_resyncs=1)
+        ret = sequences.broadcast(ADDRESS, lambda sequence: '%08x' % sequence)
+    assert ret == {'status': False, 'message': 'Failed to decode sequence of messages'}
+    assert server.hits == {'account-sequence': 1, 'broadcast': 1}
+    assert sequences.stats()[ADDRESS]['resyncs'] == 0
+
+class _FlakyTransactionsServer(LocalDexServer):
+    """
+    Answer 500 to the "fail_at"-th transactions request
+    """
+
+    def __init__(self, fail_at=None, **kwargs):
+        super(_FlakyTransactionsServer, self).__init__(**kwargs)
+        self.fail_at = fail_at
+        self.calls = 0
+
+    def _transactions(self, params, body):
+        with self._lock:
+            self.calls += 1
+            if self.calls == self.fail_at:
+                return 500, {'code': 500, 'message': 'internal server error'}, {}
+        return super(_FlakyTransactionsServer, self)._transactions(params, body)
+
+
+def _export(server, path):
+    # 250 transactions, one per second before _BASE_TIME_MS: 3 windows of 100 seconds, pages of 20
+    client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+    exporter = TransactionExporter(client, max_workers=1, page_size=20, window=datetime.timedelta(seconds=100))
+    end_time = datetime.datetime.fromtimestamp(_BASE_TIME_MS // 1000)
+    return exporter.export(ADDRESS, path, start_time=end_time - datetime.timedelta(seconds=299),
+                           end_time=end_time)
+
+
+def test_transaction_export_resumes_after_failure(tmpdir):
+    expected_path = str(tmpdir.join('expected.jsonl'))
+    with LocalDexServer(num_transactions=250) as server:
+        ret = _export(server, expected_path)
+    assert ret == {'status': True, 'result': {'path': expected_path, 'rows': 250, 'windows': 3}}
+
+    path = str(tmpdir.join('txs.jsonl'))
+    with _FlakyTransactionsServer(num_transactions=250, fail_at=8) as server:
+        failed = _export(server, path)
+        assert not failed['status']
+        assert os.path.exists(path + '.checkpoint')
+        assert not os.path.exists(path)
+        with open(path + '.checkpoint') as f:
+            saved_rows = sum(window['rows'] for window in json.load(f)['windows'].values())
+        calls_before_resume = server.calls
+
+        resumed = _export(server, path)
+
+    assert resumed == {'status': True, 'result': {'path': path, 'rows': 250, 'windows': 3}}
+    # windows of 50, 100 and 100 transactions take 3, 6 and 6 requests: the 8th one (5th page of the second window)
+    # failed while other windows completed, only the last 2 requests of the second window are sent again
+    assert saved_rows == 50 + 80 + 100
+    assert server.calls - calls_before_resume == 2
+    assert not os.path.exists(path + '.checkpoint')
+    with open(path) as f, open(expected_path) as expected:
+        assert f.read() == expected.read()
+
+
+class _SubSecondTransactionsServer(LocalDexServer):
+    """
+    Transactions stamped at the given times (Milliseconds), filtered by startTime / endTime, both included
+    """
+
+    def __init__(self, times, **kwargs):
+        super(_SubSecondTransactionsServer, self).__init__(**kwargs)
+        self.times = sorted(times, reverse=True)
+
+    def _transactions(self, params, body):
+        start, end = int(params['startTime']), int(params['endTime'])
+        offset, limit = int(params.get('offset', 0)), int(params.get('limit', 500))
+        txs = [dict(self._transaction(params['address'], i), timeStamp=_iso(ms), txAge=ms)
+               for i, ms in enumerate(self.times) if start <= ms <= end]
+        return 200, {'tx': txs[offset:offset + limit], 'total': len(txs)}, {}
+
+
+def test_transaction_export_keeps_sub_second_transactions(tmpdir):
+    start_ms = _BASE_TIME_MS - 300000
+    end_ms = _BASE_TIME_MS - 1
+    # around the 2 window boundaries (windows of 100 seconds) and right before the end of the export
+    times = [start_ms, start_ms + 100000 - 500, start_ms + 100000, start_ms + 200000 - 500, start_ms + 200000,
+             end_ms - 500, end_ms]
+    path = str(tmpdir.join('txs.jsonl'))
+    with _SubSecondTransactionsServer(times) as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        exporter = TransactionExporter(client, page_size=20, window=datetime.timedelta(seconds=100))
+        ret = exporter.export(ADDRESS, path, start_time=start_ms, end_time=end_ms)
+
+    assert ret == {'status': True, 'result': {'path': path, 'rows': len(times), 'windows': 3}}
+    with open(path) as f:
+        exported = [json.loads(line)['txAge'] for line in f]
+    assert sorted(exported) == times
+
+
+def test_broadcast_pipeline_logs_failing_callback(caplog):
+    def callback(ret):
+        raise ValueError('callback bug')
+
+    with LocalDexServer() as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        pipeline = BroadcastPipeline(client, concurrency=1)
+        future = pipeline.submit(ADDRESS, '00ff', callback=callback)
+        ret = future.result(timeout=10)
+        pipeline.close()
+
+    assert ret['status']
+    assert pipeline.stats()['succeeded'] == 1
+    records = [record for record in caplog.records if record.name == 'binance_dex.broadcast']
+    assert len(records) == 1
+    assert ADDRESS in records[0].getMessage()
+    assert records[0].exc_info[0] is ValueError
+
+
+class _OverlappingKlinesServer(LocalDexServer):
+    """
+    Klines windows overlap: every response starts one bar before "startTime"
+    """
+
+    def __init__(self, **kwargs):
+        super(_OverlappingKlinesServer, self).__init__(**kwargs)
+        self.windows = []
+
+    def _klines(self, params, body):
+        with self._lock:
+            self.windows.append((int(params['startTime']), int(params['endTime']), int(params['limit'])))
+        interval_ms = KLINE_INTERVAL_MS[params['interval']]
+        params = dict(params, startTime=str(int(params['startTime']) - interval_ms))
+        return super(_OverlappingKlinesServer, self)._klines(params, body)
+
+
+def test_get_klines_range_splits_windows_and_merges_bars():
+    minute = KLINE_INTERVAL_MS['1m']
+    start_time = _BASE_TIME_MS + 30 * 1000  # not aligned on a bar
+    end_time = _BASE_TIME_MS + 2500 * minute
+    with _OverlappingKlinesServer() as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        ret = client.get_klines_range('NNB-0AD_BNB', '1m', start_time, end_time, max_workers=2)
+
+    assert ret['status']
+    # windows of 1000 bars aligned on the interval, first one starting at "start_time"
+    assert sorted(server.windows) == [(start_time, _BASE_TIME_MS + 1000 * minute - 1, 1000),
+                                      (_BASE_TIME_MS + 1000 * minute, _BASE_TIME_MS + 2000 * minute - 1, 1000),
+                                      (_BASE_TIME_MS + 2000 * minute, end_time, 1000)]
+    # bar opened before "start_time" and bars returned twice by overlapping windows are merged
+    open_times = [bar['open_time_stamp'] for bar in ret['result']]
+    assert open_times == list(range(_BASE_TIME_MS, end_time + 1, minute))
+
+
+def _closed_port_url():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return 'http://127.0.0.1:%s/' % port
+
+
+def test_metrics_record_responses_and_errors():
+    metrics = Metrics(prefix='test')
+    with LocalDexServer(error_rate={'fees': 1.0}) as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False, metrics=metrics)
+        assert client.get_depth('NNB-0AD_BNB', 5)['status']
+        assert client.get_depth('NNB-0AD_BNB', 5)['status']
+        assert not client.get_fees()['status']
+    client = BinanceChainClient(api_base_url_with_port=_closed_port_url(), rate_limit=False, metrics=metrics)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get_block_time()
+
+    snapshot = metrics.snapshot()
+    assert snapshot['depth']['responses'] == {200: 2}
+    assert snapshot['depth']['total']['count'] == 2
+    assert snapshot['depth']['decode']['count'] == 2
+    assert snapshot['depth']['size']['count'] == 2
+    assert snapshot['depth']['size']['sum'] > 0
+    assert snapshot['fees']['responses'] == {500: 1}
+    assert snapshot['time']['responses'] == {}
+    assert snapshot['time']['errors'] == 1
+    assert snapshot['time']['total']['count'] == 0
+
+    lines = metrics.prometheus().splitlines()
+    assert '# TYPE test_responses_total counter' in lines
+    assert 'test_responses_total{endpoint="depth",code="200"} 2' in lines
+    assert 'test_responses_total{endpoint="fees",code="500"} 1' in lines
+    assert 'test_errors_total{endpoint="time"} 1' in lines
+    assert '# TYPE test_total_seconds histogram' in lines
+    assert 'test_total_seconds_bucket{endpoint="depth",le="+Inf"} 2' in lines
+    assert 'test_total_seconds_count{endpoint="depth"} 2' in lines
+    assert 'test_size_bytes_count{endpoint="fees"} 1' in lines
+
+
+class _PagesServer(LocalDexServer):
+    """
+    Record offsets of open orders requests, "second_page" is set once the second page is requested
+    """
+
+    def __init__(self, **kwargs):
+        super(_PagesServer, self).__init__(**kwargs)
+        self.offsets = []
+        self.second_page = threading.Event()
+
+    def _orders_open(self, params, body):
+        with self._lock:
+            self.offsets.append(int(params['offset']))
+        if params['offset'] != '0':
+            self.second_page.set()
+        return super(_PagesServer, self)._orders_open(params, body)
+
+
+def test_iter_open_orders_stops_after_last_page():
+    with _PagesServer(num_orders=1200) as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        orders = list(client.iter_open_orders(ADDRESS, limit=500))
+    assert len(set(order['orderId'] for order in orders)) == 1200
+    assert server.offsets == [0, 500, 1000]
+
+    # last page is full: one more (empty) page tells the end
+    with _PagesServer(num_orders=1000) as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        orders = list(client.iter_open_orders(ADDRESS, limit=500, prefetch=False))
+    assert len(orders) == 1000
+    assert server.offsets == [0, 500, 1000]
+
+
+def test_iter_open_orders_prefetches_next_page():
+    for prefetch in (True, False):
+        with _PagesServer(num_orders=1200) as server:
+            client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+            orders = client.iter_open_orders(ADDRESS, limit=500, prefetch=prefetch)
+            next(orders)
+            # next page requested while the first one is consumed, only if prefetching
+            assert server.second_page.wait(5 if prefetch else 0.3) is prefetch
+            orders.close()
+
+
+def test_iter_pages_rejects_limit_above_server_maximum():
+    with LocalDexServer() as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        with pytest.raises(Exception, match='limit should be between 1 and 1000'):
+            client.iter_transactions(ADDRESS, limit=1001)
+        with pytest.raises(Exception, match='limit should be between 1 and 1000'):
+            client.iter_closed_orders(ADDRESS, limit=0)
+
+        async def iter_async():
+            async_client = AsyncBinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+            return [order async for order in async_client.iter_open_orders(ADDRESS, limit=1001)]
+
+        with pytest.raises(Exception, match='limit should be between 1 and 1000'):
+            asyncio.run(iter_async())
+    assert server.hits == {}
+
+
+class _FlakyKlinesServer(LocalDexServer):
+    """
+    Answer 500 to the first klines request of the window starting at "fail_start", record start of every request
+    """
+
+    def __init__(self, fail_start, **kwargs):
+        super(_FlakyKlinesServer, self).__init__(**kwargs)
+        self.fail_start = fail_start
+        self.starts = []
+
+    def _klines(self, params, body):
+        start = int(params['startTime'])
+        with self._lock:
+            self.starts.append(start)
+            if start == self.fail_start:
+                self.fail_start = None
+                return 500, {'code': 500, 'message': 'internal server error'}, {}
+        return super(_FlakyKlinesServer, self)._klines(params, body)
+
+
+def test_kline_store_sync_resumes_after_failed_window(tmpdir):
+    hour = KLINE_INTERVAL_MS['1h']
+    start_time = int(time.time() * 1000) // hour * hour - 3500 * hour  # 4 windows of 1000 bars
+    with _FlakyKlinesServer(fail_start=start_time + 1000 * hour) as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        store = KlineStore(str(tmpdir.join('klines.db')), client)
+        failed = store.sync('NNB-0AD_BNB', '1h', start_time=start_time, max_workers=2)
+        assert not failed['status']
+        # first window stored, the failed one and those after it are not
+        assert store.last_close_time('NNB-0AD_BNB', '1h') == start_time + 1000 * hour - 1
+        del server.starts[:]
+
+        resumed = store.sync('NNB-0AD_BNB', '1h')
+        klines = store.get_klines('NNB-0AD_BNB', '1h', columnar=True)
+        store.close()
+
+    assert resumed['status']
+    assert min(server.starts) == start_time + 1000 * hour
+    assert resumed['result'] == len(klines) - 1000
+    # every closed bar stored once, in order, the bar still open is left out
+    assert len(klines) >= 3500
+    assert list(klines.open_time) == list(range(start_time, klines.close_time[-1], hour))
+    assert klines.close_time[-1] < time.time() * 1000
+
+
+def test_async_client_matches_sync_client():
+    start_time = _BASE_TIME_MS
+    end_time = _BASE_TIME_MS + 2500 * KLINE_INTERVAL_MS['1m']
+    with LocalDexServer(latency=0.05) as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        expected = [client.get_klines('NNB-0AD_BNB', '1h', start_time=start_time, end_time=end_time),
+                    client.get_account_info_by_address(ADDRESS, fixed_point=True),
+                    client.get_klines_range('NNB-0AD_BNB', '1m', start_time, end_time)]
+        expected_orders = list(client.iter_closed_orders(ADDRESS, limit=500))
+
+        async def main():
+            async_client = AsyncBinanceChainClient(api_base_url_with_port=server.url, rate_limit=False,
+                                                   coalesce=False)
+            try:
+                started_at = time.monotonic()
+                depths = await asyncio.gather(*[async_client.get_depth('NNB-0AD_BNB', 5) for _ in range(10)])
+                elapsed = time.monotonic() - started_at
+                rets = await asyncio.gather(
+                    async_client.get_klines('NNB-0AD_BNB', '1h', start_time=start_time, end_time=end_time),
+                    async_client.get_account_info_by_address(ADDRESS, fixed_point=True),
+                    async_client.get_klines_range('NNB-0AD_BNB', '1m', start_time, end_time))
+                orders = [order async for order in async_client.iter_closed_orders(ADDRESS, limit=500)]
+                invalid = await async_client.get_klines('NNB-0AD_BNB', '2M')
+                return depths, elapsed, rets, orders, invalid
+            finally:
+                await async_client.close()
+
+        depths, elapsed, rets, orders, invalid = asyncio.run(main())
+
+    assert all(ret['status'] and len(ret['result']['asks']) == 5 for ret in depths)
+    assert server.hits['depth'] == 10
+    # concurrent requests on one event loop: 10 requests of 50 ms take about one request
+    assert elapsed < 0.4
+    assert rets == expected
+    assert orders == expected_orders
+    # input validation errors are returned, no request sent
+    assert not invalid['status']
+
+
+class _ArrivalsServer(LocalDexServer):
+    """
+    Record arrival time of every depth request
+    """
+
+    def __init__(self, **kwargs):
+        super(_ArrivalsServer, self).__init__(**kwargs)
+        self.arrivals = []
+
+    def _depth(self, params, body):
+        with self._lock:
+            self.arrivals.append(time.monotonic())
+        return super(_ArrivalsServer, self)._depth(params, body)
+
+
+def test_rate_limiter_spaces_requests_within_endpoint_limit():
+    callers = 6
+    with _ArrivalsServer() as server:
+        # depth: 10 requests per second, burst 1
+        client = BinanceChainClient(api_base_url_with_port=server.url, coalesce=False)
+        with ThreadPoolExecutor(max_workers=callers) as executor:
+            rets = list(executor.map(lambda _: client.get_depth('NNB-0AD_BNB', 5), range(callers)))
+        stats = client.rate_limiter.stats()
+
+    assert all(ret['status'] for ret in rets)
+    gaps = [later - earlier for earlier, later in zip(server.arrivals, server.arrivals[1:])]
+    assert min(gaps) > 0.08
+    assert server.arrivals[-1] - server.arrivals[0] > 0.45
+    depth = stats['depth']
+    assert (depth['rate'], depth['burst'], depth['requests'], depth['queue_depth']) == (10.0, 1, callers, 0)
+    # callers queued behind each other: the last one waited for the 5 before it
+    assert 0.45 < depth['max_wait'] <= 0.55
+    assert abs(depth['total_wait'] - 0.1 * sum(range(callers))) < 0.1
+    # endpoints not hit yet: no bucket used
+    assert stats['time']['requests'] == 0
+
+
+class _ChangingTokensServer(LocalDexServer):
+    """
+    Token list changes when "version" is incremented, status codes of tokens responses are recorded
+    """
+
+    def __init__(self, **kwargs):
+        super(_ChangingTokensServer, self).__init__(**kwargs)
+        self.version = 0
+        self.statuses = []
+
+    def dispatch(self, method, path, body, headers=None):
+        ret = super(_ChangingTokensServer, self).dispatch(method, path, body, headers)
+        if '/tokens' in path:
+            self.statuses.append(ret[0])
+        return ret
+
+    def _tokens(self, params, body):
+        status, tokens, headers = super(_ChangingTokensServer, self)._tokens(params, body)
+        return status, [dict(token, name='%s v%s' % (token['name'], self.version)) for token in tokens], headers
+
+
+def test_cache_serves_fresh_results_and_revalidates_expired_ones():
+    ttl = 0.3
+    with _ChangingTokensServer() as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False, cache=True,
+                                    cache_ttls={'tokens': ttl})
+        first = client.get_tokens()
+        cached = client.get_tokens()
+        time.sleep(ttl + 0.05)
+        revalidated = client.get_tokens()
+        server.version += 1
+        time.sleep(ttl + 0.05)
+        changed = client.get_tokens()
+        stats = client.cache.stats()
+
+    assert first['status'] and cached is first and revalidated is first
+    assert changed['status'] and changed['result'][0]['name'] == 'Token 0 v1'
+    # fresh result served from cache, expired ones revalidated with "If-None-Match"
+    assert server.statuses == [200, 304, 200]
+    assert stats['endpoints']['tokens'] == {'hits': 1, 'misses': 3, 'revalidated': 1}
+
+
+def test_columnar_klines_round_trip():
+    start_time = _BASE_TIME_MS
+    end_time = _BASE_TIME_MS + 999 * KLINE_INTERVAL_MS['1h']
+    with LocalDexServer() as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        bars = client.get_klines('NNB-0AD_BNB', '1h', start_time=start_time, end_time=end_time, limit=1000)['result']
+        klines = client.get_klines('NNB-0AD_BNB', '1h', start_time=start_time, end_time=end_time, limit=1000,
+                                   columnar=True)['result']
+
+    assert isinstance(klines, KlineColumns)
+    assert len(klines) == len(bars) == 1000
+    # fixed-point columns render back to the decimal strings of the API
+    assert [(bar['open_time_stamp'], bar['price_open'], bar['price_high'], bar['price_low'], bar['price_close'],
+             bar['volume'], bar['close_time_stamp'], bar['quote_asset_volume'], bar['num_trades']) for bar in bars] == \
+        [(row[0], from_fixed8(row[1]), from_fixed8(row[2]), from_fixed8(row[3]), from_fixed8(row[4]),
+          from_fixed8(row[5]), row[6], from_fixed8(row[7]), row[8])
+         for row in zip(*[getattr(klines, column) for column in COLUMNS])]
+    assert klines.to_float('close')[0] == float(bars[0]['price_close'])
+    rebuilt = KlineColumns.from_rows(list(zip(*[getattr(klines, column) for column in COLUMNS])))
+    assert all(getattr(rebuilt, column) == getattr(klines, column) for column in COLUMNS)
+
+
+def test_fixed_point_responses_round_trip():
+    with LocalDexServer() as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False, coalesce=False)
+        depth = client.get_depth('NNB-0AD_BNB', 100)['result']
+        fixed_depth = client.get_depth('NNB-0AD_BNB', 100, fixed_point=True)['result']
+        account = client.get_account_info_by_address(ADDRESS)['result']
+        fixed_account = client.get_account_info_by_address(ADDRESS, fixed_point=True)['result']
+
+    for side in ('bids', 'asks'):
+        assert [[from_fixed8(price), from_fixed8(amount)] for price, amount in fixed_depth[side]] == depth[side]
+    assert fixed_account['balances'] == [{'symbol': 'BNB', 'free': 139999250000, 'locked': 0, 'frozen': 0}]
+    assert [from_fixed8(fixed_account['balances'][0][field]) for field in ('free', 'locked', 'frozen')] == \
+        [account['balances'][0][field] for field in ('free', 'locked', 'frozen')]
+
+    # bulk conversion falls back to per-value parsing for other formats
+    values = ['3333.00000000', '0.5', '12', '-0.00000001', '.25']
+    assert to_fixed8_list(values) == [to_fixed8(value) for value in values] == \
+        [333300000000, 50000000, 1200000000, -1, 25000000]
+    with pytest.raises(ValueError):
+        to_fixed8('0.000000001')
+    message = {'stream': 'trades', 'data': [{'e': 'trade', 'p': '0.00100000', 'q': '12.50000000', 't': '1-0'}]}
+    assert stream_to_fixed8(message)['data'] == [{'e': 'trade', 'p': 100000, 'q': 1250000000, 't': '1-0'}]
+
+
+class _MalformedErrorServer(LocalDexServer):
+    """
+    Order lookups fail with a body which is not JSON
+    """
+
+    def _orders(self, params, body, order_id):
+        return 500, b'<html>Internal Server Error</html>', {}
+
+
+def test_every_decoder_gives_same_results_and_errors(monkeypatch):
+    monkeypatch.setattr(json_codec, '_loads', json_codec._loads)
+    monkeypatch.setattr(json_codec, 'decoder_name', json_codec.decoder_name)
+    with _MalformedErrorServer(error_rate={'fees': 1.0}) as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False, coalesce=False)
+        results = {}
+        for name in sorted(json_codec.DECODERS):
+            json_codec.set_decoder(name)
+            results[name] = (client.get_markets(), client.get_fees(), client.get_order_by_id('1-0'))
+
+    markets = results['json'][0]
+    assert markets['status'] and len(markets['result']) == 200
+    for name, (decoded, fees, order) in results.items():
+        assert decoded == markets
+        # error message taken from the JSON error body, or the status code when body is not JSON
+        assert fees == {'status': False, 'message': 'internal server error'}
+        assert not order['status'] and order['message'].startswith('<Response [500]>, exception:')
+
+
+def test_raw_and_lazy_response_modes():
+    with LocalDexServer() as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False, coalesce=False)
+        decoded = client.get_depth('NNB-0AD_BNB', 20, fixed_point=True)
+        raw = client.with_options(response_mode='raw').get_depth('NNB-0AD_BNB', 20, fixed_point=True)
+        lazy_client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False, coalesce=False,
+                                         response_mode='lazy')
+        lazy = lazy_client.get_depth('NNB-0AD_BNB', 20, fixed_point=True)
+        failed = lazy_client.get_klines('NNB-0AD_BNB', '1h', start_time='not-a-time')
+        # methods working on the content of results still get decoded results
+        orders = list(lazy_client.iter_open_orders(ADDRESS, limit=500))
+
+    # raw: body as sent by server, parser not applied
+    assert raw['status'] and isinstance(raw['result'], bytes)
+    assert json.loads(raw['result'])['asks'] == [[from_fixed8(price), from_fixed8(amount)]
+                                                 for price, amount in decoded['result']['asks']]
+    # lazy: decoded (and parsed) on first access only
+    result = lazy['result']
+    assert lazy['status'] and not result.decoded
+    assert json.loads(result.raw)['symbol'] == 'NNB-0AD_BNB'
+    assert not result.decoded
+    assert result['asks'] == decoded['result']['asks']
+    assert result.decoded and result.data['bids'] == decoded['result']['bids']
+    # error bodies are always decoded
+    assert not failed['status'] and failed['message'].startswith('bad request')
+    assert len(orders) == 1200 and orders[0]['orderId']
+
+
+def test_market_rules_round_order():
+    with LocalDexServer() as server:
+        client = BinanceChainClient(api_base_url_with_port=server.url, rate_limit=False)
+        rules = client.get_market_rules()['result']
+        rules.stop()
+        markets = client.get_markets()['result']
+    symbol = '%s_%s' % (markets[0]['base_asset_symbol'], markets[0]['quote_asset_symbol'])
+
+    # tick size 0.01, lot size 1
+    assert rules.tick_lot(symbol) == (1000000, 100000000)
+    assert rules.round_order(symbol, '1.23456', '12.7') == {'status': True, 'result': ('1.23000000', '12.00000000')}
+    assert rules.round_order(symbol, '1.235', '1')['result'] == ('1.24000000', '1.00000000')
+    # more than 8 fraction digits, at least one tick
+    assert rules.round_order(symbol, '1.234999999', '2.999999999')['result'] == ('1.23000000', '2.00000000')
+    assert rules.round_order(symbol, '0.001', '1')['result'] == ('0.01000000', '1.00000000')
+    # integers of 1e-8 units stay integers
+    assert rules.round_order(symbol, 123456789, 1270000000)['result'] == (123000000, 1200000000)
+
+    price, quantity = rules.round_order(symbol, '1.23456', '12.7')['result']
+    assert rules.validate(symbol, price, quantity)['status']
+    assert not rules.validate(symbol, '1.23456', quantity)['status']
+    assert not rules.round_order(symbol, '1.2', '0.5')['status']  # below lot size
+    assert not rules.round_order(symbol, 'abc', '1')['status']
+    assert not rules.round_order('UNKNOWN-000_BNB', '1', '1')['status']
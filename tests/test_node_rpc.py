@@ -0,0 +1,243 @@
+"""
+Node RPC client features against local stand-in Tendermint RPC nodes, no network access needed
+
+Run with: python -m pytest tests
+"""
+import json
+import time
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import pytest
+from binance_dex import node_rpc
+from binance_dex.node_rpc import BinanceChainNodeRPC, probe_node
+from binance_dex.lib.node_pool import NodePool, OPEN, CLOSED
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status, data):
+        content = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self._send(*self.server.node.get(self.path))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self._send(*self.server.node.post(json.loads(body)))
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _RpcNode(object):
+    """
+    Stand-in Tendermint RPC node holding blocks 1.."latest", answers URI requests and JSON-RPC (batch) POSTs, batch
+    responses are sent in reverse order
+
+    :param probe_delay: seconds before answering "/health"
+    :param delay: seconds before answering other requests
+    :param healthy: if False, every request is answered "500"
+    :param peers: peer list served at "/api/v1/peers"
+    """
+
+    def __init__(self, latest=1000, probe_delay=0.0, delay=0.0, healthy=True, peers=None):
+        self.latest = latest
+        self.probe_delay = probe_delay
+        self.delay = delay
+        self.healthy = healthy
+        self.peers = peers
+        self.requests = []  # path of GET requests, number of calls of POST requests
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingServer(('127.0.0.1', 0), _Handler)
+        self._server.node = self
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s' % self._server.server_address[1]
+
+    def __enter__(self):
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _serve(self, request, delay, answer):
+        with self._lock:
+            self.requests.append(request)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(delay)
+            if not self.healthy:
+                return 500, {'error': 'unhealthy'}
+            return answer()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def get(self, path):
+        if path == '/api/v1/peers':
+            return 200, self.peers
+        if path == '/health':
+            return self._serve(path, self.probe_delay, lambda: (200, {'jsonrpc': '2.0', 'id': '', 'result': {}}))
+        method, _, query = path.lstrip('/').partition('?')
+        params = dict(param.split('=', 1) for param in query.split('&') if param)
+        return self._serve(path, self.delay, lambda: (200, self._response('', method, params)))
+
+    def post(self, body):
+        calls = body if isinstance(body, list) else [body]
+
+        def answer():
+            responses = [self._response(call['id'], call['method'], call.get('params') or {})
+                         for call in reversed(calls)]
+            return 200, responses if isinstance(body, list) else responses[0]
+
+        return self._serve(len(calls), self.delay, answer)
+
+    def _response(self, request_id, method, params):
+        height = int(params.get('height') or self.latest)
+        if height > self.latest:
+            return {'jsonrpc': '2.0', 'id': request_id,
+                    'error': {'code': -32603, 'message': 'Internal error',
+                              'data': 'Height must be less than or equal to the current blockchain height'}}
+        if method == 'block':
+            result = {'block': {'header': {'height': str(height)}}}
+        elif method == 'block_results':
+            result = {'height': str(height)}
+        elif method == 'status':
+            result = {'sync_info': {'latest_block_height': str(self.latest)}}
+        elif method == 'tx':
+            result = {'hash': base64.b64decode(params['hash']).hex().upper()}
+        else:
+            result = {'method': method}
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+
+def _peer(url, capabilities=('node',)):
+    return {'id': url, 'listen_addr': url, 'access_addr': url, 'capabilities': list(capabilities)}
+
+
+def test_discovery_returns_fastest_node_without_waiting_for_slow_ones(monkeypatch):
+    with _RpcNode() as fast, _RpcNode(probe_delay=0.5) as slow, _RpcNode(healthy=False) as dead, \
+            _RpcNode() as seed, _RpcNode(probe_delay=5) as hung:
+        with _RpcNode(peers=[_peer(hung.url), _peer(slow.url), _peer(dead.url), _peer(fast.url),
+                             _peer(seed.url, capabilities=['seed'])]) as peer_list:
+            monkeypatch.setattr(node_rpc, 'PEER_LIST_MAIN_NET', peer_list.url + '/api/v1/peers')
+            started_at = time.monotonic()
+            client = BinanceChainNodeRPC(probe_timeout=1)
+            elapsed = time.monotonic() - started_at
+            found = [url for url, _ in client.nodes]
+            # slow node joins once its probe answers
+            deadline = time.monotonic() + 2
+            while len(client.nodes) < 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            nodes = [url for url, _ in client.nodes]
+
+    assert elapsed < 0.4
+    assert found == [fast.url]
+    assert client.node_url == fast.url
+    assert nodes == [fast.url, slow.url]
+    # peers without "node" capability are not probed
+    assert seed.requests == []
+    assert dead.requests == ['/health']
+
+
+def test_pool_ejects_failing_node_and_retries_on_another():
+    with _RpcNode(delay=0.05) as steady, _RpcNode() as flaky:
+        client = BinanceChainNodeRPC([steady.url, flaky.url], node_count=2, pool=True)
+        for pool_node in client.pool.nodes:  # flaky node is preferred while it answers faster
+            pool_node.latency_ewma = 0.01 if pool_node.url == flaky.url else 0.05
+        flaky.healthy = False
+        rets = [client.status() for _ in range(6)]
+        stats = client.pool.stats()
+        client.pool.close()
+
+    assert all(ret['status'] for ret in rets)
+    # 3 failures in a row eject the flaky node, each failed request was retried on the steady one
+    assert stats[flaky.url]['state'] == OPEN
+    assert (stats[flaky.url]['errors'], stats[flaky.url]['ejections']) == (3, 1)
+    assert stats[steady.url]['requests'] == 6
+    assert flaky.requests.count('/status') == 3
+
+
+def test_pool_puts_ejected_node_back_once_healthy():
+    with _RpcNode() as node:
+        pool = NodePool([node.url], probe=probe_node, failure_threshold=1, reprobe_interval=0.1)
+        pool.release(pool.acquire(), 0.01, ok=False)
+        ejected = pool.stats()[node.url]['state']
+        deadline = time.monotonic() + 2
+        while pool.stats()[node.url]['state'] != CLOSED and time.monotonic() < deadline:
+            time.sleep(0.05)
+        pool.close()
+
+    assert ejected == OPEN
+    assert pool.stats()[node.url]['state'] == CLOSED
+    assert node.requests == ['/health']
+
+
+def test_batch_keeps_call_order_across_chunks():
+    tx_hash = 'AB' * 32
+    with _RpcNode(latest=100) as node:
+        client = BinanceChainNodeRPC(node.url)
+        rets = client.batch([('block', 10), ('block_results', 10), ('status',), ('block', 101),
+                             ('transaction', tx_hash)], max_batch_size=2)
+        with pytest.raises(ValueError):
+            client.batch([('broadcast_tx_sync', '00')])
+
+    # responses come back in reverse order, matched by id
+    assert rets[0]['result']['result'] == {'block': {'header': {'height': '10'}}}
+    assert rets[1]['result']['result'] == {'height': '10'}
+    assert rets[2]['result']['result']['sync_info']['latest_block_height'] == '100'
+    assert not rets[3]['status'] and 'Height must be less than' in str(rets[3]['message'])
+    assert rets[4]['result']['result'] == {'hash': tx_hash}
+    assert node.requests == ['/health', 2, 2, 1]
+
+
+def test_iter_blocks_streams_in_order_with_bounded_concurrency():
+    with _RpcNode(latest=95, delay=0.05) as node:
+        client = BinanceChainNodeRPC(node.url)
+        heights = [int(block['block']['header']['height']) for block in client.iter_blocks(1, window=3, batch_size=10)]
+        max_in_flight = node.max_in_flight
+        pairs = list(client.iter_blocks(11, 14, window=2, batch_size=3, include_results=True))
+
+    assert heights == list(range(1, 96))
+    assert 2 <= max_in_flight <= 3
+    assert [(block['block']['header']['height'], results['height']) for block, results in pairs] == \
+        [(str(height), str(height)) for height in range(11, 15)]
+
+
+def test_iter_blocks_raises_on_failed_block():
+    with _RpcNode(latest=50) as node:
+        client = BinanceChainNodeRPC(node.url)
+        with pytest.raises(Exception, match='Failed to fetch block 51'):
+            list(client.iter_blocks(41, 60, batch_size=5))
+
+
+def test_requests_time_out_without_pool():
+    with _RpcNode(delay=1) as node:
+        client = BinanceChainNodeRPC(node.url, timeout=0.2)
+        started_at = time.monotonic()
+        ret = client.batch([('status',)])[0]
+        elapsed = time.monotonic() - started_at
+
+    assert not ret['status'] and 'timed out' in ret['message']
+    assert elapsed < 0.8